@@ -0,0 +1,441 @@
+"""
+Steering Wheel Bridge Benchmark
+Simulates N phone clients speaking the App.js protocol against a real
+SteeringWheelBridge with an in-memory output device. Runs on plain Linux
+(no vJoy) and uses loopback networking only.
+
+The load generator runs in a separate process so the CPU numbers belong
+to the bridge alone.
+
+Usage:
+    python benchmark.py --clients 4 --rate 250 --duration 10
+    python benchmark.py --transport udp --profile wifi --protocol json
+    python benchmark.py --protocol batch --rate 100 --batch-size 5   # App.js batching
+    python benchmark.py --server-profile default   # websockets library defaults
+    python benchmark.py --compare benchmark-old.json benchmark-new.json
+
+Reports sustained messages/sec, bridge CPU per message and latency
+percentiles, and saves everything as JSON.
+"""
+
+import argparse
+import asyncio
+import io
+import json
+import math
+import multiprocessing
+import os
+import platform
+import random
+import socket
+import sys
+import time
+from datetime import datetime
+
+from bridge_log import BridgeLogger
+from metrics import QUANTILES, STAGES, Histogram
+from output_backends import RecordingBackend
+from protocol import (
+    CONTROL_PING, MAX_BATCH, SUBPROTOCOLS, decode_control, encode_batch, encode_binary,
+    encode_json, encode_pong,
+)
+from server_profiles import SERVER_PROFILES, install_fast_event_loop
+
+# Network condition presets: (jitter stddev in seconds, loss probability)
+PROFILES = {
+    "ideal": (0.0, 0.0),
+    "wifi": (0.004, 0.01),
+    "congested": (0.015, 0.05),
+}
+
+
+def free_port():
+    """Ask the OS for an unused TCP/UDP port on loopback."""
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+# ---------------------------------------------------------------------------
+# Load generator (runs in a child process)
+# ---------------------------------------------------------------------------
+
+async def simulate_phone(index, config, epoch, stop_at, stats):
+    """
+    One simulated phone: tilt sweep + gas/brake presses at a fixed rate.
+    With the batch protocol, `rate` is the sensor rate and every
+    `batch_size` samples go out as one frame (like App.js).
+    """
+    rng = random.Random(config["seed"] + index)
+    interval = 1.0 / config["rate"]
+    jitter, loss = config["jitter"], config["loss"]
+    binary = config["protocol"] in ("binary", "batch")
+    batch_size = config["batch_size"] if config["protocol"] == "batch" else 1
+    batch = []
+    port = config["port"]
+
+    if config["transport"] == "udp":
+        loop = asyncio.get_running_loop()
+        transport, _ = await loop.create_datagram_endpoint(
+            asyncio.DatagramProtocol, remote_addr=("127.0.0.1", port))
+        send = transport.sendto
+        close = transport.close
+    else:
+        import websockets
+        ws = await websockets.connect(
+            f"ws://127.0.0.1:{port}",
+            subprotocols=SUBPROTOCOLS if binary else None,
+            compression=None,
+        )
+
+        async def answer_pings():
+            # Clock sync: echo pings like App.js (client clock = perf_counter - epoch)
+            try:
+                async for message in ws:
+                    control = decode_control(message)
+                    if control is not None and control["type"] == CONTROL_PING:
+                        t_ms = (time.perf_counter() - epoch) * 1000.0
+                        await ws.send(encode_pong(control, t_ms, t_ms))
+            except websockets.exceptions.ConnectionClosed:
+                pass
+
+        responder = asyncio.get_running_loop().create_task(answer_pings())
+
+        async def send(payload):
+            await ws.send(payload)
+
+        async def close():
+            await ws.close()
+            await responder
+
+    seq = 0
+    next_send = time.perf_counter()
+    while time.perf_counter() < stop_at:
+        next_send += interval
+        delay = next_send - time.perf_counter() + (rng.gauss(0.0, jitter) if jitter else 0.0)
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+        # Slow left/right sweep (4 s period) with periodic pedal presses
+        y = math.sin(2 * math.pi * seq * interval / 4.0)
+        gas = (seq // 50) % 2 == 0
+        brake = (seq // 75) % 3 == 0
+        t_client = time.perf_counter() - epoch
+        seq += 1
+
+        if batch_size > 1:
+            batch.append((0.0, y, 0.98, gas, brake, t_client))
+            if len(batch) < batch_size:
+                continue
+            first_seq = seq - len(batch)
+            samples, batch = batch, []
+        if rng.random() >= loss:
+            if batch_size > 1:
+                payload = encode_batch(samples, first_seq)
+            elif binary:
+                payload = encode_binary(0.0, y, 0.98, gas, brake, seq - 1, t_client)
+            else:
+                payload = encode_json(0.0, y, 0.98, gas, brake, seq - 1, t_client)
+                if config["transport"] == "udp":
+                    payload = payload.encode("utf-8")
+            result = send(payload)
+            if asyncio.iscoroutine(result):
+                await result
+            stats["sent"] += batch_size
+            stats["frames"] += 1
+        else:
+            stats["dropped"] += batch_size
+
+    result = close()
+    if asyncio.iscoroutine(result):
+        await result
+
+
+async def run_load_async(config, epoch):
+    stats = {"sent": 0, "dropped": 0, "frames": 0}
+    stop_at = time.perf_counter() + config["duration"]
+    await asyncio.gather(*(
+        simulate_phone(i, config, epoch, stop_at, stats) for i in range(config["clients"])
+    ))
+    return stats
+
+
+def run_load(config, epoch, result_queue):
+    """Child process entry point."""
+    stats = asyncio.run(run_load_async(config, epoch))
+    result_queue.put(stats)
+
+
+# ---------------------------------------------------------------------------
+# Bridge side
+# ---------------------------------------------------------------------------
+
+def make_bridge(config, epoch):
+    """Create a SteeringWheelBridge that also records true one-way latency."""
+    from main import SteeringWheelBridge
+
+    class BenchmarkBridge(SteeringWheelBridge):
+        """Bridge with loopback-only latency probes (shared perf_counter clock)."""
+
+        def __init__(self, *args, **kwargs):
+            self.one_way = Histogram()
+            self.end_to_end = Histogram()
+            self._target_sent = {}
+            super().__init__(*args, **kwargs)
+            # Keep per-client metrics after disconnect so they can be reported
+            self.metrics.remove = lambda client_key: None
+
+        def handle_sample(self, client_key, sample):
+            sent = epoch + sample.t_client
+            self.one_way.observe(max(0.0, sample.t_arrival - sent))
+            super().handle_sample(client_key, sample)
+            self._target_sent[client_key] = sent
+
+        def flush_session(self, session, now):
+            written = super().flush_session(session, now)
+            sent = self._target_sent.get(session.client_key)
+            if written and sent is not None:
+                self.end_to_end.observe(max(0.0, time.perf_counter() - sent))
+            return written
+
+    class StallingBackend(RecordingBackend):
+        """Recording device with a simulated blocking driver call."""
+
+        def write_axes(self, steering, gas, brake):
+            time.sleep(config["driver_delay"])
+            super().write_axes(steering, gas, brake)
+
+    # One in-memory device per simulated phone (like one vJoy device per seat)
+    backend_class = StallingBackend if config.get("driver_delay") else RecordingBackend
+    backends = [backend_class(device_id=i + 1, maxlen=1000, log=lambda message: None)
+                for i in range(config["clients"])]
+    logger = BridgeLogger(stream=io.StringIO(), summary_interval=0)
+    return BenchmarkBridge(
+        host="127.0.0.1",
+        port=config["port"],
+        backend=backends,
+        udp_port=config["port"] if config["transport"] == "udp" else None,
+        output_rate_hz=config["output_rate"],
+        jitter_buffer=config.get("jitter_buffer"),
+        output_thread=config.get("output_thread", True),
+        server_profile=config.get("server_profile", "low_latency"),
+        logger=logger,
+    )
+
+
+def histogram_summary(histogram):
+    """Percentiles in milliseconds."""
+    summary = {"count": histogram.count}
+    for q in QUANTILES:
+        value = histogram.quantile(q)
+        summary[f"p{int(q * 100)}_ms"] = round(value * 1000, 4) if value is not None else None
+    summary["mean_ms"] = round(histogram.sum / histogram.count * 1000, 4) if histogram.count else None
+    return summary
+
+
+def merge_stage(bridge, stage):
+    merged = Histogram()
+    for client_metrics in bridge.metrics.clients.values():
+        histogram = client_metrics.stages[stage]
+        merged.counts = [a + b for a, b in zip(merged.counts, histogram.counts)]
+        merged.count += histogram.count
+        merged.sum += histogram.sum
+    return merged
+
+
+async def run_benchmark(config):
+    epoch = time.perf_counter()
+    bridge = make_bridge(config, epoch)
+    server = asyncio.create_task(bridge.start_server())
+    await asyncio.sleep(0.3)  # Let the listeners come up
+
+    result_queue = multiprocessing.Queue()
+    loader = multiprocessing.Process(target=run_load, args=(config, epoch, result_queue))
+
+    cpu_start = time.process_time()
+    wall_start = time.perf_counter()
+    samples_start = bridge.samples_received
+    loader.start()
+
+    while loader.is_alive():
+        await asyncio.sleep(0.1)
+    await asyncio.sleep(0.05)  # Drain in-flight samples
+
+    wall = time.perf_counter() - wall_start
+    cpu = time.process_time() - cpu_start
+    samples = bridge.samples_received - samples_start
+    try:
+        load_stats = result_queue.get(timeout=5)
+    except Exception:
+        load_stats = {}
+
+    server.cancel()
+    try:
+        await server
+    except asyncio.CancelledError:
+        pass
+    bridge.logger.stop()
+
+    lost = sum(m.tracker.lost for m in bridge.metrics.clients.values() if m.tracker)
+    reordered = sum(m.tracker.reordered for m in bridge.metrics.clients.values() if m.tracker)
+
+    return {
+        "config": config,
+        "environment": {
+            "python": platform.python_version(),
+            "implementation": platform.python_implementation(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+        },
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "results": {
+            "wall_seconds": round(wall, 3),
+            "messages_sent": load_stats.get("sent"),
+            "frames_sent": load_stats.get("frames"),
+            "messages_dropped_by_profile": load_stats.get("dropped"),
+            "messages_processed": samples,
+            "messages_per_second": round(samples / wall, 1) if wall else 0.0,
+            "cpu_seconds": round(cpu, 4),
+            "cpu_us_per_message": round(cpu / samples * 1e6, 2) if samples else None,
+            "output_writes": sum(output.write_count for output in bridge.sessions.backends.values()),
+            "output_writes_skipped": bridge.metrics.output_writes_skipped,
+            "packets_lost": lost,
+            "packets_reordered": reordered,
+            "latency": {
+                "one_way": histogram_summary(bridge.one_way),
+                "end_to_end": histogram_summary(bridge.end_to_end),
+                # "network" is the bridge's clock-synced estimate of one_way (WebSocket
+                # only; UDP has no sync, so it is relative to the fastest sample there)
+                **{stage: histogram_summary(merge_stage(bridge, stage)) for stage in STAGES},
+            },
+        },
+    }
+
+
+# ---------------------------------------------------------------------------
+# Reporting
+# ---------------------------------------------------------------------------
+
+def print_report(report):
+    config, results = report["config"], report["results"]
+    print("=" * 70)
+    print("🏁 STEERING WHEEL BRIDGE BENCHMARK")
+    print("=" * 70)
+    protocol = config["protocol"]
+    if protocol == "batch":
+        protocol += f" × {config['batch_size']}"
+    print(f"   Clients: {config['clients']} × {config['rate']} Hz "
+          f"({config['transport']}, {protocol}, profile={config['profile']})")
+    print(f"   Output rate: {config['output_rate']} Hz, duration: {config['duration']} s, "
+          f"writes on {'output thread' if config.get('output_thread', True) else 'event loop'}"
+          + (f", driver delay {config['driver_delay'] * 1000:g} ms" if config.get("driver_delay") else ""))
+    if "server_profile" in config:
+        print(f"   Server profile: {config['server_profile']}, event loop: {config.get('event_loop') or 'asyncio'}")
+    print("")
+    print(f"📨 Messages/sec:  {results['messages_per_second']}")
+    print(f"🧮 CPU/message:   {results['cpu_us_per_message']} µs")
+    print(f"🎮 Output writes: {results['output_writes']} "
+          f"({results.get('output_writes_skipped', 0)} skipped, unchanged)")
+    print(f"📉 Lost/reordered: {results['packets_lost']}/{results['packets_reordered']}")
+    print("")
+    print(f"   {'stage':<12}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'count':>10}")
+    for stage, summary in results["latency"].items():
+        print(f"   {stage:<12}{summary['p50_ms'] or 0:>10.3f}{summary['p95_ms'] or 0:>10.3f}"
+              f"{summary['p99_ms'] or 0:>10.3f}{summary['count']:>10}")
+    print("=" * 70)
+
+
+def compare_reports(old_path, new_path):
+    """Print the key numbers of two saved runs side by side."""
+    with open(old_path) as f:
+        old = json.load(f)["results"]
+    with open(new_path) as f:
+        new = json.load(f)["results"]
+
+    def row(name, a, b):
+        if a is None or b is None:
+            print(f"   {name:<28}{a!s:>12}{b!s:>12}")
+            return
+        change = (b - a) / a * 100 if a else 0.0
+        print(f"   {name:<28}{a:>12}{b:>12}{change:>+9.1f}%")
+
+    print(f"   {'metric':<28}{'old':>12}{'new':>12}{'change':>10}")
+    row("messages_per_second", old["messages_per_second"], new["messages_per_second"])
+    row("cpu_us_per_message", old["cpu_us_per_message"], new["cpu_us_per_message"])
+    row("output_writes", old["output_writes"], new["output_writes"])
+    row("output_writes_skipped", old.get("output_writes_skipped", 0), new.get("output_writes_skipped", 0))
+    for stage in new["latency"]:
+        for key in ("p50_ms", "p99_ms"):
+            row(f"{stage}.{key}", old["latency"].get(stage, {}).get(key), new["latency"][stage].get(key))
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the steering wheel bridge on loopback.")
+    parser.add_argument("--clients", type=int, default=1, help="Simulated phones (default: 1)")
+    parser.add_argument("--rate", type=float, default=20, help="Messages/sec per phone, 20-1000 (default: 20)")
+    parser.add_argument("--duration", type=float, default=10, help="Seconds of load (default: 10)")
+    parser.add_argument("--transport", choices=("ws", "udp"), default="ws")
+    parser.add_argument("--protocol", choices=("binary", "batch", "json"), default="binary",
+                        help="binary (v2 frames), batch (v3 multi-sample frames) or json")
+    parser.add_argument("--batch-size", type=int, default=5,
+                        help=f"Samples per frame with --protocol batch, 2-{MAX_BATCH} (default: 5)")
+    parser.add_argument("--profile", choices=sorted(PROFILES), default="ideal",
+                        help="Network jitter/loss preset (default: ideal)")
+    parser.add_argument("--jitter", type=float, help="Override send jitter stddev in ms")
+    parser.add_argument("--loss", type=float, help="Override loss probability (0-1)")
+    parser.add_argument("--output-rate", type=int, default=250, help="Bridge output rate in Hz")
+    parser.add_argument("--jitter-buffer", choices=["low_latency", "smooth"],
+                        help="Enable the bridge jitter buffer with this preset")
+    parser.add_argument("--server-profile", choices=sorted(SERVER_PROFILES), default="low_latency",
+                        help="WebSocket transport settings of the bridge (default: low_latency)")
+    parser.add_argument("--output-on-loop", action="store_true",
+                        help="Write devices on the event loop instead of the output thread")
+    parser.add_argument("--driver-delay", type=float, default=0.0,
+                        help="Simulated blocking time per device write in ms (default: 0)")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="JSON result file (default: benchmark-<time>.json)")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"), help="Compare two result files")
+    args = parser.parse_args(argv)
+    if not 2 <= args.batch_size <= MAX_BATCH:
+        parser.error(f"--batch-size must be between 2 and {MAX_BATCH}")
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.compare:
+        compare_reports(*args.compare)
+        return
+
+    jitter, loss = PROFILES[args.profile]
+    config = {
+        "clients": args.clients,
+        "rate": args.rate,
+        "duration": args.duration,
+        "transport": args.transport,
+        "protocol": args.protocol,
+        "batch_size": args.batch_size,
+        "profile": args.profile,
+        "jitter": args.jitter / 1000.0 if args.jitter is not None else jitter,
+        "loss": args.loss if args.loss is not None else loss,
+        "output_rate": args.output_rate,
+        "jitter_buffer": args.jitter_buffer,
+        "output_thread": not args.output_on_loop,
+        "driver_delay": args.driver_delay / 1000.0,
+        "server_profile": args.server_profile,
+        "event_loop": install_fast_event_loop(args.server_profile),
+        "seed": args.seed,
+        "port": free_port(),
+    }
+
+    report = asyncio.run(run_benchmark(config))
+    print_report(report)
+
+    output = args.output or f"benchmark-{datetime.now().strftime('%Y%m%d-%H%M%S')}.json"
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"💾 Saved: {output}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
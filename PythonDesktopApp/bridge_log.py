@@ -0,0 +1,146 @@
+"""
+Non-blocking Logging for the Steering Wheel Bridge
+Console output is slow (milliseconds per line on Windows consoles), so log
+calls only enqueue a record and a background thread does the formatting
+and writing.
+
+- Per-category rate caps, e.g. at most one "wheel" status line per second.
+  Check allow(category) before building an expensive message.
+- Periodic summary lines from a callback (packet rates etc.).
+"""
+
+import atexit
+import queue
+import sys
+import threading
+import time
+from datetime import datetime
+
+# Default per-category caps: minimum seconds between two lines
+DEFAULT_RATE_LIMITS = {
+    "wheel": 1.0,
+    "stall": 1.0,
+    "resume": 1.0,
+    "rejected": 5.0,
+}
+
+
+class BridgeLogger:
+    """Queue-based logger with a background writer thread."""
+
+    def __init__(self, stream=None, rate_limits=None, summary_interval=10.0,
+                 summary_provider=None):
+        """
+        Args:
+            stream: Output stream (default: sys.stdout)
+            rate_limits: {category: min seconds between lines}
+            summary_interval: Seconds between summary lines (0 = off)
+            summary_provider: Callable returning a summary string (or None)
+        """
+        self.stream = stream or sys.stdout
+        self.rate_limits = dict(DEFAULT_RATE_LIMITS if rate_limits is None else rate_limits)
+        self.summary_interval = summary_interval
+        self.summary_provider = summary_provider
+
+        self._queue = queue.SimpleQueue()
+        self._last_emit = {}
+        self._thread = None
+
+    def start(self):
+        """Start the writer thread (idempotent)."""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="bridge-log", daemon=True)
+            self._thread.start()
+            atexit.register(self.stop)
+        return self
+
+    def stop(self):
+        """Flush pending records and stop the writer thread."""
+        if self._thread is None:
+            return
+        self._queue.put(None)
+        self._thread.join(timeout=2.0)
+        self._thread = None
+
+    def allow(self, category):
+        """
+        Rate-cap check for a category. Returns True if a line may be logged
+        now (and reserves the slot). Uncapped categories are always allowed.
+
+        "name:detail" categories (e.g. "wheel:2") use the limit of "name"
+        but keep their own slot.
+        """
+        interval = self.rate_limits.get(category)
+        if interval is None and ":" in category:
+            interval = self.rate_limits.get(category.split(":", 1)[0])
+        if not interval:
+            return True
+        now = time.monotonic()
+        last = self._last_emit.get(category)
+        if last is not None and now - last < interval:
+            return False
+        self._last_emit[category] = now
+        return True
+
+    def log(self, message, category=None):
+        """Enqueue a message. With a category, the rate cap is applied first."""
+        if category is not None and not self.allow(category):
+            return
+        if self._thread is None:
+            self._write([(time.time(), message)])
+        else:
+            self._queue.put((time.time(), message))
+
+    __call__ = log
+
+    def _write(self, records):
+        lines = []
+        for timestamp, message in records:
+            stamp = datetime.fromtimestamp(timestamp).strftime("%H:%M:%S")
+            lines.append(f"[{stamp}] {message}\n")
+        try:
+            self.stream.write("".join(lines))
+            self.stream.flush()
+        except (OSError, ValueError, UnicodeEncodeError):
+            pass
+
+    def _run(self):
+        next_summary = time.monotonic() + self.summary_interval if self.summary_interval else None
+
+        while True:
+            timeout = None
+            if next_summary is not None:
+                timeout = max(0.0, next_summary - time.monotonic())
+
+            try:
+                record = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                record = ()
+
+            # Drain everything that is queued and write it in one go
+            records = []
+            stop = False
+            while True:
+                if record is None:
+                    stop = True
+                elif record:
+                    records.append(record)
+                try:
+                    record = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+
+            if next_summary is not None and time.monotonic() >= next_summary:
+                next_summary += self.summary_interval
+                if self.summary_provider is not None:
+                    try:
+                        summary = self.summary_provider()
+                    except Exception as e:
+                        summary = f"⚠️  Summary failed: {e}"
+                    if summary:
+                        records.append((time.time(), summary))
+
+            if records:
+                self._write(records)
+            if stop:
+                return
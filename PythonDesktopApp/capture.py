@@ -0,0 +1,466 @@
+"""
+Session Capture and Replay
+Records every inbound sample and every output write of the bridge to a
+compact binary file, and replays such a file through the same pipeline.
+
+Recording is optional (SteeringWheelBridge(capture_path=...)). The event
+loop only enqueues a tuple per event; a background thread packs the
+records and writes them in buffered batches.
+
+File layout (little-endian):
+
+    header (32 bytes)
+      offset  size  type     field
+      0       8     bytes    magic b"SWCAP\\x00\\x00\\x01"
+      8       2     uint16   record size
+      10      6     -        reserved
+      16      8     float64  capture start, wall clock (time.time)
+      24      8     float64  capture start, time.perf_counter
+
+    records (fixed size, RECORD)
+      0       1     uint8    kind (KIND_*)
+      1       1     uint8    flags (bit0 gas, bit1 brake, bit2 has seq, bit3 has t_client,
+                                    bit4 sample came in a multi-sample frame)
+      2       2     uint16   client number (per capture)
+      4       2     uint16   output device ID
+      6       2     uint16   sequence number
+      8       8     float64  time (seconds since capture start)
+      16      8     float64  sample: client clock / write: arrival of the written sample
+      24      12    float32  x, y, z (raw sample values)
+      36      6     uint16   steering, gas, brake (axis values written)
+
+Usage:
+    python capture.py info session.swcap
+    python capture.py replay session.swcap --fast --filter kalman
+    python capture.py replay session.swcap --fast --steering-curve exponent=1.5
+"""
+
+import argparse
+import asyncio
+import atexit
+import collections
+import contextlib
+import io
+import mmap
+import queue
+import struct
+import sys
+import threading
+import time
+
+from protocol import BUTTON_BRAKE, BUTTON_GAS, Sample, SequenceTracker
+
+MAGIC = b"SWCAP\x00\x00\x01"
+HEADER = struct.Struct("<8sH6xdd")
+RECORD = struct.Struct("<BBHHHddfffHHH")
+
+KIND_CONNECT = 1
+KIND_SAMPLE = 2
+KIND_WRITE = 3
+KIND_DISCONNECT = 4
+
+KIND_NAMES = {
+    KIND_CONNECT: "connect",
+    KIND_SAMPLE: "sample",
+    KIND_WRITE: "write",
+    KIND_DISCONNECT: "disconnect",
+}
+
+FLAG_HAS_SEQ = 0x04
+FLAG_HAS_T_CLIENT = 0x08
+FLAG_BATCHED = 0x10
+
+CaptureRecord = collections.namedtuple(
+    "CaptureRecord",
+    "kind flags client device_id seq t t_ref x y z steering gas brake",
+)
+
+
+class CaptureRecorder:
+    """Buffered binary capture writer with a background thread."""
+
+    def __init__(self, path, flush_interval=0.5):
+        """
+        Args:
+            path: Capture file (overwritten)
+            flush_interval: Max seconds before queued records reach the file
+        """
+        self.path = path
+        self.flush_interval = flush_interval
+        self.records = 0
+        self._clients = {}  # client_key -> client number
+        self._queue = queue.SimpleQueue()
+        self._thread = None
+        self._start = time.perf_counter()
+        self._file = open(path, "wb")
+        self._file.write(HEADER.pack(MAGIC, RECORD.size, time.time(), self._start))
+
+    def start(self):
+        """Start the writer thread (idempotent)."""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="bridge-capture", daemon=True)
+            self._thread.start()
+            atexit.register(self.stop)
+        return self
+
+    def stop(self):
+        """Write pending records and close the file."""
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join(timeout=2.0)
+            self._thread = None
+        if not self._file.closed:
+            self._file.close()
+
+    def _client_number(self, client_key):
+        number = self._clients.get(client_key)
+        if number is None:
+            number = self._clients[client_key] = len(self._clients) % 0x10000
+        return number
+
+    def record_connect(self, client_key, device_id):
+        self._queue.put((KIND_CONNECT, 0, self._client_number(client_key), device_id, 0,
+                         time.perf_counter() - self._start, 0.0, 0.0, 0.0, 0.0, 0, 0, 0))
+
+    def record_disconnect(self, client_key, device_id):
+        self._queue.put((KIND_DISCONNECT, 0, self._client_number(client_key), device_id, 0,
+                         time.perf_counter() - self._start, 0.0, 0.0, 0.0, 0.0, 0, 0, 0))
+
+    def record_sample(self, client_key, device_id, sample):
+        """Record a raw sample (before filtering) with its arrival time."""
+        flags = (BUTTON_GAS if sample.gas else 0) | (BUTTON_BRAKE if sample.brake else 0)
+        if sample.seq is not None:
+            flags |= FLAG_HAS_SEQ
+        if sample.t_client is not None:
+            flags |= FLAG_HAS_T_CLIENT
+        if sample.batch > 1:
+            flags |= FLAG_BATCHED
+        arrival = sample.t_arrival if sample.t_arrival is not None else time.perf_counter()
+        self._queue.put((KIND_SAMPLE, flags, self._client_number(client_key), device_id,
+                         sample.seq or 0, arrival - self._start, sample.t_client or 0.0,
+                         sample.x, sample.y, sample.z, 0, 0, 0))
+
+    def record_write(self, client_key, device_id, steering, gas, brake, written, arrival=None):
+        """Record the axis values written to a device."""
+        t_ref = arrival - self._start if arrival is not None else 0.0
+        self._queue.put((KIND_WRITE, 0, self._client_number(client_key), device_id, 0,
+                         written - self._start, t_ref, 0.0, 0.0, 0.0, steering, gas, brake))
+
+    def _run(self):
+        pack = RECORD.pack
+        while True:
+            try:
+                record = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                continue
+
+            # Drain everything that is queued and write it in one go
+            chunks = []
+            stop = False
+            while True:
+                if record is None:
+                    stop = True
+                else:
+                    chunks.append(pack(*record))
+                try:
+                    record = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+
+            if chunks:
+                try:
+                    self._file.write(b"".join(chunks))
+                    self._file.flush()
+                    self.records += len(chunks)
+                except (OSError, ValueError):
+                    pass
+            if stop:
+                return
+
+
+class CaptureReader:
+    """Memory-mapped, random-access view of a capture file."""
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, "rb")
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            self._file.close()
+            raise ValueError(f"{path}: empty capture file")
+
+        if len(self._map) < HEADER.size:
+            self.close()
+            raise ValueError(f"{path}: truncated header")
+        magic, record_size, self.start_wall, self.start_perf = HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC or record_size != RECORD.size:
+            self.close()
+            raise ValueError(f"{path}: not a steering wheel capture (or unsupported version)")
+        # A trailing partial record (crash while writing) is ignored
+        self.count = (len(self._map) - HEADER.size) // RECORD.size
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, index):
+        if not -self.count <= index < self.count:
+            raise IndexError(index)
+        index %= self.count
+        return CaptureRecord._make(RECORD.unpack_from(self._map, HEADER.size + index * RECORD.size))
+
+    def __iter__(self):
+        # unpack_from straight from the map: no copy, no exported buffers
+        unpack_from = RECORD.unpack_from
+        make = CaptureRecord._make
+        data = self._map
+        for offset in range(HEADER.size, HEADER.size + self.count * RECORD.size, RECORD.size):
+            yield make(unpack_from(data, offset))
+
+    def close(self):
+        if getattr(self, "_map", None) is not None:
+            self._map.close()
+            self._map = None
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def record_to_sample(record):
+    """Rebuild the protocol.Sample of a KIND_SAMPLE record."""
+    return Sample(
+        record.x, record.y, record.z,
+        bool(record.flags & BUTTON_GAS), bool(record.flags & BUTTON_BRAKE),
+        record.seq if record.flags & FLAG_HAS_SEQ else None,
+        record.t_ref if record.flags & FLAG_HAS_T_CLIENT else None,
+        2 if record.flags & FLAG_BATCHED else 1,
+    )
+
+
+def recorded_outputs(reader):
+    """
+    First recorded write for every recorded sample.
+
+    Returns:
+        {(client, sample time): (steering, gas, brake)}
+    """
+    outputs = {}
+    for record in reader:
+        if record.kind == KIND_WRITE and record.t_ref:
+            outputs.setdefault((record.client, record.t_ref), (record.steering, record.gas, record.brake))
+    return outputs
+
+
+async def replay_capture(bridge, reader, realtime=True, speed=1.0, compare=False):
+    """
+    Feed a capture through a bridge's pipeline.
+
+    Clients are admitted on their recorded device (when it is in the
+    bridge's pool) as "replay://<n>". In real-time mode the records are
+    paced by their timestamps and the bridge's output loop writes at its
+    normal rate. Otherwise samples are fed as fast as possible (arrival
+    times keep their recorded spacing) and the output is flushed after
+    every sample.
+
+    Args:
+        bridge: SteeringWheelBridge (usually with RecordingBackend devices)
+        reader: CaptureReader
+        realtime: Pace records by their timestamps
+        speed: Real-time speed factor (2.0 = twice as fast)
+        compare: Fast mode only - compare each replayed write with the
+                 write recorded for the same sample
+
+    Returns:
+        {"samples": n, "writes": n, "elapsed": seconds} plus, with compare,
+        "compared", "steering_max_diff", "steering_mean_diff" and
+        "button_mismatches"
+    """
+    expected = recorded_outputs(reader) if compare and not realtime else None
+    compared = 0
+    steering_diff_sum = 0
+    steering_diff_max = 0
+    button_mismatches = 0
+
+    output_task = None
+    if realtime:
+        output_task = asyncio.get_running_loop().create_task(bridge.output_loop())
+
+    samples = 0
+    writes = 0
+    started = time.perf_counter()
+    first_t = None
+    last_record_t = None
+    arrival = None
+    try:
+        for record in reader:
+            client_key = f"replay://{record.client}"
+
+            if realtime:
+                if first_t is None:
+                    first_t = record.t
+                delay = started + (record.t - first_t) / speed - time.perf_counter()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+
+            if record.kind == KIND_CONNECT:
+                open_replay_session(bridge, client_key, record.device_id)
+            elif record.kind == KIND_DISCONNECT:
+                bridge.forget_client(client_key)
+            elif record.kind == KIND_SAMPLE:
+                session = bridge.sessions.get(client_key)
+                if session is None:
+                    # Capture started while the client was connected
+                    session = open_replay_session(bridge, client_key, record.device_id)
+                sample = record_to_sample(record)
+                if realtime:
+                    # Samples of one message keep sharing one arrival time
+                    if record.t != last_record_t:
+                        arrival = time.perf_counter()
+                        last_record_t = record.t
+                    sample.t_arrival = arrival
+                else:
+                    # Keep the recorded arrival spacing so filters see real timing
+                    if first_t is None:
+                        first_t = record.t
+                    sample.t_arrival = started + (record.t - first_t)
+                bridge.handle_sample(client_key, sample)
+                samples += 1
+                if realtime:
+                    continue
+
+                writes += bridge.flush_output()
+                target = expected.get((record.client, record.t)) if expected else None
+                if target is not None and session is not None:
+                    steering, gas, brake = target
+                    diff = abs(session.current_steering - steering)
+                    steering_diff_sum += diff
+                    steering_diff_max = max(steering_diff_max, diff)
+                    if session.current_gas != gas or session.current_brake != brake:
+                        button_mismatches += 1
+                    compared += 1
+    finally:
+        if output_task is not None:
+            output_task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await output_task
+
+    result = {"samples": samples, "writes": writes, "elapsed": time.perf_counter() - started}
+    if expected is not None:
+        result.update({
+            "compared": compared,
+            "steering_max_diff": steering_diff_max,
+            "steering_mean_diff": steering_diff_sum / compared if compared else 0.0,
+            "button_mismatches": button_mismatches,
+        })
+    return result
+
+
+def open_replay_session(bridge, client_key, device_id):
+    """Admit a replayed client on its recorded device if the pool has it."""
+    if device_id in bridge.sessions.backends:
+        bridge.sessions.assignments[client_key] = device_id
+    return bridge.open_session(client_key, client_key, SequenceTracker())
+
+
+def print_info(reader):
+    counts = collections.Counter(record.kind for record in reader)
+    clients = {record.client for record in reader}
+    devices = sorted({record.device_id for record in reader if record.kind == KIND_CONNECT})
+    duration = reader[-1].t - reader[0].t if len(reader) else 0.0
+
+    print("=" * 70)
+    print(f"🎞️  CAPTURE: {reader.path}")
+    print("=" * 70)
+    print(f"🕒 Started:  {time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(reader.start_wall))}")
+    print(f"⏱️  Duration: {duration:.1f} s")
+    print(f"📱 Clients:  {len(clients)}  (devices: {', '.join(f'#{d}' for d in devices) or '-'})")
+    for kind, name in KIND_NAMES.items():
+        print(f"   {name:<12} {counts.get(kind, 0)}")
+    print("=" * 70)
+
+
+def run_replay(args):
+    from bridge_log import BridgeLogger
+    from main import SteeringWheelBridge
+    from output_backends import RecordingBackend
+
+    with CaptureReader(args.capture) as reader:
+        device_ids = sorted({record.device_id for record in reader
+                             if record.kind in (KIND_CONNECT, KIND_SAMPLE)}) or [1]
+        filter_params = parse_params(args.filter_param)
+
+        bridge = SteeringWheelBridge(
+            backend=[RecordingBackend(device_id=device_id, log=lambda message: None)
+                     for device_id in device_ids],
+            output_rate_hz=args.output_rate,
+            logger=BridgeLogger(stream=None if args.verbose else io.StringIO(), summary_interval=0),
+            steering_filter=args.filter,
+            steering_filter_params=filter_params,
+            prediction_horizon=args.prediction / 1000.0 if args.prediction else None,
+            steering_curve=parse_params(args.steering_curve),
+            # Interpolation and the input watchdog need real time between ticks
+            resample=not args.fast,
+            input_timeout=None if args.fast else 0.15,
+        )
+        result = asyncio.run(replay_capture(bridge, reader, realtime=not args.fast,
+                                            speed=args.speed, compare=args.fast))
+        bridge.logger.stop()
+
+    elapsed = result["elapsed"]
+    print(f"▶️  Replayed {result['samples']} samples in {elapsed:.2f} s "
+          f"({result['samples'] / max(elapsed, 1e-9):.0f} samples/s)")
+    if "compared" in result:
+        print(f"🔍 Compared {result['compared']} writes with the recording:")
+        print(f"   steering diff: max {result['steering_max_diff']}, "
+              f"mean {result['steering_mean_diff']:.1f} (axis units)")
+        print(f"   gas/brake mismatches: {result['button_mismatches']}")
+
+
+def parse_params(items):
+    """["name=1.5", ...] -> {"name": 1.5}"""
+    params = {}
+    for item in items or []:
+        name, _, value = item.partition("=")
+        params[name] = float(value)
+    return params
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Inspect or replay a steering wheel capture")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    info = commands.add_parser("info", help="Show capture contents")
+    info.add_argument("capture")
+
+    replay = commands.add_parser("replay", help="Feed a capture through the bridge pipeline")
+    replay.add_argument("capture")
+    replay.add_argument("--fast", action="store_true",
+                        help="As fast as possible and compare with the recorded writes "
+                             "(multi-sample frames are not resampled)")
+    replay.add_argument("--speed", type=float, default=1.0, help="Real-time speed factor")
+    replay.add_argument("--filter", default="none", help="Steering filter (none, one_euro, kalman)")
+    replay.add_argument("--filter-param", action="append", metavar="NAME=VALUE",
+                        help="Steering filter parameter (repeatable)")
+    replay.add_argument("--steering-curve", action="append", metavar="NAME=VALUE",
+                        help="Steering response curve parameter, e.g. deadzone=0.05 (repeatable)")
+    replay.add_argument("--prediction", type=float, help="Prediction horizon in ms")
+    replay.add_argument("--output-rate", type=int, default=250, help="Output rate in Hz")
+    replay.add_argument("--verbose", action="store_true", help="Show bridge log output")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.command == "info":
+        with CaptureReader(args.capture) as reader:
+            print_info(reader)
+    else:
+        run_replay(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,185 @@
+"""
+Clock Synchronization
+NTP-style offset and drift estimation between a client clock and the
+bridge clock (time.perf_counter()).
+
+The bridge sends a ping over the client's WebSocket and the app echoes it
+with its own receive/send times:
+
+    server → {"type": "ping", "id": 7, "t0": <server ms>}
+    client → {"type": "pong", "id": 7, "t0": <echoed>, "t1": <client ms>, "t2": <client ms>}
+
+With t3 = server time when the pong arrives:
+
+    offset = ((t1 - t0) + (t2 - t3)) / 2     client clock - server clock
+    rtt    = (t3 - t0) - (t2 - t1)
+
+Exchanges with a round trip close to the best one seen are the most
+symmetric, so the offset comes from the lowest-RTT exchange in a sliding
+window and the drift from a least-squares fit over the good exchanges.
+After a short burst at connect, the clock is resynced periodically.
+
+BaseTransit is the sync-free alternative used by the jitter buffer and the
+resampler: the smallest (arrival - client time) seen recently, i.e. the
+clock offset plus the fastest network path.
+"""
+
+import collections
+
+# Clock rates of phones and PCs differ by tens of ppm; anything far beyond
+# this is a fitting artifact
+MAX_DRIFT = 500e-6
+
+
+class BaseTransit:
+    """Windowed minimum of the transit time (arrival - client time)."""
+
+    def __init__(self, window=5.0):
+        """
+        Args:
+            window: Seconds per window; the minimum covers the current and
+                the previous window, so route changes are picked up
+        """
+        self.window = window
+        self.reset()
+
+    def update(self, transit, arrival):
+        """
+        Add a transit measured at `arrival`.
+
+        Returns:
+            Minimum transit over the current and the previous window
+        """
+        if self._window_end is None or arrival >= self._window_end:
+            self._previous = self._current
+            self._current = None
+            self._window_end = arrival + self.window
+        if self._current is None or transit < self._current:
+            self._current = transit
+        if self._previous is None:
+            return self._current
+        return min(self._current, self._previous)
+
+    def reset(self):
+        self._current = None
+        self._previous = None
+        self._window_end = None
+
+
+class ClockSync:
+    """Offset/drift estimate for one client."""
+
+    def __init__(self, burst=5, burst_interval=0.2, interval=10.0, window=8,
+                 rtt_tolerance=1.5, timeout=5.0):
+        """
+        Args:
+            burst: Pings sent right after connecting
+            burst_interval: Seconds between burst pings
+            interval: Seconds between resync pings after the burst
+            window: Exchanges kept for the offset/drift estimate
+            rtt_tolerance: Exchanges with rtt <= best * tolerance are used for drift
+            timeout: Seconds before an unanswered ping is forgotten
+        """
+        self.burst = burst
+        self.burst_interval = burst_interval
+        self.interval = interval
+        self.rtt_tolerance = rtt_tolerance
+        self.timeout = timeout
+
+        self.exchanges = collections.deque(maxlen=window)  # (server time, offset, rtt)
+        self.offset = None   # Client clock - server clock at ref_time (seconds)
+        self.drift = 0.0     # d(offset)/dt (seconds per second)
+        self.rtt = None      # Round trip of the exchange the offset came from
+        self.ref_time = None
+        self.pings_sent = 0
+        self.pongs_received = 0
+
+        self._pending = {}   # ping id -> t0 (server seconds)
+        self._next_id = 0
+
+    @property
+    def synced(self):
+        return self.offset is not None
+
+    def next_delay(self):
+        """Seconds to wait before the next ping."""
+        return self.burst_interval if self.pings_sent < self.burst else self.interval
+
+    def make_ping(self, now):
+        """
+        Start an exchange at server time `now` (seconds).
+
+        Returns:
+            (ping id, t0 in ms) for protocol.encode_ping()
+        """
+        # Forget pings that were never answered
+        for ping_id, t0 in list(self._pending.items()):
+            if now - t0 > self.timeout:
+                del self._pending[ping_id]
+
+        self._next_id = (self._next_id + 1) & 0xFFFF
+        self._pending[self._next_id] = now
+        self.pings_sent += 1
+        return self._next_id, now * 1000.0
+
+    def on_pong(self, pong, now):
+        """
+        Complete an exchange.
+
+        Args:
+            pong: Decoded pong message (dict with id, t1, t2 in client ms)
+            now: Server time (seconds) when the pong arrived
+
+        Returns:
+            True if the exchange was used
+        """
+        ping_id = pong.get("id")
+        if not isinstance(ping_id, int):
+            return False
+        t0 = self._pending.pop(ping_id, None)
+        if t0 is None:
+            return False
+        try:
+            t1 = float(pong["t1"]) / 1000.0
+            t2 = float(pong["t2"]) / 1000.0
+        except (KeyError, TypeError, ValueError):
+            return False
+
+        rtt = (now - t0) - (t2 - t1)
+        if rtt < 0.0:
+            return False
+        offset = ((t1 - t0) + (t2 - now)) / 2.0
+        self.pongs_received += 1
+        self.exchanges.append(((t0 + now) / 2.0, offset, rtt))
+        self._fit()
+        return True
+
+    def _fit(self):
+        best = min(self.exchanges, key=lambda exchange: exchange[2])
+        self.ref_time, self.offset, self.rtt = best
+
+        good = [(t, offset) for t, offset, rtt in self.exchanges
+                if rtt <= best[2] * self.rtt_tolerance]
+        if len(good) < 2 or good[-1][0] - good[0][0] < 1.0:
+            return  # Keep the previous drift estimate
+        mean_t = sum(t for t, _ in good) / len(good)
+        mean_o = sum(o for _, o in good) / len(good)
+        num = sum((t - mean_t) * (o - mean_o) for t, o in good)
+        den = sum((t - mean_t) ** 2 for t, _ in good)
+        if den > 0.0:
+            self.drift = max(-MAX_DRIFT, min(MAX_DRIFT, num / den))
+
+    def offset_at(self, server_time):
+        """Client - server offset (seconds) at a server time."""
+        return self.offset + self.drift * (server_time - self.ref_time)
+
+    def to_server_time(self, t_client):
+        """Translate a client timestamp (seconds) into server time."""
+        approx = t_client - self.offset
+        return t_client - self.offset_at(approx)
+
+    def summary(self):
+        if not self.synced:
+            return "not synced"
+        return (f"offset {self.offset * 1000:+.1f} ms, rtt {self.rtt * 1000:.1f} ms, "
+                f"drift {self.drift * 1e6:+.1f} ppm")
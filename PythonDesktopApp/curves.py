@@ -0,0 +1,215 @@
+"""
+Response Curves
+Configurable input → axis mapping, precompiled into lookup tables.
+
+A curve shapes the magnitude of an input value:
+
+    deadzone     inputs below this magnitude map to neutral
+    saturation   inputs at/above this magnitude map to full deflection
+    exponent     1.0 = linear, > 1 = finer control near center,
+                 < 1 = more responsive near center
+    points       optional piecewise-linear curve [(in, out), ...] over 0..1,
+                 used instead of the exponent
+    gain_negative / gain_positive
+                 per-direction output gain (e.g. a car that pulls left)
+
+Each curve is compiled once into an array('H') of axis values over the
+quantized input range, so mapping a sample is one multiply and one index.
+Tables are rebuilt only when a parameter changes (configure()).
+
+Steering curves are bipolar (-1..+1 → AXIS_MIN..AXIS_MAX around center),
+pedal curves unipolar (0..1 → AXIS_MIN..AXIS_MAX).
+"""
+
+from array import array
+
+from output_backends import AXIS_MAX, AXIS_MIN
+
+# Default table sizes (input steps); bipolar matches the 16-bit axis range
+BIPOLAR_RESOLUTION = AXIS_MAX - AXIS_MIN
+UNIPOLAR_RESOLUTION = 1024
+
+CURVE_PARAMS = ("deadzone", "saturation", "exponent", "points", "gain_negative", "gain_positive")
+
+
+class ResponseCurve:
+    """Input shaping for one axis, compiled into a lookup table."""
+
+    def __init__(self, bipolar=True, deadzone=0.0, saturation=1.0, exponent=1.0,
+                 points=None, gain_negative=1.0, gain_positive=1.0, resolution=None):
+        """
+        Args:
+            bipolar: True for -1..+1 input (steering), False for 0..1 (pedals)
+            deadzone: Magnitude below which the output is neutral (0..1)
+            saturation: Magnitude at which the output is full (deadzone..1)
+            exponent: Linearity exponent applied after deadzone/saturation
+            points: Piecewise-linear [(in, out), ...] over 0..1 (overrides exponent)
+            gain_negative: Output gain for negative inputs (bipolar only)
+            gain_positive: Output gain for positive inputs
+            resolution: Input steps in the table (default: BIPOLAR/UNIPOLAR_RESOLUTION)
+        """
+        self.bipolar = bipolar
+        self.resolution = resolution or (BIPOLAR_RESOLUTION if bipolar else UNIPOLAR_RESOLUTION)
+        self.deadzone = 0.0
+        self.saturation = 1.0
+        self.exponent = 1.0
+        self.points = None
+        self.gain_negative = 1.0
+        self.gain_positive = 1.0
+        self.table = None
+        self.configure(deadzone=deadzone, saturation=saturation, exponent=exponent,
+                       points=points, gain_negative=gain_negative, gain_positive=gain_positive)
+
+    def configure(self, **params):
+        """
+        Change curve parameters; the table is rebuilt only if one changed.
+
+        Returns:
+            True if the table was rebuilt
+        """
+        unknown = set(params) - set(CURVE_PARAMS)
+        if unknown:
+            raise ValueError(f"Unknown curve parameter(s): {', '.join(sorted(unknown))}")
+
+        if "points" in params and params["points"] is not None:
+            params["points"] = tuple(sorted((float(x), float(y)) for x, y in params["points"]))
+        changed = {name: value for name, value in params.items() if getattr(self, name) != value}
+        if not changed and self.table is not None:
+            return False
+
+        # Check the full new parameter set first: a rejected update leaves
+        # the curve and its table untouched
+        candidate = {name: getattr(self, name) for name in CURVE_PARAMS}
+        candidate.update(changed)
+        self._validate(candidate)
+
+        for name, value in changed.items():
+            setattr(self, name, value)
+        self._compile()
+        return True
+
+    @staticmethod
+    def _validate(params):
+        deadzone = params["deadzone"]
+        if not 0.0 <= deadzone < 1.0:
+            raise ValueError(f"deadzone must be in [0, 1), got {deadzone}")
+        if not deadzone < params["saturation"] <= 1.0:
+            raise ValueError(f"saturation must be in (deadzone, 1], got {params['saturation']}")
+        if params["exponent"] <= 0.0:
+            raise ValueError(f"exponent must be > 0, got {params['exponent']}")
+        if params["points"] is not None:
+            if len(params["points"]) < 2:
+                raise ValueError("points needs at least two (in, out) pairs")
+            for x, y in params["points"]:
+                if not (0.0 <= x <= 1.0 and 0.0 <= y <= 1.0):
+                    raise ValueError(f"points must be (in, out) pairs in [0, 1], got ({x:g}, {y:g})")
+        for name in ("gain_negative", "gain_positive"):
+            if params[name] < 0.0:
+                raise ValueError(f"{name} must be >= 0, got {params[name]}")
+
+    def shape(self, magnitude):
+        """Curve output (0..1) for an input magnitude (0..1), before gain."""
+        if magnitude <= self.deadzone:
+            return 0.0
+        m = min(1.0, (magnitude - self.deadzone) / (self.saturation - self.deadzone))
+
+        points = self.points
+        if points is None:
+            return m ** self.exponent
+        if m <= points[0][0]:
+            return points[0][1]
+        for (x0, y0), (x1, y1) in zip(points, points[1:]):
+            if m <= x1:
+                return y0 + (y1 - y0) * (m - x0) / (x1 - x0) if x1 > x0 else y1
+        return points[-1][1]
+
+    def _compile(self):
+        steps = self.resolution
+        span = AXIS_MAX - AXIS_MIN
+        values = []
+        if self.bipolar:
+            # Index i <-> input -1 + 2i/steps; output around the axis center
+            for i in range(steps + 1):
+                value = -1.0 + 2.0 * i / steps
+                gain = self.gain_negative if value < 0.0 else self.gain_positive
+                out = min(1.0, self.shape(abs(value)) * gain)
+                normalized = (1.0 - out if value < 0.0 else 1.0 + out) / 2.0
+                values.append(int(AXIS_MIN + normalized * span + 0.5))
+            self._low = -1.0
+            self._scale = steps / 2.0
+            self._neutral = steps // 2
+        else:
+            for i in range(steps + 1):
+                out = min(1.0, self.shape(i / steps) * self.gain_positive)
+                values.append(int(AXIS_MIN + out * span + 0.5))
+            self._low = 0.0
+            self._scale = float(steps)
+            self._neutral = 0
+        self._last = steps
+        self.table = array("H", values)
+
+    def map(self, value):
+        """Axis value for an input value (clamped; NaN maps to neutral)."""
+        x = (value - self._low) * self._scale
+        if x >= self._last:
+            return self.table[self._last]
+        if x > 0.0:
+            return self.table[int(x + 0.5)]
+        if x != x:
+            return self.table[self._neutral]
+        return self.table[0]
+
+    __call__ = map
+
+    @property
+    def neutral(self):
+        """Axis value for a neutral input (center for steering, released for pedals)."""
+        return self.table[self._neutral]
+
+    def describe(self):
+        """Short human-readable summary of the non-default parameters."""
+        parts = []
+        if self.deadzone:
+            parts.append(f"deadzone {self.deadzone:g}")
+        if self.saturation != 1.0:
+            parts.append(f"saturation {self.saturation:g}")
+        if self.points is not None:
+            parts.append(f"{len(self.points)}-point curve")
+        elif self.exponent != 1.0:
+            parts.append(f"exponent {self.exponent:g}")
+        if self.gain_negative != 1.0 or self.gain_positive != 1.0:
+            parts.append(f"gain {self.gain_negative:g}/{self.gain_positive:g}")
+        return ", ".join(parts) or "linear"
+
+
+def parse_curve_params(items):
+    """
+    Curve parameters from text (command line, HTTP query).
+
+    Args:
+        items: [(name, value), ...], e.g. [("deadzone", "0.05")]; points
+               are written as "in:out;in:out;...", e.g. "0:0;0.5:0.3;1:1"
+
+    Returns:
+        {param: value} for ResponseCurve/configure()
+    """
+    params = {}
+    for name, value in items:
+        if name == "points":
+            params[name] = [tuple(float(v) for v in point.split(":")) for point in value.split(";")]
+        else:
+            params[name] = float(value)
+    return params
+
+
+def create_curve(config=None, bipolar=True):
+    """
+    Build a curve from a ResponseCurve, a parameter dict or None (linear).
+
+    Args:
+        config: ResponseCurve, {param: value} or None
+        bipolar: Input range for new curves (see ResponseCurve)
+    """
+    if isinstance(config, ResponseCurve):
+        return config
+    return ResponseCurve(bipolar=bipolar, **(config or {}))
@@ -0,0 +1,189 @@
+"""
+Steering Filters
+Low-lag smoothing for the raw accelerometer steering value.
+
+Every filter works in O(1) per sample, keeps its state in the instance
+(one instance per client) and reports the lag it currently adds, so
+jitter can be traded against latency per game.
+
+Filters:
+- none:     Pass-through (no added lag)
+- one_euro: One-Euro filter (Casiez et al. 2012). Heavy smoothing when
+            the wheel is still, light smoothing while it moves.
+- kalman:   1-D Kalman filter with a random-walk model.
+"""
+
+import math
+
+
+class SteeringFilter:
+    """Base class: pass-through filter."""
+
+    name = "none"
+
+    def update(self, value, t):
+        """
+        Filter one sample.
+
+        Args:
+            value: Raw input value
+            t: Sample time in seconds (any monotonic epoch)
+
+        Returns:
+            Filtered value
+        """
+        return value
+
+    @property
+    def lag(self):
+        """Estimated lag added by the filter, in seconds."""
+        return 0.0
+
+    def reset(self):
+        """Forget all state."""
+
+
+class LowPass:
+    """Exponential smoother used by the One-Euro filter."""
+
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = None
+
+    def update(self, value, alpha):
+        if self.value is None:
+            self.value = value
+        else:
+            self.value += alpha * (value - self.value)
+        return self.value
+
+
+def smoothing_factor(dt, cutoff):
+    """Alpha of a first-order low-pass with the given cutoff (Hz)."""
+    tau = 1.0 / (2.0 * math.pi * cutoff)
+    return 1.0 / (1.0 + tau / dt)
+
+
+class OneEuroFilter(SteeringFilter):
+    """Speed-adaptive low-pass filter."""
+
+    name = "one_euro"
+
+    def __init__(self, min_cutoff=1.5, beta=2.0, d_cutoff=1.0, default_rate=20.0):
+        """
+        Args:
+            min_cutoff: Cutoff (Hz) when the wheel is still; lower = smoother
+            beta: Cutoff increase per unit/s of speed; higher = less lag when moving
+            d_cutoff: Cutoff (Hz) for the speed estimate
+            default_rate: Assumed sample rate (Hz) when timestamps are missing
+        """
+        self.min_cutoff = min_cutoff
+        self.beta = beta
+        self.d_cutoff = d_cutoff
+        self.default_dt = 1.0 / default_rate
+        self.reset()
+
+    def reset(self):
+        self._x = LowPass()
+        self._dx = LowPass()
+        self._last_t = None
+        self._last_raw = None
+        self._cutoff = self.min_cutoff
+
+    def update(self, value, t):
+        if self._last_t is None:
+            self._last_t = t
+            self._last_raw = value
+            self._dx.update(0.0, 1.0)
+            return self._x.update(value, 1.0)
+
+        dt = t - self._last_t if t is not None and self._last_t is not None else 0.0
+        if dt <= 0.0:
+            dt = self.default_dt
+        self._last_t = t
+
+        speed = self._dx.update((value - self._last_raw) / dt, smoothing_factor(dt, self.d_cutoff))
+        self._last_raw = value
+
+        self._cutoff = self.min_cutoff + self.beta * abs(speed)
+        return self._x.update(value, smoothing_factor(dt, self._cutoff))
+
+    @property
+    def lag(self):
+        # Group delay of a first-order low-pass at low frequency: tau = 1 / (2π fc)
+        return 1.0 / (2.0 * math.pi * self._cutoff)
+
+
+class KalmanFilter1D(SteeringFilter):
+    """
+    Kalman filter for a slowly wandering value (random-walk model).
+
+    process_noise is the variance added per second of motion,
+    measurement_noise the sensor noise variance.
+    """
+
+    name = "kalman"
+
+    def __init__(self, process_noise=0.05, measurement_noise=0.002, default_rate=20.0):
+        self.process_noise = process_noise
+        self.measurement_noise = measurement_noise
+        self.default_dt = 1.0 / default_rate
+        self.reset()
+
+    def reset(self):
+        self._estimate = None
+        self._variance = 1.0
+        self._last_t = None
+        self._gain = 1.0
+        self._dt = self.default_dt
+
+    def update(self, value, t):
+        if self._estimate is None:
+            self._estimate = value
+            self._variance = self.measurement_noise
+            self._last_t = t
+            return value
+
+        dt = t - self._last_t if t is not None and self._last_t is not None else 0.0
+        if dt <= 0.0:
+            dt = self.default_dt
+        self._last_t = t
+        self._dt = dt
+
+        # Predict, then correct
+        variance = self._variance + self.process_noise * dt
+        gain = variance / (variance + self.measurement_noise)
+        self._estimate += gain * (value - self._estimate)
+        self._variance = (1.0 - gain) * variance
+        self._gain = gain
+        return self._estimate
+
+    @property
+    def lag(self):
+        # Steady state behaves like an exponential smoother with alpha = gain
+        if self._gain >= 1.0:
+            return 0.0
+        return self._dt * (1.0 - self._gain) / self._gain
+
+
+FILTERS = {
+    SteeringFilter.name: SteeringFilter,
+    OneEuroFilter.name: OneEuroFilter,
+    KalmanFilter1D.name: KalmanFilter1D,
+}
+
+
+def create_filter(name="none", **params):
+    """
+    Create a steering filter by name.
+
+    Args:
+        name: One of FILTERS ('none', 'one_euro', 'kalman')
+        **params: Filter constructor arguments
+    """
+    try:
+        filter_class = FILTERS[name]
+    except KeyError:
+        raise ValueError(f"Unknown steering filter '{name}' (choose from {', '.join(FILTERS)})")
+    return filter_class(**params)
@@ -0,0 +1,112 @@
+"""
+Input Watchdog
+Fails safe when a client's samples stop arriving.
+
+Without it, a phone that drops off Wi-Fi leaves its last state latched
+(gas held, wheel turned) until the TCP connection is declared dead, which
+can take many seconds. The watchdog runs on the output tick and checks how
+old the session's latest sample is:
+
+- older than `timeout`: stall - the output is faded to neutral (steering
+  centered, pedals released) over `ramp_time`, or at once in 'snap' mode
+- samples again: the output is faded back to the live input over
+  `restore_time`, so the wheel doesn't jump to wherever the phone is now
+
+The fade is a weight (1 = live input, 0 = neutral) the bridge multiplies
+the steering/pedal values with before the response curves.
+"""
+
+WATCHDOG_MODES = ("ramp", "snap")
+
+
+class InputWatchdog:
+    """Per-client stale-input detector with fade to neutral and back."""
+
+    def __init__(self, timeout=0.15, mode="ramp", ramp_time=0.1, restore_time=0.1,
+                 on_stall=None, on_resume=None):
+        """
+        Args:
+            timeout: Seconds without a new sample before the input is stale
+            mode: 'ramp' (fade to neutral over ramp_time) or 'snap' (at once)
+            ramp_time: Seconds to fade from live input to neutral
+            restore_time: Seconds to fade back once samples resume
+            on_stall: Called with (age) when a stall starts
+            on_resume: Called with (duration) when samples resume
+        """
+        if mode not in WATCHDOG_MODES:
+            raise ValueError(f"Unknown watchdog mode '{mode}' (choose from {', '.join(WATCHDOG_MODES)})")
+        self.timeout = timeout
+        self.mode = mode
+        self.ramp_time = ramp_time
+        self.restore_time = restore_time
+        self.on_stall = on_stall
+        self.on_resume = on_resume
+
+        self.weight = 1.0
+        self.written = 1.0          # Weight of the last output write (set by the bridge)
+        self.stalled = False
+        self.stalls = 0             # Stall events so far
+        self.stalled_seconds = 0.0  # Total time spent stalled (finished stalls)
+        self._stall_start = None
+        self._last_check = None
+
+    @property
+    def active(self):
+        """True while the output is fading or the last fade step is not written yet."""
+        return self.written != self.weight or self.weight != (0.0 if self.stalled else 1.0)
+
+    def check(self, now, arrival):
+        """
+        Update the stall state for an output tick.
+
+        Args:
+            now: time.perf_counter() of the tick
+            arrival: time.perf_counter() when the latest sample arrived
+                     (None = no input yet)
+
+        Returns:
+            Weight of the live input (0 = neutral .. 1 = live)
+        """
+        last = self._last_check
+        self._last_check = now
+        if arrival is None:
+            return self.weight
+
+        age = now - arrival
+        if age > self.timeout:
+            if not self.stalled:
+                self.stalled = True
+                self.stalls += 1
+                self._stall_start = arrival + self.timeout
+                if self.on_stall is not None:
+                    self.on_stall(age)
+        elif self.stalled:
+            self.stalled = False
+            duration = max(0.0, now - self._stall_start)
+            self.stalled_seconds += duration
+            if self.on_resume is not None:
+                self.on_resume(duration)
+
+        # Fade towards the target weight
+        weight = self.weight
+        elapsed = now - last if last is not None else 0.0
+        if self.stalled:
+            if self.mode == "snap" or self.ramp_time <= 0:
+                weight = 0.0
+            else:
+                weight = max(0.0, weight - elapsed / self.ramp_time)
+        elif weight < 1.0:
+            if self.restore_time <= 0:
+                weight = 1.0
+            else:
+                weight = min(1.0, weight + elapsed / self.restore_time)
+        self.weight = weight
+        return weight
+
+    def reset(self):
+        """Back to live input (new connection / device reset)."""
+        self.weight = 1.0
+        self.written = 1.0
+        self.stalled = False
+        self._stall_start = None
+        self._last_check = None
@@ -0,0 +1,145 @@
+"""
+Adaptive Jitter Buffer
+Smooths bursty Wi-Fi arrivals back into the phone's send rhythm.
+
+Phones send every 50 ms, but Wi-Fi delivers samples in bursts. The buffer
+holds each sample until its playout time:
+
+    playout = client send time + base offset + delay
+
+- base offset: smallest (arrival - client time) seen recently, i.e. the
+  fastest path (windowed minimum, so route changes are picked up)
+- jitter: RFC 3550 interarrival jitter estimate, updated per sample
+- delay: multiplier * jitter, clamped to [min_delay, max_delay]; grows
+  quickly when samples arrive late and shrinks slowly when the network
+  calms down
+
+Samples without a client timestamp cannot be scheduled and are released
+immediately. A sample that arrives after its playout time is released
+right away and counted as late (it is still the freshest data).
+
+Presets trade smoothness against latency:
+- low_latency: small delay, accepts some stutter
+- smooth:      larger delay, steady wheel on bad Wi-Fi
+"""
+
+import bisect
+
+from clocksync import BaseTransit
+
+PRESETS = {
+    "low_latency": {"multiplier": 2.0, "min_delay": 0.0, "max_delay": 0.05},
+    "smooth": {"multiplier": 4.0, "min_delay": 0.01, "max_delay": 0.15},
+}
+
+
+class JitterBuffer:
+    """Per-client playout buffer with an adaptive delay."""
+
+    def __init__(self, multiplier=3.0, min_delay=0.0, max_delay=0.1,
+                 base_window=5.0, max_depth=32):
+        """
+        Args:
+            multiplier: Delay = multiplier * estimated jitter
+            min_delay: Lower bound for the playout delay (seconds)
+            max_delay: Upper bound for the playout delay (seconds)
+            base_window: Seconds per window of the minimum-transit estimate
+            max_depth: Buffered samples before the oldest are dropped
+        """
+        self.multiplier = multiplier
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.max_depth = max_depth
+
+        self.jitter = 0.0
+        self.delay = min_delay
+        self.late = 0
+        self.dropped = 0
+        self.released = 0
+
+        self._pending = []  # [(playout, order, sample)] sorted by playout
+        self._order = 0
+        self._last_transit = None
+        self._base = BaseTransit(base_window)
+        self._last_playout = float("-inf")
+
+    def __len__(self):
+        return len(self._pending)
+
+    def push(self, sample, arrival):
+        """
+        Add a sample that arrived at `arrival` (time.perf_counter()).
+
+        Returns:
+            Its playout time (same clock as arrival)
+        """
+        if sample.t_client is None:
+            playout = arrival
+        else:
+            transit = arrival - sample.t_client
+            if self._last_transit is not None:
+                d = abs(transit - self._last_transit)
+                self.jitter += (d - self.jitter) / 16.0
+            self._last_transit = transit
+
+            base = self._base.update(transit, arrival)
+            target = min(self.max_delay, max(self.min_delay, self.multiplier * self.jitter))
+            # React quickly to worse conditions, relax slowly
+            rate = 0.5 if target > self.delay else 0.02
+            self.delay += (target - self.delay) * rate
+
+            playout = sample.t_client + base + self.delay
+            if playout < arrival:
+                self.late += 1
+                playout = arrival
+
+        # Never reorder: keep the playout schedule monotonic
+        if playout < self._last_playout:
+            playout = self._last_playout
+        self._last_playout = playout
+
+        self._order += 1
+        bisect.insort(self._pending, (playout, self._order, sample))
+        if len(self._pending) > self.max_depth:
+            del self._pending[0]
+            self.dropped += 1
+        return playout
+
+    def pop_ready(self, now):
+        """Samples whose playout time has come, oldest first."""
+        pending = self._pending
+        count = 0
+        while count < len(pending) and pending[count][0] <= now:
+            count += 1
+        if not count:
+            return ()
+        ready = [entry[2] for entry in pending[:count]]
+        del pending[:count]
+        self.released += count
+        return ready
+
+    def reset(self):
+        """Forget buffered samples and estimates (counters are kept)."""
+        self._pending.clear()
+        self._last_transit = None
+        self._base.reset()
+        self._last_playout = float("-inf")
+        self.jitter = 0.0
+        self.delay = self.min_delay
+
+
+def create_jitter_buffer(config):
+    """
+    Build a jitter buffer from a preset name, a parameter dict or None (off).
+
+    Args:
+        config: None, one of PRESETS ('low_latency', 'smooth') or {param: value}
+    """
+    if config is None:
+        return None
+    if isinstance(config, str):
+        try:
+            config = PRESETS[config]
+        except KeyError:
+            raise ValueError(f"Unknown jitter buffer preset '{config}' (choose from {', '.join(PRESETS)})")
+    return JitterBuffer(**config)
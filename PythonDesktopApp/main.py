@@ -10,22 +10,61 @@ and translates it into vJoy virtual steering wheel inputs for PC racing games.
 - Added axis availability validation
 - Improved error handling and logging
 - Added test function to verify vJoy independently
+
+Headless mode (no prompts, e.g. for restarts between races):
+    python main.py --headless
+    python main.py --config bridge.json --devices 1,2
 """
 
+import time
+
+STARTUP_T0 = time.perf_counter()  # Reference for the startup-time report
+
+import argparse
 import asyncio
+import contextlib
+import inspect
 import json
 import websockets
-from datetime import datetime
 import ctypes
 import sys
-import time
+from urllib.parse import parse_qs
+
+from bridge_log import BridgeLogger
+from capture import CaptureRecorder
+from clocksync import ClockSync
+from curves import create_curve, parse_curve_params
+from filters import create_filter
+from input_watchdog import WATCHDOG_MODES, InputWatchdog
+from jitter_buffer import create_jitter_buffer
+from prediction import SteeringPredictor
+from profiling import (
+    SIGNAL_PROFILE_SECONDS, ProfileCapture, StageTimers,
+    install_profile_signal, signal_name,
+)
+from resampler import Resampler
+from metrics import MetricsRegistry, MetricsServer
+from output_thread import PRIORITIES, OutputThread
+from output_backends import (
+    AXIS_CENTER, AXIS_MAX, AXIS_MIN, VJOY_AVAILABLE,
+    VJoyBackend, create_backend,
+)
+from protocol import (
+    BATCH_SUBPROTOCOL, BINARY_SUBPROTOCOL, CONTROL_PONG, SUBPROTOCOLS, SequenceTracker,
+    decode_control, decode_samples, encode_ping, encode_session,
+)
+from resumption import ResumeRegistry, token_from_path
+from server_profiles import (
+    SERVER_PROFILES, describe as describe_profile, ensure_nodelay,
+    event_loop_name, install_fast_event_loop, serve_options,
+)
+from sessions import SessionManager
+from shared_state import DEFAULT_NAME as SHARED_STATE_NAME, SharedStateWriter
+from udp_transport import UdpSampleProtocol
 
-# Try to import pyvjoy for steering wheel emulation
-try:
-    import pyvjoy
-    VJOY_AVAILABLE = True
-except ImportError:
-    VJOY_AVAILABLE = False
+
+def print_vjoy_install_steps():
+    """Print vJoy/pyvjoy installation instructions."""
     print("❌ ERROR: pyvjoy not installed!")
     print("")
     print("📥 INSTALLATION STEPS:")
@@ -34,7 +73,6 @@ except ImportError:
     print("   3. Restart your computer")
     print("   4. Run: pip install pyvjoy")
     print("")
-    exit(1)
 
 
 def is_admin():
@@ -45,12 +83,35 @@ def is_admin():
         return False
 
 
-def check_admin_privileges():
+@contextlib.contextmanager
+def high_resolution_timer():
+    """
+    Raise the Windows timer resolution to 1 ms while active.
+    
+    The default 15.6 ms tick would make asyncio.sleep() far too coarse for
+    a 250 Hz output loop. Does nothing on other platforms.
+    """
+    try:
+        winmm = ctypes.windll.winmm
+    except AttributeError:
+        yield
+        return
+    
+    winmm.timeBeginPeriod(1)
+    try:
+        yield
+    finally:
+        winmm.timeEndPeriod(1)
+
+
+def check_admin_privileges(interactive=True):
     """Verify admin privileges and warn user if not running as admin."""
     if not is_admin():
         print("⚠️  WARNING: Not running as Administrator!")
         print("   vJoy may not work correctly without admin privileges.")
         print("")
+        if not interactive:
+            return
         print("🔧 TO FIX:")
         print("   1. Close this window")
         print("   2. Right-click on PowerShell/Terminal")
@@ -65,17 +126,19 @@ def check_admin_privileges():
 
 
 class SteeringWheelBridge:
-    """Manages the WebSocket server and vJoy steering wheel emulation."""
-    
-    # vJoy device status constants
-    VJD_STAT_OWN = 0    # Device is owned by this process
-    VJD_STAT_FREE = 1   # Device is free
-    VJD_STAT_BUSY = 2   # Device is owned by another process
-    VJD_STAT_MISS = 3   # Device is not installed/configured
-    VJD_STAT_UNKN = 4   # Unknown status
+    """Manages the WebSocket server and the steering wheel output devices."""
     
-    
-    def __init__(self, host='0.0.0.0', port=5000, vjoy_device_id=1):
+    def __init__(self, host='0.0.0.0', port=5000, vjoy_device_id=1, backend=None,
+                 udp_port=None, output_rate_hz=250, logger=None, metrics_port=None,
+                 steering_filter="none", steering_filter_params=None,
+                 prediction_horizon=None, prediction_params=None,
+                 device_ids=None, device_assignments=None, device_rates=None,
+                 capture_path=None, steering_curve=None, gas_curve=None, brake_curve=None,
+                 steering_hysteresis=8, steering_quantum=1, jitter_buffer=None,
+                 clock_sync=True, backend_name=None, output_thread=True,
+                 output_priority="high", server_profile="low_latency", resample=True,
+                 input_timeout=0.15, watchdog_params=None, resume_window=5.0,
+                 profile_stages=False, profile_dir="profiles", shared_state=None):
         """
         Initialize the steering wheel bridge server.
         
@@ -83,259 +146,480 @@ class SteeringWheelBridge:
             host: Server host address (0.0.0.0 for all interfaces)
             port: Server port number
             vjoy_device_id: vJoy device ID (1-16, default is 1)
+            backend: OutputBackend instance or list of them (default: one vJoy
+                     device per device ID if available, else null devices)
+            udp_port: UDP port for datagram samples (None = WebSocket only)
+            output_rate_hz: Output device write rate (e.g. 125, 250, 500)
+            logger: BridgeLogger instance (default: console, 1 wheel line/s)
+            metrics_port: Local HTTP port for Prometheus metrics (None = off)
+            steering_filter: Steering smoothing ('none', 'one_euro', 'kalman')
+            steering_filter_params: Keyword arguments for the filter
+            prediction_horizon: Steering lead time in seconds (None = no prediction)
+            prediction_params: Extra keyword arguments for SteeringPredictor
+            device_ids: Output device pool, one device per client
+                        (default: [vjoy_device_id])
+            device_assignments: {client_ip: device_id} fixed seats
+            device_rates: {device_id: Hz} per-device output rate
+                          (default: output_rate_hz)
+            capture_path: Record all samples and writes to this file (None = off,
+                          replay with capture.py)
+            steering_curve: Steering response curve (curves.ResponseCurve or
+                            {param: value}, default linear)
+            gas_curve: Gas pedal response curve (default linear)
+            brake_curve: Brake pedal response curve (default linear)
+            steering_hysteresis: Steering changes smaller than this (axis units)
+                                 are not written (0 = write every change)
+            steering_quantum: Round steering to multiples of this (axis units)
+            jitter_buffer: Per-client playout buffer: None (off, lowest latency),
+                           'low_latency', 'smooth' or {param: value}
+            clock_sync: Ping/pong clock sync with WebSocket clients (True, False
+                        or ClockSync keyword arguments)
+            backend_name: Output backend when backend is None ('vjoy', 'null', ...;
+                          default: vJoy if available, else null device)
+            output_thread: Write devices from a dedicated thread (False = on
+                           the event loop)
+            output_priority: OS priority of the output thread ('normal',
+                             'high', 'realtime')
+            server_profile: WebSocket transport settings ('low_latency' or
+                            'default' for the library defaults, see server_profiles.py)
+            resample: Interpolate multi-sample frames onto the output tick
+                      (False = write only the newest sample of each frame)
+            input_timeout: Seconds without samples before a client's device
+                           fades to neutral (None = only on disconnect)
+            watchdog_params: Extra keyword arguments for InputWatchdog
+                             (mode, ramp_time, restore_time)
+            resume_window: Seconds a dropped WebSocket client may reconnect
+                           with its session token and keep its session
+                           (None = reset on every disconnect)
+            profile_stages: Time the hot-path stages from the start (can also be
+                            switched on at runtime, see profiling.py)
+            profile_dir: Directory for on-demand profiles
+            shared_state: Publish the live state to this shared-memory name for
+                          local readers (None = off, True = 'steeringwheel',
+                          see shared_state.py)
         """
+        init_start = time.perf_counter()
+        # Logging runs on a background thread; console I/O never blocks the loop
+        if logger is None:
+            logger = BridgeLogger()
+        if logger.summary_provider is None:
+            logger.summary_provider = self.summary_line
+        self.logger = logger.start()
+        
+        # Statistics for the periodic summary line
+        self.samples_received = 0
+        self._summary_mark = (time.monotonic(), 0, 0, 0)
+        
+        # Per-client latency histograms (served on 127.0.0.1:metrics_port)
+        self.metrics = MetricsRegistry()
+        self.metrics_port = metrics_port
+        
+        # Hot-path stage timers (one attribute check per site while off) and
+        # on-demand profiles of the running server
+        self.stage_timers = StageTimers(profile_stages)
+        self.metrics.stage_timers = self.stage_timers
+        self.profiler = ProfileCapture(profile_dir, log=self.log)
+        
+        # Steering filter stage (one filter instance per client)
+        self.steering_filter = steering_filter
+        self.steering_filter_params = dict(steering_filter_params or {})
+        create_filter(steering_filter, **self.steering_filter_params)  # Validate config early
+        
+        # Optional latency compensation (one predictor per client)
+        self.prediction_horizon = prediction_horizon
+        self.prediction_params = dict(prediction_params or {})
+        
+        # Optional jitter buffer (one per client), released by the output tick
+        self.jitter_buffer = jitter_buffer
+        create_jitter_buffer(jitter_buffer)  # Validate config early
+        
+        # Multi-sample frames: interpolate onto the output tick (one per client)
+        self.resample = resample
+        
+        # Stale-input watchdog: neutral controls within milliseconds when a
+        # phone stops sending, long before the connection is declared dead
+        self.input_timeout = input_timeout
+        self.watchdog_params = dict(watchdog_params or {})
+        if input_timeout is not None:
+            InputWatchdog(input_timeout, **self.watchdog_params)  # Validate config early
+        
+        # Per-client clock sync (client timestamps → server time)
+        if clock_sync is True:
+            clock_sync = {}
+        self.clock_sync_params = dict(clock_sync) if clock_sync not in (None, False) else None
+        
+        # Session tokens: a phone that reconnects after a Wi-Fi blip resumes
+        # its session (device, filter state) instead of starting over
+        self.resume = ResumeRegistry(resume_window) if resume_window else None
+        self.metrics.resume = self.resume
+        
+        # Live state in shared memory for local overlays and loggers, written
+        # by the output thread (no sockets, no work on the event loop)
+        self.shared_state_name = SHARED_STATE_NAME if shared_state is True else shared_state
+        self.shared_state = None  # SharedStateWriter while the server runs
+        
+        # Optional session capture (written on a background thread)
+        self.capture = CaptureRecorder(capture_path).start() if capture_path else None
+        
         self.host = host
         self.port = port
+        self.udp_port = udp_port
         self.vjoy_device_id = vjoy_device_id
         
-        # 🔧 FIX #1: Correct vJoy axis range
-        # vJoy uses 16-bit values: 0x1 (min) to 0x7FFF (max), NOT 0x8000
-        # Center is 0x4001 (16385), not 0x4000
-        self.AXIS_MIN = 0x1        # 1 (minimum value)
-        self.AXIS_MAX = 0x7FFF     # 32767 (maximum value) - CORRECTED from 0x8000
-        self.AXIS_CENTER = 0x4001  # 16385 (center) - CORRECTED from 0x4000
+        # 🔧 FIX #1: Correct vJoy axis range (see output_backends.py)
+        self.AXIS_MIN = AXIS_MIN
+        self.AXIS_MAX = AXIS_MAX
+        self.AXIS_CENTER = AXIS_CENTER
         
-        # Initialize vJoy device
-        try:
-            # First, try to release the device if it's held by another program
-            from pyvjoy import _sdk
-            
+        # Response curves, precompiled into lookup tables (see curves.py)
+        self.curves = {
+            "steering": create_curve(steering_curve, bipolar=True),
+            "gas": create_curve(gas_curve, bipolar=False),
+            "brake": create_curve(brake_curve, bipolar=False),
+        }
+        
+        # Dirty tracking: only call the driver when an axis visibly changes
+        self.steering_hysteresis = steering_hysteresis
+        self.steering_quantum = max(1, int(steering_quantum))
+        
+        # Initialize output devices (one per concurrent client)
+        devices_start = time.perf_counter()
+        if backend is None:
+            backends = [create_backend(backend_name, device_id=device_id, log=self.log)
+                        for device_id in (device_ids or [vjoy_device_id])]
+        elif isinstance(backend, (list, tuple)):
+            backends = list(backend)
+        else:
+            backends = [backend]
+        
+        for output in backends:
             try:
-                # 🔧 FIX #2: Check if vJoy driver is enabled
-                if hasattr(_sdk, 'vJoyEnabled') and callable(_sdk.vJoyEnabled):
-                    if not _sdk.vJoyEnabled():
-                        self.log("❌ vJoy driver is not enabled!")
-                        self.log("")
-                        self.log("🔧 SOLUTION:")
-                        self.log("   1. https://github.com/njz3/vJoy/releases")
-                        self.log("   2. Install vJoySetup.exe as Administrator")
-                        self.log("   3. Restart your computer")
-                        exit(1)
-                
-                # 🔧 FIX #3: Use constants for device status
-                status = _sdk.GetVJDStatus(vjoy_device_id)
-                
-                if status == self.VJD_STAT_BUSY:
-                    self.log(f"⚠️  Device {vjoy_device_id} is busy, releasing...")
-                    _sdk.RelinquishVJD(vjoy_device_id)
-                    time.sleep(0.5)
-                    
-                    # Check again
-                    status = _sdk.GetVJDStatus(vjoy_device_id)
-                    if status == self.VJD_STAT_BUSY:
-                        self.log("❌ Failed to release device!")
-                        self.log("")
-                        self.log("🔧 SOLUTION:")
-                        self.log("   1. Close joy.cpl (Game Controllers)")
-                        self.log("   2. Close programs using vJoy")
-                        self.log("   3. Restart your computer")
-                        exit(1)
-                        
-                elif status == self.VJD_STAT_MISS:
-                    self.log(f"❌ Device {vjoy_device_id} is not configured!")
+                output.open()
+            except Exception as e:
+                self.log(f"❌ Failed to initialize {output.name} device #{output.device_id}!")
+                self.log(f"   Error: {e}")
+                if isinstance(output, VJoyBackend):
                     self.log("")
-                    self.log("🔧 SOLUTION:")
-                    self.log("   1. Open 'Configure vJoy' from Start menu")
-                    self.log("   2. Enable Device 1")
-                    self.log("   3. Enable X, Y, Z axes")
+                    self.log("🔧 TROUBLESHOOTING:")
+                    self.log("   1. Start → 'Configure vJoy'")
+                    self.log(f"   2. Device {output.device_id} enabled")
+                    self.log("   3. X-Axis, Y-Axis, Z-Axis enabled")
                     self.log("   4. Click 'Apply'")
                     self.log("")
-                    self.log("OR run in terminal:")
-                    self.log("   python diagnose_vjoy.py")
-                    exit(1)
-                    
-                elif status == self.VJD_STAT_FREE or status == self.VJD_STAT_OWN:
-                    # Release first
-                    try:
-                        _sdk.RelinquishVJD(vjoy_device_id)
-                        time.sleep(0.2)
-                    except:
-                        pass
-                    
-                    # Now acquire
-                    if _sdk.AcquireVJD(vjoy_device_id):
-                        self.log(f"✅ Device {vjoy_device_id} acquired successfully")
-                    else:
-                        self.log(f"❌ Failed to acquire device {vjoy_device_id}!")
-                        self.log("   Please run diagnose_vjoy.py")
-                        exit(1)
-                        
-            except AttributeError:
-                self.log("⚠️  Old pyvjoy version, basic checks cannot be performed...")
-            except Exception as e:
-                self.log(f"⚠️  Status check error: {e}")
-                self.log("   Continuing...")
-            
-            # Initialize device
-            self.joystick = pyvjoy.VJoyDevice(vjoy_device_id)
-            self.log(f"🎮 vJoy Device #{vjoy_device_id} initialized!")
-            
-            # 🔧 FIX #4: Validate that required axes are available
-            self.log("🔍 Checking axis availability...")
-            axes_available = True
-            
-            # Check X-axis (steering)
-            try:
-                self.joystick.set_axis(pyvjoy.HID_USAGE_X, self.AXIS_CENTER)
-                self.log("   ✅ X-Axis (Steering) is available")
-            except Exception as e:
-                self.log(f"   ❌ X-Axis not available: {e}")
-                axes_available = False
-            
-            # Check Y-axis (gas/throttle)
-            try:
-                self.joystick.set_axis(pyvjoy.HID_USAGE_Y, self.AXIS_MIN)
-                self.log("   ✅ Y-Axis (Gas) is available")
-            except Exception as e:
-                self.log(f"   ❌ Y-Axis not available: {e}")
-                axes_available = False
-            
-            # Check Z-axis (brake)
-            try:
-                self.joystick.set_axis(pyvjoy.HID_USAGE_Z, self.AXIS_MIN)
-                self.log("   ✅ Z-Axis (Brake) is available")
-            except Exception as e:
-                self.log(f"   ❌ Z-Axis not available: {e}")
-                axes_available = False
-            
-            if not axes_available:
-                self.log("")
-                self.log("❌ Required axes are not enabled!")
-                self.log("")
-                self.log("🔧 SOLUTION:")
-                self.log("   1. Start → 'Configure vJoy'")
-                self.log("   2. Check X-Axis, Y-Axis, Z-Axis")
-                self.log("   3. 'Apply' → 'OK'")
-                self.log("   4. Restart this program")
+                    self.log("   Or run: python diagnose_vjoy.py")
                 exit(1)
-            
-            self.log("✅ All axes are working!")
-                
-        except Exception as e:
-            self.log(f"❌ Failed to initialize vJoy Device #{vjoy_device_id}!")
-            self.log(f"   Error: {e}")
-            self.log("")
-            self.log("🔧 TROUBLESHOOTING:")
-            self.log("   1. Start → 'Configure vJoy'")
-            self.log("   2. Device 1 enabled")
-            self.log("   3. X-Axis, Y-Axis, Z-Axis enabled")
-            self.log("   4. Click 'Apply'")
-            self.log("")
-            self.log("   Or run: python diagnose_vjoy.py")
-            exit(1)
-        
-        # Current values for tracking
-        self.current_steering = self.AXIS_CENTER
-        self.current_gas = self.AXIS_MIN
-        self.current_brake = self.AXIS_MIN
-        
-        # 🔧 FIX #5: Add rate limiting to prevent flooding vJoy driver
-        self.last_update_time = 0
-        self.min_update_interval = 0.01  # 10ms minimum between updates (100Hz max)
-        
-    def log(self, message):
-        """Print timestamped log message."""
-        timestamp = datetime.now().strftime("%H:%M:%S")
-        print(f"[{timestamp}] {message}")
-    
-    def map_to_axis(self, value, min_val=-1.0, max_val=1.0):
-        """
-        Map a float value to vJoy axis range.
+        self.output = backends[0]
         
-        Args:
-            value: Input value to map
-            min_val: Minimum input value
-            max_val: Maximum input value
-            
-        Returns:
-            Integer value in vJoy axis range (0x1 to 0x8000)
-        """
-        # Clamp input value
-        value = max(min_val, min(max_val, value))
+        # Startup-time report (milliseconds per phase, see start_server)
+        self.startup_times = {
+            "imports": (init_start - STARTUP_T0) * 1000.0,
+            "devices": (time.perf_counter() - devices_start) * 1000.0,
+        }
+        
+        # 🔧 FIX #5: Fixed-rate output instead of dropping fast samples
+        # The receive path only stores the latest state in the client's
+        # session; output_loop() writes every session to its own device at
+        # the device's rate, so no gas/brake edge is lost and one client's
+        # traffic never delays another client's writes.
+        self.output_rate_hz = output_rate_hz
+        self.sessions = SessionManager(backends, device_assignments, device_rates, output_rate_hz)
         
-        # Normalize to 0.0-1.0
-        normalized = (value - min_val) / (max_val - min_val)
+        # Driver writes run on their own thread so a stalled driver call never
+        # blocks socket reads, pings or other clients on the event loop
+        if output_priority not in PRIORITIES:
+            raise ValueError(f"Unknown output priority '{output_priority}' "
+                             f"(choose from {', '.join(PRIORITIES)})")
+        self.use_output_thread = output_thread
+        self.output_priority = output_priority
+        self.output_thread = None  # OutputThread while output_loop() runs
         
-        # Map to vJoy range
-        axis_value = int(self.AXIS_MIN + (normalized * (self.AXIS_MAX - self.AXIS_MIN)))
+        # WebSocket transport settings (compression, queues, keepalive)
+        self.server_profile = server_profile
+        self.serve_options = serve_options(server_profile)
+        
+    def log(self, message, category=None):
+        """Queue a timestamped log message (optionally rate-capped by category)."""
+        self.logger.log(message, category)
+    
+    def summary_line(self):
+        """Periodic summary with packet rates (called from the log thread)."""
+        now = time.monotonic()
+        last_time, last_samples, last_writes, last_skipped = self._summary_mark
+        samples = self.samples_received
+        writes = sum(output.write_count for output in self.sessions.backends.values())
+        skipped = self.metrics.output_writes_skipped
+        self._summary_mark = (now, samples, writes, skipped)
         
-        return axis_value
+        if not len(self.sessions) and samples == last_samples:
+            return None
+        elapsed = max(now - last_time, 1e-6)
+        return (f"📊 [SUMMARY] {(samples - last_samples) / elapsed:.1f} samples/s in, "
+                f"{(writes - last_writes) / elapsed:.1f} writes/s out "
+                f"({(skipped - last_skipped) / elapsed:.1f}/s skipped), "
+                f"{len(self.sessions)} client(s)")
     
-    def update_steering_wheel(self, y, gas, brake):
+    def configure_curve(self, axis, **params):
         """
-        Update vJoy device with steering wheel data.
+        Change a response curve ('steering', 'gas' or 'brake') at runtime.
+        The lookup table is rebuilt only if a parameter changed.
+        """
+        curve = self.curves[axis]
+        if curve.configure(**params):
+            self.log(f"📈 {axis.capitalize()} curve: {curve.describe()}")
+    
+    def update_steering_wheel(self, session, y, gas, brake, arrival=None):
+        """
+        Store the latest steering wheel state (written on the next output tick).
         
         Args:
+            session: ClientSession of the sending client
             y: Y-axis value (-1.0 to +1.0) for steering
             gas: Boolean for gas pedal
             brake: Boolean for brake pedal
+            arrival: time.perf_counter() when the sample arrived
+        """
+        session.update(y, gas, brake, arrival)
+    
+    def flush_session(self, session, now):
+        """
+        Write a session's latest state to its output device if it changed
+        since the last write. Returns True if a write happened.
         """
-        # 🔧 FIX #6: Rate limiting to prevent driver flooding
-        current_time = time.time()
-        if current_time - self.last_update_time < self.min_update_interval:
-            return  # Skip this update if too soon
-        self.last_update_time = current_time
+        predictor = session.predictor
+        resampler = session.resampler
+        if resampler is not None and not resampler.count:
+            resampler = None  # Client sends single samples
+        version, y, gas, brake, arrival = session.latest()
+        new_sample = session.written_version != version
+        
+        # Fade to neutral while the client's input is stale (and back after)
+        watchdog = session.watchdog
+        weight = 1.0
+        if watchdog is not None:
+            weight = watchdog.check(time.perf_counter(), arrival)
+            fading = watchdog.active
+        else:
+            fading = False
+        
+        if not new_sample and not fading and (predictor is None or not predictor.active) and (
+                resampler is None or not resampler.active):
+            return False
+        
+        # Per-device rate control (devices slower than the output tick)
+        if session.write_interval:
+            if now < session.next_write:
+                return False
+            session.next_write = max(session.next_write + session.write_interval, now)
+        
+        tick_start = time.perf_counter()
+        session.written_version = version
+        if watchdog is not None:
+            watchdog.written = weight
+        
+        # Interpolate multi-sample frames onto this tick, or extrapolate steering
+        # to "now" (both write every tick while samples flow)
+        resampled = resampler.value_at(tick_start) if resampler is not None else None
+        if resampled is not None:
+            y, gas, brake = resampled
+        elif predictor is not None:
+            y = predictor.predict(tick_start)
+        if weight != 1.0:
+            y *= weight
+            gas = float(gas) * weight
+            brake = float(brake) * weight
         
         # MAP Y-AXIS to STEERING (X-AXIS in vJoy)
-        # Y: -1.0 (full left) to +1.0 (full right)
-        steering_value = self.map_to_axis(y, -1.0, 1.0)
+        # Y: -1.0 (full left) to +1.0 (full right), shaped by the steering curve
+        curves = self.curves
+        steering_value = curves["steering"].map(y)
         
         # 🔧 FIX #10: REVERSED - Games typically expect Z=Gas, Y=Brake
         # MAP GAS to Z-AXIS in vJoy (FIX: Previously was Y-Axis)
-        # Gas: False = 0, True = full throttle
-        gas_value = self.AXIS_MAX if gas else self.AXIS_MIN
+        # Gas: 0.0 (released) to 1.0 (full throttle); buttons send 0 or 1
+        gas_value = curves["gas"].map(float(gas))
         
         # MAP BRAKE to Y-AXIS in vJoy (FIX: Previously was Z-Axis)
-        # Brake: False = 0, True = full brake
-        brake_value = self.AXIS_MAX if brake else self.AXIS_MIN
+        # Brake: 0.0 (released) to 1.0 (full brake)
+        brake_value = curves["brake"].map(float(brake))
+        
+        # Quantize steering so sensor noise below one step never reaches the driver
+        quantum = self.steering_quantum
+        if quantum > 1:
+            steering_value = min(self.AXIS_MAX, self.AXIS_MIN + round(
+                (steering_value - self.AXIS_MIN) / quantum) * quantum)
+        
+        # Skip the driver call when nothing changed (or steering moved less than
+        # the hysteresis; center and full lock are always written exactly)
+        if gas_value == session.current_gas and brake_value == session.current_brake:
+            delta = abs(steering_value - session.current_steering)
+            if delta == 0 or (delta < self.steering_hysteresis and steering_value not in (
+                    self.AXIS_MIN, self.AXIS_MAX, curves["steering"].neutral)):
+                session.writes_skipped += 1
+                self.metrics.output_writes_skipped += 1
+                if session.metrics is not None:
+                    session.metrics.writes_skipped += 1
+                return False
+        mapped = time.perf_counter()
         
         # 🔧 FIX #7: Critical error handling - stop execution on axis failure
         try:
-            # Send all three axes
-            self.joystick.set_axis(pyvjoy.HID_USAGE_X, steering_value)
-            self.joystick.set_axis(pyvjoy.HID_USAGE_Z, gas_value)      # Z-Axis = GAS (CHANGED)
-            self.joystick.set_axis(pyvjoy.HID_USAGE_Y, brake_value)    # Y-Axis = BRAKE (CHANGED)
+            # Send all three axes in one driver call
+            # (vJoy: X-Axis = STEERING, Z-Axis = GAS, Y-Axis = BRAKE)
+            session.output.write_axes(steering_value, gas_value, brake_value)
+            written = time.perf_counter()
             
             # Update tracking values
-            self.current_steering = steering_value
-            self.current_gas = gas_value
-            self.current_brake = brake_value
+            session.current_steering = steering_value
+            session.current_gas = gas_value
+            session.current_brake = brake_value
             
             # 🔧 FIX #8: Verbose logging to verify values sent to vJoy
             # Uncomment for detailed debugging:
-            # self.log(f"   [VJOY] X={steering_value:5d} Y={gas_value:5d} Z={brake_value:5d}")
+            # self.log(f"   [VJOY #{session.device_id}] X={steering_value:5d} Y={brake_value:5d} Z={gas_value:5d}")
             
         except Exception as e:
             self.log(f"❌ CRITICAL: Axis update error: {e}")
-            self.log("   vJoy device is no longer responding!")
+            self.log(f"   {session.output.name} device #{session.device_id} is no longer responding!")
             self.log("   Restart the program or run diagnose_vjoy.py")
             raise  # Re-raise exception to stop execution
+        
+        self.metrics.output_writes += 1
+        timers = self.stage_timers
+        if timers.enabled:
+            timers.add("map", mapped - tick_start)
+            timers.add("write", written - mapped)
+        if self.capture is not None:
+            self.capture.record_write(session.client_key, session.device_id, steering_value,
+                                      gas_value, brake_value, written, arrival)
+        if new_sample and session.metrics is not None and arrival is not None:
+            session.metrics.observe_output(arrival, tick_start, mapped, written)
+        
+        return True
+    
+    def release_buffered_samples(self):
+        """Apply jitter-buffered samples whose playout time has come (event loop side)."""
+        for session in self.sessions:
+            if session.jitter_buffer is not None and len(session.jitter_buffer):
+                released = time.perf_counter()
+                for sample in session.jitter_buffer.pop_ready(released):
+                    self.apply_sample(session, sample, released)
+    
+    def write_outputs(self):
+        """
+        Write every session's latest state to its own output device
+        (output side). Returns the number of devices written.
+        """
+        timed = self.stage_timers.enabled  # May be switched from the loop meanwhile
+        if timed:
+            started = time.perf_counter()
+        now = time.monotonic()
+        writes = 0
+        shared_state = self.shared_state
+        for session in self.sessions:
+            if self.flush_session(session, now):
+                writes += 1
+                if shared_state is not None:
+                    shared_state.publish(session, now)
+        if shared_state is not None:
+            shared_state.refresh(self.sessions, now, self.output_rate_hz)
+        if timed:
+            self.stage_timers.add("tick", time.perf_counter() - started)
+        return writes
+    
+    def flush_output(self):
+        """
+        Release buffered samples and write every device in one go.
+        Returns the number of devices written.
+        """
+        self.release_buffered_samples()
+        return self.write_outputs()
     
-    def reset_steering_wheel(self):
-        """Reset all axes to neutral/off position."""
-        self.joystick.set_axis(pyvjoy.HID_USAGE_X, self.AXIS_CENTER)
-        self.joystick.set_axis(pyvjoy.HID_USAGE_Z, self.AXIS_MIN)  # Z = GAS (reset to 0)
-        self.joystick.set_axis(pyvjoy.HID_USAGE_Y, self.AXIS_MIN)  # Y = BRAKE (reset to 0)
+    def run_on_output(self, func):
+        """Run func where the devices are written (output thread if running)."""
+        thread = self.output_thread
+        if thread is not None and thread.is_alive():
+            thread.call_soon(func)
+        else:
+            func()
+    
+    async def output_loop(self):
+        """Write the latest states to the output devices at a fixed rate."""
+        period = 1.0 / self.sessions.max_rate_hz
+        
+        with high_resolution_timer():
+            if self.use_output_thread:
+                await self.run_output_thread(period)
+                return
+            
+            next_tick = time.monotonic()
+            while True:
+                self.flush_output()
+                
+                next_tick += period
+                delay = next_tick - time.monotonic()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                else:
+                    # Fell behind (slow driver or busy loop): skip missed ticks
+                    next_tick = time.monotonic()
+                    await asyncio.sleep(0)
+    
+    async def run_output_thread(self, period):
+        """
+        Run the device writes on an OutputThread until it fails or this task
+        is cancelled. Jitter buffers stay on the event loop and are released
+        here at the output rate.
+        """
+        loop = asyncio.get_running_loop()
+        failed = loop.create_future()
         
-        self.current_steering = self.AXIS_CENTER
-        self.current_gas = self.AXIS_MIN
-        self.current_brake = self.AXIS_MIN
+        def on_error(error):
+            loop.call_soon_threadsafe(lambda: failed.done() or failed.set_exception(error))
         
-        self.log("🎮 Steering wheel reset to neutral")
+        thread = OutputThread(self.write_outputs, self.sessions.max_rate_hz,
+                              priority=self.output_priority, on_error=on_error, log=self.log)
+        self.output_thread = thread
+        thread.start()
+        try:
+            if self.jitter_buffer is None:
+                await failed
+                return
+            
+            next_tick = time.monotonic()
+            while not failed.done():
+                self.release_buffered_samples()
+                next_tick += period
+                delay = next_tick - time.monotonic()
+                if delay > 0:
+                    await asyncio.wait((failed,), timeout=delay)
+                else:
+                    next_tick = time.monotonic()
+                    await asyncio.sleep(0)
+            failed.result()
+        finally:
+            # Runs queued device resets before the thread exits
+            thread.stop()
+            self.output_thread = None
     
-    def process_sensor_data(self, x, y, z, gas, brake):
+    def process_sensor_data(self, session, x, y, z, gas, brake, arrival=None):
         """
-        Process accelerometer data and update steering wheel.
+        Process accelerometer data and update the session's steering wheel.
         
         Args:
+            session: ClientSession of the sending client
             x: X-axis accelerometer value
             y: Y-axis accelerometer value (STEERING)
             z: Z-axis accelerometer value
             gas: Boolean - gas button pressed
             brake: Boolean - brake button pressed
+            arrival: time.perf_counter() when the sample arrived
         """
         # Update vJoy device
-        self.update_steering_wheel(y, gas, brake)
+        self.update_steering_wheel(session, y, gas, brake, arrival)
+        
+        # Status line is rate-capped per device; skip formatting when it would be dropped
+        if not self.logger.allow(f"wheel:{session.device_id}"):
+            return
         
         # Calculate steering percentage
         steering_percent = int(y * 100)
@@ -358,7 +642,203 @@ class SteeringWheelBridge:
         status = f" {' '.join(status_parts)}" if status_parts else ""
         
         # Log with details
-        self.log(f"[WHEEL] y={y:+.2f} ({steering_percent:+3d}%) → {direction}{status}")
+        self.log(f"[WHEEL #{session.device_id}] y={y:+.2f} ({steering_percent:+3d}%) → {direction}{status}")
+    
+    def handle_sample(self, client_key, sample):
+        """
+        Shared processing pipeline for every transport.
+        
+        Args:
+            client_key: Identifier of the sending client
+            sample: Decoded protocol.Sample
+        """
+        session = self.sessions.get(client_key)
+        if session is None:
+            return  # Not admitted (no free output device)
+        self.samples_received += 1
+        if self.capture is not None:
+            self.capture.record_sample(client_key, session.device_id, sample)
+        session.metrics.observe_sample(sample, time.perf_counter())
+        
+        # With a jitter buffer the output tick applies the sample at its playout time
+        if session.jitter_buffer is not None:
+            session.jitter_buffer.push(sample, sample.t_arrival)
+            return
+        self.apply_sample(session, sample)
+    
+    def apply_sample(self, session, sample, applied=None):
+        """
+        Filter/predict a sample and store it as the session's latest state.
+        
+        Args:
+            session: ClientSession of the sending client
+            sample: protocol.Sample
+            applied: time.perf_counter() when the sample is applied
+                     (playout time for buffered samples, default: arrival)
+        """
+        timed = self.stage_timers.enabled
+        if timed:
+            started = time.perf_counter()
+        if applied is None:
+            applied = sample.t_arrival
+        
+        # With a synced clock, prediction extrapolates from when the sample was
+        # taken, so the measured network delay is compensated too
+        clock = session.clock
+        if clock is not None and clock.synced and sample.t_client is not None:
+            applied = clock.to_server_time(sample.t_client)
+        
+        # Smooth steering (sensor time if the client sends it, else arrival time)
+        t = sample.t_client if sample.t_client is not None else sample.t_arrival
+        y = session.steering_filter.update(sample.y, t)
+        session.metrics.filter_lag = session.steering_filter.lag
+        
+        if session.predictor is not None:
+            session.predictor.observe(y, t, applied)
+        
+        # Samples of multi-sample frames are played back in their original rhythm
+        resampler = session.resampler
+        if resampler is not None:
+            if sample.batch > 1 and sample.t_client is not None:
+                resampler.push(sample.t_client, sample.t_arrival, y, sample.gas, sample.brake)
+            elif resampler.count:
+                resampler.reset()  # Client went back to single samples
+        
+        self.process_sensor_data(session, sample.x, y, sample.z, sample.gas, sample.brake,
+                                 sample.t_arrival)
+        if timed:
+            self.stage_timers.add("process", time.perf_counter() - started)
+    
+    def open_session(self, client_key, client_ip, tracker, clock=None):
+        """
+        Admit a new client and give it an output device from the pool.
+        
+        Args:
+            client_key: Unique client identifier
+            client_ip: Client IP address (for fixed device assignments)
+            tracker: protocol.SequenceTracker
+            clock: clocksync.ClockSync (None for transports without sync)
+        
+        Returns:
+            ClientSession, or None when every device is taken
+        """
+        if self.sessions.acquire_device(client_ip) is None:
+            # Rate-capped: a UDP sender is retried on every datagram
+            self.log(f"⛔ [REJECTED] {client_key}: no free output device "
+                     f"({len(self.sessions)}/{len(self.sessions.backends)} in use)",
+                     f"rejected:{client_key}")
+            return None
+        predictor = None
+        if self.prediction_horizon is not None:
+            predictor = SteeringPredictor(self.prediction_horizon, **self.prediction_params)
+        session = self.sessions.open(
+            client_key, client_ip,
+            tracker=tracker,
+            metrics=self.metrics.client(client_key, tracker),
+            steering_filter=create_filter(self.steering_filter, **self.steering_filter_params),
+            predictor=predictor,
+            jitter_buffer=create_jitter_buffer(self.jitter_buffer),
+            clock=clock,
+            resampler=Resampler() if self.resample else None,
+            watchdog=self.create_watchdog(client_key),
+        )
+        session.metrics.jitter_buffer = session.jitter_buffer
+        session.metrics.clock = clock
+        session.metrics.resampler = session.resampler
+        session.metrics.watchdog = session.watchdog
+        if self.capture is not None:
+            self.capture.record_connect(client_key, session.device_id)
+        return session
+    
+    def create_watchdog(self, client_key):
+        """InputWatchdog for a new client (None when disabled)."""
+        if self.input_timeout is None:
+            return None
+        metrics = self.metrics.client(client_key)
+        
+        def on_stall(age):
+            self.log(f"⏸️  [STALL] {client_key}: no input for {age * 1000:.0f} ms → neutral",
+                     f"stall:{client_key}")
+        
+        def on_resume(duration):
+            metrics.observe_stall(duration)
+            self.log(f"▶️  [RESUME] {client_key}: input back after {duration * 1000:.0f} ms",
+                     f"resume:{client_key}")
+        
+        return InputWatchdog(self.input_timeout, on_stall=on_stall, on_resume=on_resume,
+                             **self.watchdog_params)
+    
+    def park_client(self, client_key):
+        """
+        Keep a dropped client's session for the resume window. Without a
+        watchdog the controls go neutral right away (filter state is kept).
+        """
+        session = self.sessions.get(client_key)
+        if session is None:
+            return
+        if session.watchdog is None:
+            session.update(0.0, False, False)
+        self.resume.park(client_key, self.expire_client)
+        self.log(f"⏳ [PARKED] {client_key}: device #{session.device_id} kept "
+                 f"{self.resume.window:g} s for the client to resume")
+    
+    def expire_client(self, client_key):
+        """Called when a parked session's resume window has passed."""
+        if self.forget_client(client_key) is not None:
+            self.log(f"⌛ [EXPIRED] {client_key}: did not resume in time")
+    
+    def forget_client(self, client_key):
+        """Drop all per-client state and reset only that client's device."""
+        if self.resume is not None:
+            self.resume.forget(client_key)
+        self.metrics.remove(client_key)
+        session = self.sessions.close(client_key)
+        if session is not None:
+            session.clear()
+            
+            # Free the device only once its reset ran on the output side,
+            # or the reset could land on the next client's writes
+            def reset_and_release():
+                session.reset_output()
+                self.sessions.release(session.device_id)
+            self.run_on_output(reset_and_release)
+            if self.capture is not None:
+                self.capture.record_disconnect(client_key, session.device_id)
+            self.log(f"🛑 [CLEANUP] Reset {session.output.name} device #{session.device_id} "
+                     f"for {client_key}")
+        return session
+    
+    def handle_udp_connect(self, client_key, client_ip, tracker):
+        """Called when a new UDP sender sent its first valid datagram. Returns True if admitted."""
+        session = self.open_session(client_key, client_ip, tracker)
+        if session is None:
+            return False
+        self.log(f"✅ [CONNECTED] Client at {client_key} → device #{session.device_id}")
+        return True
+    
+    def handle_udp_timeout(self, client_key, tracker):
+        """Called when a UDP sender stopped sending."""
+        if self.forget_client(client_key) is None:
+            return
+        self.log(f"❌ [DISCONNECTED] Client at {client_key} (timeout)")
+        self.log(f"📊 [STATS] {client_key}: {tracker.summary()}")
+    
+    async def clock_sync_loop(self, websocket, clock):
+        """Send clock sync pings to a WebSocket client (burst, then periodic)."""
+        try:
+            while True:
+                ping_id, t0_ms = clock.make_ping(time.perf_counter())
+                await websocket.send(encode_ping(ping_id, t0_ms))
+                await asyncio.sleep(clock.next_delay())
+        except websockets.exceptions.ConnectionClosed:
+            pass
+    
+    def handle_control(self, client_key, clock, control, arrival):
+        """Handle a control message (JSON object with a "type") from a client."""
+        if control["type"] == CONTROL_PONG and clock is not None:
+            was_synced = clock.synced
+            if clock.on_pong(control, arrival) and not was_synced:
+                self.log(f"🕒 [CLOCK] {client_key}: {clock.summary()}")
     
     async def handle_client(self, websocket, path):
         """
@@ -369,39 +849,151 @@ class SteeringWheelBridge:
             path: Connection path
         """
         client_address = websocket.remote_address[0] if websocket.remote_address else "Unknown"
-        self.log(f"✅ [CONNECTED] Client at {client_address}")
+        wire_format = {BATCH_SUBPROTOCOL: "binary batches",
+                       BINARY_SUBPROTOCOL: "binary"}.get(websocket.subprotocol, "JSON")
+        client_port = websocket.remote_address[1] if websocket.remote_address else 0
+        client_key = f"ws://{client_address}:{client_port}"
+        
+        # Resume the session of a token from an earlier connection
+        session = None
+        resume_token = token_from_path(path) if self.resume is not None else None
+        claimed = self.resume.claim(resume_token, websocket) if resume_token else None
+        if claimed is not None:
+            client_key, previous = claimed
+            session = self.sessions.get(client_key)
+        if session is not None:
+            # Same tracker and clock: the phone keeps its sequence and clock
+            tracker = session.tracker
+            clock = session.clock
+            session.discard_buffered()
+            self.log(f"🔁 [RESUMED] Client at {client_address} ({wire_format}) → device #{session.device_id}, "
+                     f"session {client_key}")
+            if previous is not None:
+                # The old connection isn't noticed as dead yet: retire it
+                asyncio.create_task(previous.close(code=1001, reason="Session resumed"))
+        else:
+            tracker = SequenceTracker()
+            clock = ClockSync(**self.clock_sync_params) if self.clock_sync_params is not None else None
+            session = self.open_session(client_key, client_address, tracker, clock)
+            if session is None:
+                await websocket.close(code=1013, reason="No free output device")
+                return
+            self.log(f"✅ [CONNECTED] Client at {client_address} ({wire_format}) → device #{session.device_id}")
+        if ensure_nodelay(websocket.transport) is False:
+            self.log(f"🔧 [TCP] Enabled TCP_NODELAY for {client_address} (was off)")
+        
+        if self.resume is not None:
+            token = self.resume.token(client_key) or self.resume.issue(client_key, websocket)
+            try:
+                await websocket.send(encode_session(token, self.resume.window))
+            except websockets.exceptions.ConnectionClosed:
+                pass  # Handled by the receive loop below
+        
+        clock_task = None
+        if clock is not None:
+            clock_task = asyncio.create_task(self.clock_sync_loop(websocket, clock))
         
         try:
             # Continuously receive messages from client
             async for message in websocket:
+                arrival = time.perf_counter()
                 try:
-                    # Parse JSON data
-                    data = json.loads(message)
+                    # Control messages (clock sync pongs) are JSON objects with a "type"
+                    control = decode_control(message)
+                    if control is not None:
+                        self.handle_control(client_key, clock, control, arrival)
+                        continue
                     
-                    # Extract accelerometer values
-                    x = float(data.get('x', 0))
-                    y = float(data.get('y', 0))
-                    z = float(data.get('z', 0))
-                    
-                    # Extract button states
-                    gas = bool(data.get('gas', False))
-                    brake = bool(data.get('brake', False))
-                    
-                    # Process the data
-                    self.process_sensor_data(x, y, z, gas, brake)
+                    # Decode binary frame/batch or JSON text message
+                    samples = decode_samples(message)
+                    if self.stage_timers.enabled:
+                        self.stage_timers.add("decode", time.perf_counter() - arrival)
+                    for sample in samples:
+                        sample.t_arrival = arrival
+                        
+                        # Process the data (skip duplicates)
+                        if tracker.accept(sample.seq):
+                            self.handle_sample(client_key, sample)
                     
                 except json.JSONDecodeError:
                     self.log(f"⚠️  [ERROR] Invalid JSON: {message}")
-                except (ValueError, KeyError) as e:
+                except (ValueError, KeyError, TypeError) as e:
+                    # Wrongly typed fields must not drop the connection
                     self.log(f"⚠️  [ERROR] Invalid data format: {e}")
         
         except websockets.exceptions.ConnectionClosed:
             self.log(f"❌ [DISCONNECTED] Client at {client_address}")
         
         finally:
-            # Reset steering wheel when client disconnects
-            self.reset_steering_wheel()
-            self.log(f"🛑 [CLEANUP] Reset controls for {client_address}")
+            if clock_task is not None:
+                clock_task.cancel()
+            
+            if self.resume is not None and not self.resume.owns(client_key, websocket):
+                pass  # Session taken over by a resumed connection
+            elif self.resume is not None and websocket.close_code != 1000:
+                # Dropped (not closed by the user): wait for the phone to come back
+                self.park_client(client_key)
+            else:
+                # Reset only this client's steering wheel when it disconnects
+                self.forget_client(client_key)
+            self.log(f"📊 [STATS] {client_address}: {tracker.summary()}")
+            if clock is not None:
+                self.log(f"🕒 [CLOCK] {client_address}: {clock.summary()}")
+    
+    def log_startup_report(self):
+        """Log how long each startup phase took."""
+        total = (time.perf_counter() - STARTUP_T0) * 1000.0
+        phases = ", ".join(f"{name} {ms:.1f} ms" for name, ms in self.startup_times.items())
+        self.log(f"⚡ [STARTUP] Ready in {total:.1f} ms ({phases})")
+    
+    def start_profile(self, seconds=SIGNAL_PROFILE_SECONDS, mode="cprofile"):
+        """Start an on-demand profile in the background (e.g. from a signal)."""
+        if self.profiler.running:
+            self.log("🔬 [PROFILE] Already capturing")
+            return None
+        task = asyncio.create_task(self.profiler.run(seconds, mode, self.output_thread))
+        
+        def report(done):
+            if not done.cancelled() and done.exception() is not None:
+                self.log(f"⚠️  [PROFILE] Failed: {done.exception()}")
+        task.add_done_callback(report)
+        return task
+    
+    def profile_route(self, query):
+        """GET /profile?seconds=10&mode=cprofile|sample: capture, reply with the file path."""
+        params = parse_qs(query)
+        seconds = float(params.get("seconds", [SIGNAL_PROFILE_SECONDS])[0])
+        mode = params.get("mode", ["cprofile"])[0]
+        
+        async def capture():
+            return await self.profiler.run(seconds, mode, self.output_thread) + "\n"
+        return "text/plain", capture()
+    
+    def stages_route(self, query):
+        """GET /stages[?enable=1|0][&reset=1]: switch the stage timers, reply with a summary."""
+        params = parse_qs(query)
+        if "enable" in params:
+            self.stage_timers.enabled = params["enable"][0] not in ("0", "false", "off")
+        if "reset" in params:
+            self.stage_timers.reset()
+        return "text/plain", self.stage_timers.summary()
+    
+    def curve_route(self, query):
+        """
+        GET /curve[?axis=steering&deadzone=0.05&exponent=1.5...]: change a
+        response curve at runtime, reply with all curves.
+        """
+        params = {name: values[0] for name, values in parse_qs(query).items()}
+        axis = params.pop("axis", None)
+        
+        async def apply():
+            if axis is not None:
+                if axis not in self.curves:
+                    raise ValueError(f"Unknown axis '{axis}' (choose from {', '.join(self.curves)})")
+                # Rebuilding a steering table takes a few ms: keep it off the loop
+                await asyncio.to_thread(self.configure_curve, axis, **parse_curve_params(params.items()))
+            return "".join(f"{name}: {curve.describe()}\n" for name, curve in self.curves.items())
+        return "text/plain", apply()
     
     async def start_server(self):
         """Start the WebSocket server."""
@@ -409,7 +1001,52 @@ class SteeringWheelBridge:
         self.log("🏎️  VIRTUAL STEERING WHEEL SERVER (vJoy)")
         self.log("=" * 70)
         self.log(f"🌐 Server: {self.host}:{self.port}")
-        self.log(f"🎮 Device: vJoy Device #{self.vjoy_device_id}")
+        device_ids = ", ".join(f"#{device_id}" for device_id in self.sessions.backends)
+        self.log(f"🎮 Devices: {self.output.name} {device_ids} (one per client)")
+        for client_ip, device_id in self.sessions.assignments.items():
+            self.log(f"   • {client_ip} → device #{device_id}")
+        self.log(f"⏱️  Output rate: {self.output_rate_hz} Hz")
+        for device_id, rate in self.sessions.device_rates.items():
+            self.log(f"   • device #{device_id}: {rate} Hz")
+        self.log(f"🎚️  Steering filter: {self.steering_filter}")
+        if self.use_output_thread:
+            self.log(f"🧵 Output thread: {self.output_priority} priority")
+        else:
+            self.log("🧵 Output: on the event loop")
+        if self.jitter_buffer is not None:
+            self.log(f"🧺 Jitter buffer: {self.jitter_buffer}")
+        if self.input_timeout is not None:
+            self.log(f"🐕 Input watchdog: neutral after {self.input_timeout * 1000:.0f} ms without samples "
+                     f"({self.watchdog_params.get('mode', 'ramp')})")
+        if self.clock_sync_params is not None:
+            self.log("🕒 Clock sync: ping/pong with WebSocket clients")
+        if self.resume is not None:
+            self.log(f"🔁 Session resume: dropped WebSocket clients may reconnect within {self.resume.window:g} s")
+        self.log(f"📈 Curves: steering {self.curves['steering'].describe()}, "
+                 f"gas {self.curves['gas'].describe()}, brake {self.curves['brake'].describe()}")
+        if self.prediction_horizon is not None:
+            self.log(f"🔮 Prediction: {self.prediction_horizon * 1000:.0f} ms horizon")
+        self.log(f"📡 Protocol: binary ({BATCH_SUBPROTOCOL}, {BINARY_SUBPROTOCOL}) with JSON fallback")
+        if self.resample:
+            self.log("🎞️  Multi-sample frames: interpolated onto the output tick")
+        self.log(f"🚀 WebSocket profile: {describe_profile(self.server_profile)}, "
+                 f"event loop: {event_loop_name()}")
+        if self.udp_port:
+            self.log(f"📡 UDP: {self.host}:{self.udp_port} (one sample or batch per datagram)")
+        if self.capture is not None:
+            self.log(f"🎞️  Capture: {self.capture.path}")
+        if self.metrics_port:
+            self.log(f"📈 Metrics: http://127.0.0.1:{self.metrics_port}/metrics")
+        if self.shared_state_name:
+            self.log(f"🗂️  Shared state: '{self.shared_state_name}' (python shared_state.py {self.shared_state_name})")
+        profile_triggers = []
+        if self.metrics_port:
+            profile_triggers.append(f"http://127.0.0.1:{self.metrics_port}/profile?seconds=10")
+        if signal_name() is not None:
+            profile_triggers.append(signal_name())
+        if profile_triggers:
+            self.log(f"🔬 Profile on demand: {' or '.join(profile_triggers)}"
+                     f"{' (stage timers on)' if self.stage_timers.enabled else ''}")
         self.log("")
         self.log("🎮 Steering Wheel Mapping:")
         self.log("   • Y-axis (tilt L/R) → X-AXIS (steering)")
@@ -423,7 +1060,7 @@ class SteeringWheelBridge:
         self.log("")
         self.log("📱 Phone Setup:")
         self.log("   1. Open React Native app")
-        self.log("   2. Enter: ws://YOUR_PC_IP:5000")
+        self.log(f"   2. Enter: ws://YOUR_PC_IP:{self.port}")
         self.log("   3. Hold phone HORIZONTAL (landscape)")
         self.log("")
         self.log("🔧 Verify vJoy:")
@@ -433,17 +1070,69 @@ class SteeringWheelBridge:
         self.log("⏳ Waiting for connection...")
         self.log("")
         
+        servers_start = time.perf_counter()
+        
+        # Start local metrics endpoint
+        metrics_server = None
+        if self.metrics_port:
+            metrics_server = MetricsServer(self.metrics, port=self.metrics_port, log=self.log)
+            metrics_server.routes["/profile"] = self.profile_route
+            metrics_server.routes["/stages"] = self.stages_route
+            metrics_server.routes["/curve"] = self.curve_route
+            await metrics_server.start()
+        
+        # Signal for a profile without the metrics port (SIGUSR1 / Ctrl+Break)
+        restore_signal = install_profile_signal(self.start_profile)
+        
+        # Shared-memory state export (written from the output side)
+        if self.shared_state_name:
+            self.shared_state = SharedStateWriter(self.shared_state_name).open()
+        
+        # Start UDP listener next to the WebSocket server
+        udp_transport = None
+        if self.udp_port:
+            loop = asyncio.get_running_loop()
+            udp_transport, _ = await loop.create_datagram_endpoint(
+                lambda: UdpSampleProtocol(
+                    self.handle_sample,
+                    on_connect=self.handle_udp_connect,
+                    on_timeout=self.handle_udp_timeout,
+                    log=self.log,
+                ),
+                local_addr=(self.host, self.udp_port),
+            )
+        
         # Start WebSocket server
-        async with websockets.serve(self.handle_client, self.host, self.port):
-            # Keep server running indefinitely
-            await asyncio.Future()
+        try:
+            async with websockets.serve(self.handle_client, self.host, self.port,
+                                        subprotocols=SUBPROTOCOLS, **self.serve_options):
+                self.startup_times["servers"] = (time.perf_counter() - servers_start) * 1000.0
+                self.log_startup_report()
+                
+                # Keep server running indefinitely (output errors stop it)
+                await self.output_loop()
+        finally:
+            if udp_transport is not None:
+                udp_transport.close()
+            if metrics_server is not None:
+                metrics_server.close()
+            if restore_signal is not None:
+                restore_signal()
+            if self.shared_state is not None:
+                self.shared_state.close()
+                self.shared_state = None
+            if self.capture is not None:
+                self.capture.stop()
 
 
-def test_vjoy_movement():
+def test_vjoy_movement(interactive=True):
     """
     🧪 INDEPENDENT TEST FUNCTION
     Tests vJoy device movement without WebSocket connection.
     Run this to verify vJoy is working before testing with mobile app.
+    
+    Args:
+        interactive: Wait for ENTER before starting (False for --test)
     """
     print("=" * 70)
     print("🧪 vJoy INDEPENDENT TEST")
@@ -451,44 +1140,17 @@ def test_vjoy_movement():
     print("This will move the vJoy device through all positions.")
     print("Open 'joy.cpl' (Game Controllers) to watch the movement.")
     print("")
-    input("Press ENTER to start test...")
-    print("")
+    if interactive:
+        input("Press ENTER to start test...")
+        print("")
     
     try:
-        from pyvjoy import _sdk
-        
-        # Check driver
-        if not _sdk.vJoyEnabled():
-            print("❌ vJoy driver not enabled!")
-            return
-        
-        device_id = 1
-        status = _sdk.GetVJDStatus(device_id)
-        
-        if status == 3:  # MISS
-            print(f"❌ Device {device_id} not configured!")
-            return
-        
-        # Acquire device
-        if status == 2:  # BUSY
-            _sdk.RelinquishVJD(device_id)
-            time.sleep(0.5)
-        
-        if not _sdk.AcquireVJD(device_id):
-            print(f"❌ Cannot acquire device {device_id}!")
-            return
-        
-        # Initialize
-        j = pyvjoy.VJoyDevice(device_id)
-        print(f"✅ Device {device_id} acquired")
+        # Acquire device (same checks as the server uses)
+        device = VJoyBackend(device_id=1)
+        device.open()
         print("")
         
-        # Corrected axis values
-        AXIS_MIN = 0x1
-        AXIS_MAX = 0x7FFF
-        AXIS_CENTER = 0x4001
-        
-        # Test sequence
+        # Test sequence (steering, gas, brake)
         tests = [
             ("Center position", AXIS_CENTER, AXIS_MIN, AXIS_MIN),
             ("Full LEFT", AXIS_MIN, AXIS_MIN, AXIS_MIN),
@@ -499,16 +1161,15 @@ def test_vjoy_movement():
             ("Reset to center", AXIS_CENTER, AXIS_MIN, AXIS_MIN),
         ]
         
-        for name, x_val, y_val, z_val in tests:
+        for name, steering, gas, brake in tests:
             print(f"🎮 {name}")
-            print(f"   X={x_val:5d} (0x{x_val:04X})  Y={y_val:5d} (0x{y_val:04X})  Z={z_val:5d} (0x{z_val:04X})")
+            print(f"   X={steering:5d} (0x{steering:04X})  Y={brake:5d} (0x{brake:04X})  Z={gas:5d} (0x{gas:04X})")
             
-            j.set_axis(pyvjoy.HID_USAGE_X, x_val)
-            j.set_axis(pyvjoy.HID_USAGE_Y, y_val)
-            j.set_axis(pyvjoy.HID_USAGE_Z, z_val)
+            device.write_axes(steering, gas, brake)
             
             time.sleep(1.5)
         
+        device.close()
         print("")
         print("✅ Test completed!")
         print("If you saw movement in joy.cpl, vJoy is working correctly.")
@@ -520,8 +1181,172 @@ def test_vjoy_movement():
         traceback.print_exc()
 
 
-def main():
+# Defaults of the desktop bridge (config file and CLI flags override them)
+DEFAULT_OPTIONS = {
+    "host": "0.0.0.0",
+    "port": 5000,
+    "vjoy_device_id": 1,        # vJoy Device 1 (change if using different device)
+    "udp_port": 5000,           # UDP samples on the same port number
+    "metrics_port": 9150,       # Prometheus metrics on 127.0.0.1
+    "steering_filter": "one_euro",  # Low-lag smoothing ("none" to disable)
+}
+
+
+def load_config(path):
+    """
+    Read SteeringWheelBridge options from a JSON file.
+
+    Keys are SteeringWheelBridge arguments, e.g.
+        {"port": 5000, "device_ids": [1, 2], "device_rates": {"2": 125},
+         "steering_filter": "kalman", "steering_curve": {"deadzone": 0.03}}
+    """
+    with open(path, encoding="utf-8") as f:
+        options = json.load(f)
+    if not isinstance(options, dict):
+        raise ValueError(f"{path}: expected a JSON object")
+
+    allowed = set(inspect.signature(SteeringWheelBridge.__init__).parameters) - {"self", "backend", "logger"}
+    unknown = set(options) - allowed
+    if unknown:
+        raise ValueError(f"{path}: unknown option(s): {', '.join(sorted(unknown))}")
+
+    # JSON object keys are strings; device IDs are integers
+    if options.get("device_rates"):
+        options["device_rates"] = {int(device_id): rate for device_id, rate in options["device_rates"].items()}
+    return options
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Phone accelerometer → vJoy steering wheel bridge")
+    parser.add_argument("--headless", action="store_true",
+                        help="No prompts: start the server right away (implied by --config)")
+    parser.add_argument("--config", help="JSON file with SteeringWheelBridge options")
+    parser.add_argument("--host", help="Listen address (default 0.0.0.0)")
+    parser.add_argument("--port", type=int, help="WebSocket port (default 5000)")
+    parser.add_argument("--udp-port", type=int, help="UDP port (0 = off, default 5000)")
+    parser.add_argument("--metrics-port", type=int, help="Metrics port on 127.0.0.1 (0 = off, default 9150)")
+    parser.add_argument("--devices", help="Output device pool, e.g. 1,2,3 (default 1)")
+    parser.add_argument("--backend", choices=["vjoy", "null"], help="Output backend (default: vjoy if available)")
+    parser.add_argument("--output-rate", type=int, help="Output rate in Hz (default 250)")
+    parser.add_argument("--output-priority", choices=sorted(PRIORITIES),
+                        help="OS priority of the output thread (default high)")
+    parser.add_argument("--server-profile", choices=sorted(SERVER_PROFILES),
+                        help="WebSocket transport settings (default low_latency)")
+    parser.add_argument("--output-on-loop", action="store_true",
+                        help="Write devices on the event loop instead of the output thread")
+    parser.add_argument("--filter", help="Steering filter: none, one_euro, kalman")
+    parser.add_argument("--prediction", type=float, help="Prediction horizon in ms")
+    parser.add_argument("--jitter-buffer", choices=["low_latency", "smooth"], help="Enable the jitter buffer")
+    parser.add_argument("--input-timeout", type=float,
+                        help="Neutral controls after this many ms without samples (0 = off, default 150)")
+    parser.add_argument("--stall-mode", choices=WATCHDOG_MODES,
+                        help="Fade to neutral on stale input (ramp) or jump (snap)")
+    parser.add_argument("--resume-window", type=float,
+                        help="Seconds a dropped phone may resume its session (0 = off, default 5)")
+    parser.add_argument("--profile-stages", action="store_true",
+                        help="Time the hot-path stages from the start (see /stages on the metrics port)")
+    parser.add_argument("--shared-state", nargs="?", const=SHARED_STATE_NAME, metavar="NAME",
+                        help=f"Publish the live state to shared memory (default name {SHARED_STATE_NAME})")
+    parser.add_argument("--curve", action="append", default=[], metavar="AXIS:PARAM=VALUE,...",
+                        help="Response curve for steering, gas or brake, e.g. "
+                             "steering:deadzone=0.05,exponent=1.5 (repeatable; see curves.py)")
+    parser.add_argument("--capture", help="Record the session to this file")
+    parser.add_argument("--test", action="store_true", help="Run the vJoy movement test and exit")
+    return parser.parse_args(argv)
+
+
+def bridge_options(args):
+    """DEFAULT_OPTIONS, then the config file, then CLI flags."""
+    options = dict(DEFAULT_OPTIONS)
+    if args.config:
+        options.update(load_config(args.config))
+
+    overrides = {
+        "host": args.host,
+        "port": args.port,
+        "udp_port": args.udp_port,
+        "metrics_port": args.metrics_port,
+        "backend_name": args.backend,
+        "output_rate_hz": args.output_rate,
+        "output_priority": args.output_priority,
+        "server_profile": args.server_profile,
+        "output_thread": False if args.output_on_loop else None,
+        "steering_filter": args.filter,
+        "prediction_horizon": args.prediction / 1000.0 if args.prediction else None,
+        "jitter_buffer": args.jitter_buffer,
+        "input_timeout": args.input_timeout / 1000.0 if args.input_timeout is not None else None,
+        "resume_window": args.resume_window,
+        "profile_stages": True if args.profile_stages else None,
+        "shared_state": args.shared_state,
+        "capture_path": args.capture,
+    }
+    if args.stall_mode:
+        overrides["watchdog_params"] = {**(options.get("watchdog_params") or {}), "mode": args.stall_mode}
+    if args.devices:
+        overrides["device_ids"] = [int(device_id) for device_id in args.devices.split(",")]
+    for spec in args.curve:
+        axis, _, params = spec.partition(":")
+        name = f"{axis}_curve"
+        if name not in ("steering_curve", "gas_curve", "brake_curve"):
+            raise ValueError(f"--curve {spec}: axis must be steering, gas or brake")
+        items = [param.split("=", 1) for param in params.split(",") if param]
+        overrides[name] = {**(overrides.get(name) or options.get(name) or {}), **parse_curve_params(items)}
+    options.update({name: value for name, value in overrides.items() if value is not None})
+
+    # 0 disables the optional listeners
+    for name in ("udp_port", "metrics_port"):
+        if not options.get(name):
+            options[name] = None
+    if options.get("input_timeout") == 0:
+        options["input_timeout"] = None
+    return options
+
+
+def run_bridge(options):
+    """Create the bridge and serve until Ctrl+C."""
+    try:
+        # Create steering wheel bridge instance
+        bridge = SteeringWheelBridge(**options)
+        
+        # uvloop/winloop for the low-latency profile (if installed)
+        install_fast_event_loop(bridge.server_profile)
+        
+        # Start the server
+        asyncio.run(bridge.start_server())
+    
+    except KeyboardInterrupt:
+        print("\n")
+        print("=" * 70)
+        print("🛑 Server stopped by user (Ctrl+C)")
+        print("=" * 70)
+    
+    except Exception as e:
+        print(f"\n❌ [CRITICAL ERROR] {e}")
+        import traceback
+        traceback.print_exc()
+
+
+def main(argv=None):
     """Main entry point for the application."""
+    args = parse_args(argv)
+    try:
+        options = bridge_options(args)
+    except (OSError, ValueError) as e:
+        print(f"❌ Invalid configuration: {e}")
+        exit(2)
+    
+    if args.test:
+        test_vjoy_movement(interactive=False)
+        return
+    
+    # Headless: no prompts, start right away
+    if args.headless or args.config:
+        if not VJOY_AVAILABLE and options.get("backend_name") in (None, "vjoy"):
+            print("⚠️  vJoy is not installed, using the null output device")
+            options["backend_name"] = "null"
+        check_admin_privileges(interactive=False)
+        run_bridge(options)
+        return
     
     # ⚠️ vJoy INSTALLATION WARNING
     print("=" * 70)
@@ -531,6 +1356,7 @@ def main():
     print("This program requires vJoy driver to be installed!")
     
     if not VJOY_AVAILABLE:
+        print_vjoy_install_steps()
         print("❌ vJoy is not installed! Please follow the steps above.")
         input("\nPress ENTER to exit...")
         exit(1)
@@ -563,27 +1389,7 @@ def main():
         test_vjoy_movement()
         return
     
-    try:
-        # Create steering wheel bridge instance
-        bridge = SteeringWheelBridge(
-            host='0.0.0.0', 
-            port=5000,
-            vjoy_device_id=1  # vJoy Device 1 (change if using different device)
-        )
-        
-        # Start the server
-        asyncio.run(bridge.start_server())
-    
-    except KeyboardInterrupt:
-        print("\n")
-        print("=" * 70)
-        print("🛑 Server stopped by user (Ctrl+C)")
-        print("=" * 70)
-    
-    except Exception as e:
-        print(f"\n❌ [CRITICAL ERROR] {e}")
-        import traceback
-        traceback.print_exc()
+    run_bridge(options)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,404 @@
+"""
+Latency Metrics for the Steering Wheel Bridge
+Per-client, per-stage latency histograms and a small HTTP endpoint that
+serves them in Prometheus text format.
+
+Stages (seconds):
+- network: one-way delay, client send → bridge arrival. Absolute once the
+           client's clock is synced (clocksync.py); before that (and for
+           clients without sync) it is the delay ABOVE the fastest sample
+           seen so far
+- parse:   socket read → decoded sample entering the pipeline
+- queue:   sample arrival → output tick that picks it up
+- map:     axis mapping at the output tick
+- write:   output device (driver) write
+- total:   sample arrival → output write finished
+"""
+
+import asyncio
+import bisect
+import time
+
+STAGES = ("network", "parse", "queue", "map", "write", "total")
+
+# Fixed bucket upper bounds in seconds (10 µs .. 1 s)
+BUCKETS = (
+    0.00001, 0.000025, 0.00005,
+    0.0001, 0.00025, 0.0005,
+    0.001, 0.0025, 0.005,
+    0.01, 0.025, 0.05,
+    0.1, 0.25, 0.5,
+    1.0,
+)
+
+# Stall durations in seconds (input watchdog)
+STALL_BUCKETS = (0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+QUANTILES = (0.5, 0.95, 0.99)
+
+
+class Histogram:
+    """Fixed-bucket histogram with O(log buckets) observe()."""
+
+    __slots__ = ("bounds", "counts", "count", "sum")
+
+    def __init__(self, bounds=BUCKETS):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)  # Last slot is +Inf
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def quantile(self, q):
+        """Estimate a quantile by linear interpolation inside its bucket."""
+        if self.count == 0:
+            return None
+        rank = q * self.count
+        seen = 0
+        lower = 0.0
+        for i, bucket_count in enumerate(self.counts):
+            upper = self.bounds[i] if i < len(self.bounds) else self.bounds[-1]
+            if bucket_count and seen + bucket_count >= rank:
+                return lower + (upper - lower) * (rank - seen) / bucket_count
+            seen += bucket_count
+            lower = upper
+        return self.bounds[-1]
+
+
+class RateMeter:
+    """Samples per second over a sliding one-second window."""
+
+    __slots__ = ("window_start", "window_count", "rate")
+
+    def __init__(self):
+        self.window_start = time.perf_counter()
+        self.window_count = 0
+        self.rate = 0.0
+
+    def tick(self, now):
+        self.window_count += 1
+        elapsed = now - self.window_start
+        if elapsed >= 1.0:
+            self.rate = self.window_count / elapsed
+            self.window_start = now
+            self.window_count = 0
+
+    def current(self, now):
+        """Last full-window rate, or 0 once the client went quiet."""
+        return self.rate if now - self.window_start < 2.0 else 0.0
+
+
+class ClientMetrics:
+    """Latency histograms and packet counters for one client."""
+
+    def __init__(self, client_key, tracker=None):
+        """
+        Args:
+            client_key: Client identifier (used as the Prometheus label)
+            tracker: protocol.SequenceTracker with loss/reorder counts
+        """
+        self.client_key = client_key
+        self.tracker = tracker
+        self.stages = {stage: Histogram() for stage in STAGES}
+        self.rate = RateMeter()
+        self.samples = 0
+        self.writes = 0
+        self.writes_skipped = 0  # Output ticks with no visible change (no driver call)
+        self.min_offset = None  # Smallest (arrival - client time) seen
+        self.filter_lag = 0.0   # Lag added by the steering filter (seconds)
+        self.jitter_buffer = None  # jitter_buffer.JitterBuffer when enabled
+        self.clock = None          # clocksync.ClockSync when enabled
+        self.resampler = None      # resampler.Resampler when enabled
+        self.watchdog = None       # input_watchdog.InputWatchdog when enabled
+        self.stall_durations = Histogram(STALL_BUCKETS)
+
+    def observe_sample(self, sample, now):
+        """Record network and parse stages for a sample entering the pipeline."""
+        self.samples += 1
+        self.rate.tick(now)
+        arrival = sample.t_arrival
+        if arrival is None:
+            return
+        self.stages["parse"].observe(now - arrival)
+
+        if sample.t_client is not None:
+            clock = self.clock
+            if clock is not None and clock.synced:
+                self.stages["network"].observe(max(0.0, arrival - clock.to_server_time(sample.t_client)))
+                return
+            offset = arrival - sample.t_client
+            if self.min_offset is None or offset < self.min_offset:
+                self.min_offset = offset
+            self.stages["network"].observe(offset - self.min_offset)
+
+    def observe_stall(self, duration):
+        """Record a finished input stall (seconds without samples)."""
+        self.stall_durations.observe(duration)
+
+    def observe_output(self, arrival, tick_start, mapped, written):
+        """Record queue/map/write/total stages for one output write."""
+        self.writes += 1
+        stages = self.stages
+        stages["queue"].observe(tick_start - arrival)
+        stages["map"].observe(mapped - tick_start)
+        stages["write"].observe(written - mapped)
+        stages["total"].observe(written - arrival)
+
+
+class MetricsRegistry:
+    """All client metrics plus bridge-wide counters."""
+
+    def __init__(self):
+        self.clients = {}
+        self.output_writes = 0
+        self.output_writes_skipped = 0
+        self.resume = None  # resumption.ResumeRegistry when enabled
+        self.stage_timers = None  # profiling.StageTimers
+
+    def client(self, client_key, tracker=None):
+        """Get (or create) the metrics for a client."""
+        metrics = self.clients.get(client_key)
+        if metrics is None:
+            metrics = self.clients[client_key] = ClientMetrics(client_key, tracker)
+        elif tracker is not None:
+            metrics.tracker = tracker
+        return metrics
+
+    def remove(self, client_key):
+        self.clients.pop(client_key, None)
+
+    def render(self):
+        """Prometheus text exposition format (version 0.0.4)."""
+        lines = []
+
+        def family(name, kind, help_text):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+
+        clients = list(self.clients.values())
+
+        family("steeringwheel_stage_seconds", "histogram", "Per-stage latency of the input pipeline")
+        for metrics in clients:
+            for stage, histogram in metrics.stages.items():
+                labels = f'client="{metrics.client_key}",stage="{stage}"'
+                cumulative = 0
+                for bound, bucket_count in zip(histogram.bounds, histogram.counts):
+                    cumulative += bucket_count
+                    lines.append(f'steeringwheel_stage_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+                lines.append(f'steeringwheel_stage_seconds_bucket{{{labels},le="+Inf"}} {histogram.count}')
+                lines.append(f"steeringwheel_stage_seconds_sum{{{labels}}} {histogram.sum:.9f}")
+                lines.append(f"steeringwheel_stage_seconds_count{{{labels}}} {histogram.count}")
+
+        family("steeringwheel_stage_quantile_seconds", "gauge", "Estimated p50/p95/p99 per stage")
+        for metrics in clients:
+            for stage, histogram in metrics.stages.items():
+                for q in QUANTILES:
+                    value = histogram.quantile(q)
+                    if value is not None:
+                        lines.append(
+                            f'steeringwheel_stage_quantile_seconds{{client="{metrics.client_key}",'
+                            f'stage="{stage}",quantile="{q}"}} {value:.9f}')
+
+        family("steeringwheel_packet_rate", "gauge", "Samples per second over the last second")
+        now = time.perf_counter()
+        for metrics in clients:
+            lines.append(f'steeringwheel_packet_rate{{client="{metrics.client_key}"}} {metrics.rate.current(now):.2f}')
+
+        family("steeringwheel_filter_lag_seconds", "gauge", "Estimated lag added by the steering filter")
+        for metrics in clients:
+            lines.append(f'steeringwheel_filter_lag_seconds{{client="{metrics.client_key}"}} {metrics.filter_lag:.6f}')
+
+        buffered = [metrics for metrics in clients if metrics.jitter_buffer is not None]
+        if buffered:
+            gauges = (
+                ("steeringwheel_jitter_seconds", "Estimated interarrival jitter (RFC 3550)",
+                 lambda buffer: buffer.jitter),
+                ("steeringwheel_jitter_buffer_delay_seconds", "Current jitter buffer playout delay",
+                 lambda buffer: buffer.delay),
+            )
+            for name, help_text, getter in gauges:
+                family(name, "gauge", help_text)
+                for metrics in buffered:
+                    lines.append(f'{name}{{client="{metrics.client_key}"}} {getter(metrics.jitter_buffer):.6f}')
+            buffer_counters = (
+                ("steeringwheel_jitter_late_total", "Samples that arrived after their playout time",
+                 lambda buffer: buffer.late),
+                ("steeringwheel_jitter_dropped_total", "Samples dropped by a full jitter buffer",
+                 lambda buffer: buffer.dropped),
+            )
+            for name, help_text, getter in buffer_counters:
+                family(name, "counter", help_text)
+                for metrics in buffered:
+                    lines.append(f'{name}{{client="{metrics.client_key}"}} {getter(metrics.jitter_buffer)}')
+
+        resampled = [metrics for metrics in clients
+                     if metrics.resampler is not None and metrics.resampler.count]
+        if resampled:
+            family("steeringwheel_resample_delay_seconds", "gauge",
+                   "Playout delay of multi-sample frames")
+            for metrics in resampled:
+                lines.append(f'steeringwheel_resample_delay_seconds{{client="{metrics.client_key}"}} '
+                             f'{metrics.resampler.delay:.6f}')
+            family("steeringwheel_resample_underruns_total", "counter",
+                   "Multi-sample frames that arrived after playout ran out of samples")
+            for metrics in resampled:
+                lines.append(f'steeringwheel_resample_underruns_total{{client="{metrics.client_key}"}} '
+                             f'{metrics.resampler.underruns}')
+
+        watched = [metrics for metrics in clients if metrics.watchdog is not None]
+        if watched:
+            family("steeringwheel_input_stalled", "gauge",
+                   "1 while the client's input is stale and its device is held at neutral")
+            for metrics in watched:
+                lines.append(f'steeringwheel_input_stalled{{client="{metrics.client_key}"}} '
+                             f'{int(metrics.watchdog.stalled)}')
+            family("steeringwheel_input_stalls_total", "counter",
+                   "Times the client's input went stale")
+            for metrics in watched:
+                lines.append(f'steeringwheel_input_stalls_total{{client="{metrics.client_key}"}} '
+                             f'{metrics.watchdog.stalls}')
+            family("steeringwheel_input_stall_seconds", "histogram",
+                   "Duration of finished input stalls")
+            for metrics in watched:
+                histogram = metrics.stall_durations
+                labels = f'client="{metrics.client_key}"'
+                cumulative = 0
+                for bound, bucket_count in zip(histogram.bounds, histogram.counts):
+                    cumulative += bucket_count
+                    lines.append(f'steeringwheel_input_stall_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+                lines.append(f'steeringwheel_input_stall_seconds_bucket{{{labels},le="+Inf"}} {histogram.count}')
+                lines.append(f"steeringwheel_input_stall_seconds_sum{{{labels}}} {histogram.sum:.6f}")
+                lines.append(f"steeringwheel_input_stall_seconds_count{{{labels}}} {histogram.count}")
+
+        synced = [metrics for metrics in clients if metrics.clock is not None and metrics.clock.synced]
+        if synced:
+            gauges = (
+                ("steeringwheel_clock_offset_seconds", "Client clock minus bridge clock",
+                 lambda clock: f"{clock.offset:.6f}"),
+                ("steeringwheel_clock_rtt_seconds", "Round trip of the best clock sync exchange",
+                 lambda clock: f"{clock.rtt:.6f}"),
+                ("steeringwheel_clock_drift_ppm", "Estimated client clock drift",
+                 lambda clock: f"{clock.drift * 1e6:.2f}"),
+            )
+            for name, help_text, getter in gauges:
+                family(name, "gauge", help_text)
+                for metrics in synced:
+                    lines.append(f'{name}{{client="{metrics.client_key}"}} {getter(metrics.clock)}')
+
+        counters = (
+            ("steeringwheel_samples_total", "Samples accepted into the pipeline",
+             lambda m: m.samples),
+            ("steeringwheel_packets_lost_total", "Samples missing from the sequence",
+             lambda m: m.tracker.lost if m.tracker else 0),
+            ("steeringwheel_packets_reordered_total", "Stale/reordered samples dropped",
+             lambda m: m.tracker.reordered if m.tracker else 0),
+            ("steeringwheel_packets_duplicate_total", "Duplicate samples dropped",
+             lambda m: m.tracker.duplicates if m.tracker else 0),
+            ("steeringwheel_client_writes_skipped_total", "Output writes avoided (no visible change)",
+             lambda m: m.writes_skipped),
+        )
+        for name, help_text, getter in counters:
+            family(name, "counter", help_text)
+            for metrics in clients:
+                lines.append(f'{name}{{client="{metrics.client_key}"}} {getter(metrics)}')
+
+        family("steeringwheel_output_writes_total", "counter", "Writes to the output device")
+        lines.append(f"steeringwheel_output_writes_total {self.output_writes}")
+
+        family("steeringwheel_output_writes_skipped_total", "counter",
+               "Output writes avoided by dirty tracking and hysteresis")
+        lines.append(f"steeringwheel_output_writes_skipped_total {self.output_writes_skipped}")
+
+        family("steeringwheel_clients", "gauge", "Connected clients")
+        lines.append(f"steeringwheel_clients {len(clients)}")
+
+        timers = self.stage_timers
+        if timers is not None and (timers.enabled or any(timers.calls.values())):
+            family("steeringwheel_hotpath_calls_total", "counter", "Timed calls per hot-path stage")
+            for stage, calls in timers.calls.items():
+                lines.append(f'steeringwheel_hotpath_calls_total{{stage="{stage}"}} {calls}')
+            family("steeringwheel_hotpath_seconds_total", "counter", "Time spent per hot-path stage")
+            for stage, seconds in timers.seconds.items():
+                lines.append(f'steeringwheel_hotpath_seconds_total{{stage="{stage}"}} {seconds:.9f}')
+            family("steeringwheel_hotpath_max_seconds", "gauge", "Slowest call per hot-path stage")
+            for stage, seconds in timers.max.items():
+                lines.append(f'steeringwheel_hotpath_max_seconds{{stage="{stage}"}} {seconds:.9f}')
+
+        if self.resume is not None:
+            family("steeringwheel_sessions_parked", "gauge", "Dropped sessions waiting for their client")
+            lines.append(f"steeringwheel_sessions_parked {self.resume.parked}")
+            family("steeringwheel_sessions_resumed_total", "counter", "Reconnects that resumed their session")
+            lines.append(f"steeringwheel_sessions_resumed_total {self.resume.resumed}")
+            family("steeringwheel_sessions_expired_total", "counter",
+                   "Parked sessions dropped because the client did not return in time")
+            lines.append(f"steeringwheel_sessions_expired_total {self.resume.expired}")
+
+        return "\n".join(lines) + "\n"
+
+
+class MetricsServer:
+    """
+    Minimal HTTP/1.0 server for local scraping.
+
+    Routes are {path: callable returning (content_type, body)}; /metrics is
+    registered by default.
+    """
+
+    def __init__(self, registry, host='127.0.0.1', port=9150, log=print):
+        self.registry = registry
+        self.host = host
+        self.port = port
+        self.log = log
+        self.routes = {
+            "/metrics": lambda query: ("text/plain; version=0.0.4", self.registry.render()),
+        }
+        self._server = None
+
+    async def start(self):
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        return self
+
+    def close(self):
+        if self._server is not None:
+            self._server.close()
+            self._server = None
+
+    async def _handle(self, reader, writer):
+        try:
+            request_line = await asyncio.wait_for(reader.readline(), timeout=5.0)
+            # Skip request headers
+            while True:
+                line = await asyncio.wait_for(reader.readline(), timeout=5.0)
+                if not line or line in (b"\r\n", b"\n"):
+                    break
+
+            parts = request_line.decode("latin-1").split()
+            target = parts[1] if len(parts) >= 2 else "/"
+            path, _, query = target.partition("?")
+            route = self.routes.get(path)
+
+            if route is None:
+                status, content_type, body = "404 Not Found", "text/plain", "not found\n"
+            else:
+                try:
+                    content_type, body = route(query)
+                    if asyncio.iscoroutine(body):
+                        body = await body
+                    status = "200 OK"
+                except Exception as e:
+                    status, content_type, body = "500 Internal Server Error", "text/plain", f"{e}\n"
+
+            payload = body.encode("utf-8") if isinstance(body, str) else body
+            writer.write(
+                f"HTTP/1.0 {status}\r\nContent-Type: {content_type}\r\n"
+                f"Content-Length: {len(payload)}\r\nConnection: close\r\n\r\n".encode("latin-1")
+                + payload)
+            await writer.drain()
+        except (asyncio.TimeoutError, ConnectionError):
+            pass
+        finally:
+            writer.close()
@@ -0,0 +1,339 @@
+"""
+Output Backends for the Steering Wheel Bridge
+Pluggable output devices that receive the final axis values.
+
+Backends:
+- VJoyBackend:      Real vJoy device (Windows). Pushes all axes in ONE driver
+                    call per sample via UpdateVJD (full-position update).
+- RecordingBackend: Keeps every write in memory (tests, benchmarks, CI).
+- NullBackend:      Linux/macOS stand-in. Accepts writes and keeps the last
+                    position, so the real bridge pipeline runs headless.
+"""
+
+import collections
+import time
+
+# pyvjoy calls sys.exit() at import time when the vJoy DLL cannot be loaded,
+# so SystemExit has to be caught here as well as ImportError.
+try:
+    import pyvjoy
+    VJOY_AVAILABLE = True
+except (ImportError, SystemExit):
+    pyvjoy = None
+    VJOY_AVAILABLE = False
+
+
+# vJoy uses 16-bit values: 0x1 (min) to 0x7FFF (max), NOT 0x8000
+# Center is 0x4001 (16385), not 0x4000
+AXIS_MIN = 0x1        # 1 (minimum value)
+AXIS_MAX = 0x7FFF     # 32767 (maximum value)
+AXIS_CENTER = 0x4001  # 16385 (center)
+
+
+class BackendError(Exception):
+    """Raised when an output backend cannot be opened or stops responding."""
+
+
+def poll(condition, timeout=0.5, interval=0.002):
+    """
+    Call condition() until it returns a true value or the timeout expires.
+    Returns the last result (so callers can tell success from timeout).
+    """
+    deadline = time.monotonic() + timeout
+    while True:
+        result = condition()
+        if result or time.monotonic() >= deadline:
+            return result
+        time.sleep(interval)
+
+
+class OutputBackend:
+    """
+    Base class for output devices.
+
+    Axis values are already mapped to the vJoy range (AXIS_MIN..AXIS_MAX).
+    Subclasses implement write_axes(); everything else has sane defaults.
+    """
+
+    name = "base"
+
+    def __init__(self, device_id=1, log=print):
+        """
+        Args:
+            device_id: Output device ID (vJoy device 1-16)
+            log: Callable used for status messages
+        """
+        self.device_id = device_id
+        self.log = log
+        self.write_count = 0
+
+    def open(self):
+        """Acquire the output device. Raises BackendError on failure."""
+
+    def write_axes(self, steering, gas, brake):
+        """
+        Write all axes in a single update.
+
+        Args:
+            steering: Steering axis value
+            gas: Gas axis value
+            brake: Brake axis value
+        """
+        raise NotImplementedError
+
+    def reset(self):
+        """Put all axes back to neutral/off."""
+        self.write_axes(AXIS_CENTER, AXIS_MIN, AXIS_MIN)
+
+    def close(self):
+        """Release the output device."""
+
+
+class VJoyBackend(OutputBackend):
+    """vJoy output device using a single UpdateVJD call per write."""
+
+    name = "vjoy"
+
+    # vJoy device status constants
+    VJD_STAT_OWN = 0    # Device is owned by this process
+    VJD_STAT_FREE = 1   # Device is free
+    VJD_STAT_BUSY = 2   # Device is owned by another process
+    VJD_STAT_MISS = 3   # Device is not installed/configured
+    VJD_STAT_UNKN = 4   # Unknown status
+
+    # HID usages of the axes the bridge drives
+    REQUIRED_AXES = (
+        (0x30, "X-Axis (Steering)"),
+        (0x31, "Y-Axis (Brake)"),
+        (0x32, "Z-Axis (Gas)"),
+    )
+
+    def __init__(self, device_id=1, log=print, status_timeout=0.5):
+        """
+        Args:
+            device_id: vJoy device ID (1-16)
+            log: Callable used for status messages
+            status_timeout: Max seconds to wait for a release to take effect
+        """
+        super().__init__(device_id, log)
+        self.status_timeout = status_timeout
+        self.joystick = None
+        self._data = None
+
+    def open(self):
+        """Acquire the vJoy device and verify that X, Y and Z axes exist."""
+        if not VJOY_AVAILABLE:
+            raise BackendError("pyvjoy is not installed")
+
+        from pyvjoy import _sdk
+        device_id = self.device_id
+
+        try:
+            # Check if vJoy driver is enabled
+            if hasattr(_sdk, 'vJoyEnabled') and callable(_sdk.vJoyEnabled):
+                if not _sdk.vJoyEnabled():
+                    self.log("❌ vJoy driver is not enabled!")
+                    self.log("")
+                    self.log("🔧 SOLUTION:")
+                    self.log("   1. https://github.com/njz3/vJoy/releases")
+                    self.log("   2. Install vJoySetup.exe as Administrator")
+                    self.log("   3. Restart your computer")
+                    raise BackendError("vJoy driver is not enabled")
+
+            status = _sdk.GetVJDStatus(device_id)
+
+            if status == self.VJD_STAT_BUSY:
+                self.log(f"⚠️  Device {device_id} is busy, releasing...")
+                _sdk.RelinquishVJD(device_id)
+
+                # Poll until the release took effect (instead of a fixed sleep)
+                poll(lambda: _sdk.GetVJDStatus(device_id) != self.VJD_STAT_BUSY, self.status_timeout)
+                status = _sdk.GetVJDStatus(device_id)
+                if status == self.VJD_STAT_BUSY:
+                    self.log("❌ Failed to release device!")
+                    self.log("")
+                    self.log("🔧 SOLUTION:")
+                    self.log("   1. Close joy.cpl (Game Controllers)")
+                    self.log("   2. Close programs using vJoy")
+                    self.log("   3. Restart your computer")
+                    raise BackendError(f"vJoy device {device_id} is busy")
+
+            elif status == self.VJD_STAT_MISS:
+                self.log(f"❌ Device {device_id} is not configured!")
+                self.log("")
+                self.log("🔧 SOLUTION:")
+                self.log("   1. Open 'Configure vJoy' from Start menu")
+                self.log(f"   2. Enable Device {device_id}")
+                self.log("   3. Enable X, Y, Z axes")
+                self.log("   4. Click 'Apply'")
+                self.log("")
+                self.log("OR run in terminal:")
+                self.log("   python diagnose_vjoy.py")
+                raise BackendError(f"vJoy device {device_id} is not configured")
+
+            elif status == self.VJD_STAT_FREE or status == self.VJD_STAT_OWN:
+                # Release a stale handle of this process first
+                if status == self.VJD_STAT_OWN:
+                    try:
+                        _sdk.RelinquishVJD(device_id)
+                        poll(lambda: _sdk.GetVJDStatus(device_id) == self.VJD_STAT_FREE,
+                             self.status_timeout)
+                    except:
+                        pass
+
+                # Now acquire
+                if _sdk.AcquireVJD(device_id):
+                    self.log(f"✅ Device {device_id} acquired successfully")
+                else:
+                    self.log(f"❌ Failed to acquire device {device_id}!")
+                    self.log("   Please run diagnose_vjoy.py")
+                    raise BackendError(f"Cannot acquire vJoy device {device_id}")
+
+        except BackendError:
+            raise
+        except AttributeError:
+            self.log("⚠️  Old pyvjoy version, basic checks cannot be performed...")
+        except Exception as e:
+            self.log(f"⚠️  Status check error: {e}")
+            self.log("   Continuing...")
+
+        # Initialize device
+        self.joystick = pyvjoy.VJoyDevice(device_id)
+        self._data = self.joystick.data
+        self.log(f"🎮 vJoy Device #{device_id} initialized!")
+
+        # Validate that required axes are available
+        self.log("🔍 Checking axis availability...")
+        axes_available = True
+
+        axis_exists = getattr(getattr(_sdk, "_vj", None), "GetVJDAxisExist", None)
+        if axis_exists is not None:
+            # Query the driver's configuration (no writes)
+            for usage, label in self.REQUIRED_AXES:
+                if axis_exists(device_id, usage):
+                    self.log(f"   ✅ {label} is available")
+                else:
+                    self.log(f"   ❌ {label} not available")
+                    axes_available = False
+        else:
+            # Old pyvjoy: probe by writing a neutral value to each axis
+            for usage, label in self.REQUIRED_AXES:
+                try:
+                    self.joystick.set_axis(usage, AXIS_CENTER if usage == 0x30 else AXIS_MIN)
+                    self.log(f"   ✅ {label} is available")
+                except Exception as e:
+                    self.log(f"   ❌ {label} not available: {e}")
+                    axes_available = False
+
+        if not axes_available:
+            self.log("")
+            self.log("❌ Required axes are not enabled!")
+            self.log("")
+            self.log("🔧 SOLUTION:")
+            self.log("   1. Start → 'Configure vJoy'")
+            self.log("   2. Check X-Axis, Y-Axis, Z-Axis")
+            self.log("   3. 'Apply' → 'OK'")
+            self.log("   4. Restart this program")
+            raise BackendError("Required vJoy axes are not enabled")
+
+        # Start from neutral (one UpdateVJD call)
+        self.write_axes(AXIS_CENTER, AXIS_MIN, AXIS_MIN)
+        self.write_count = 0
+        self.log("✅ All axes are working!")
+
+    def write_axes(self, steering, gas, brake):
+        """Fill the position struct and send it with one UpdateVJD call."""
+        data = self._data
+        data.wAxisX = steering   # X-Axis = STEERING
+        data.wAxisZ = gas        # Z-Axis = GAS
+        data.wAxisY = brake      # Y-Axis = BRAKE
+        if not self.joystick.update():
+            raise BackendError(f"UpdateVJD failed for device {self.device_id}")
+        self.write_count += 1
+
+    def close(self):
+        """Relinquish the vJoy device."""
+        if self.joystick is not None:
+            try:
+                pyvjoy._sdk.RelinquishVJD(self.device_id)
+            except Exception:
+                pass
+            self.joystick = None
+
+
+class NullBackend(OutputBackend):
+    """Stand-in device for platforms without vJoy. Keeps the last position only."""
+
+    name = "null"
+
+    def __init__(self, device_id=1, log=print):
+        super().__init__(device_id, log)
+        self.position = (AXIS_CENTER, AXIS_MIN, AXIS_MIN)
+
+    def open(self):
+        self.log(f"🧪 Null output device #{self.device_id} (no driver, values are discarded)")
+
+    def write_axes(self, steering, gas, brake):
+        self.position = (steering, gas, brake)
+        self.write_count += 1
+
+
+class RecordingBackend(OutputBackend):
+    """In-memory device that records (monotonic_time, steering, gas, brake) per write."""
+
+    name = "recording"
+
+    def __init__(self, device_id=1, log=print, maxlen=None):
+        """
+        Args:
+            device_id: Output device ID
+            log: Callable used for status messages
+            maxlen: Keep only the newest N writes (None = unlimited)
+        """
+        super().__init__(device_id, log)
+        self.writes = collections.deque(maxlen=maxlen)
+
+    @property
+    def position(self):
+        """Last written (steering, gas, brake), or neutral if nothing was written."""
+        if not self.writes:
+            return (AXIS_CENTER, AXIS_MIN, AXIS_MIN)
+        return self.writes[-1][1:]
+
+    def write_axes(self, steering, gas, brake):
+        self.writes.append((time.perf_counter(), steering, gas, brake))
+        self.write_count += 1
+
+    def clear(self):
+        """Forget all recorded writes."""
+        self.writes.clear()
+        self.write_count = 0
+
+
+BACKENDS = {
+    VJoyBackend.name: VJoyBackend,
+    NullBackend.name: NullBackend,
+    RecordingBackend.name: RecordingBackend,
+}
+
+
+def default_backend_name():
+    """vJoy when pyvjoy can be loaded, otherwise the null stand-in."""
+    return VJoyBackend.name if VJOY_AVAILABLE else NullBackend.name
+
+
+def create_backend(name=None, device_id=1, log=print):
+    """
+    Create an output backend by name.
+
+    Args:
+        name: One of BACKENDS ('vjoy', 'null', 'recording'); None picks the default
+        device_id: Output device ID
+        log: Callable used for status messages
+    """
+    name = name or default_backend_name()
+    try:
+        backend_class = BACKENDS[name]
+    except KeyError:
+        raise BackendError(f"Unknown output backend '{name}' (choose from {', '.join(BACKENDS)})")
+    return backend_class(device_id=device_id, log=log)
@@ -0,0 +1,144 @@
+"""
+Output Thread
+Dedicated thread for the blocking driver writes.
+
+UpdateVJD is a blocking ctypes call. Run on the event loop, a driver stall
+delays every socket read, ping and client on that loop. The output thread
+runs the fixed-rate write tick on its own, optionally with raised OS
+priority:
+
+- the network side publishes each client's latest state into a seqlock
+  slot (sessions.ClientSession.state) and never waits for the driver
+- the output thread reads the newest complete state on every tick and
+  never waits for coroutine scheduling
+- ctypes releases the GIL during the driver call, so a stalled write does
+  not stall the event loop either
+
+Work that has to happen on the output thread (device resets) is handed
+over with call_soon(); queued calls run at the start of the next tick and
+once more when the thread stops, so devices always end up neutral.
+"""
+
+import ctypes
+import os
+import queue
+import sys
+import threading
+import time
+
+# name -> (Windows thread priority, Linux nice value)
+PRIORITIES = {
+    "normal": (0, 0),
+    "high": (2, -10),       # THREAD_PRIORITY_HIGHEST
+    "realtime": (15, -20),  # THREAD_PRIORITY_TIME_CRITICAL
+}
+
+
+def raise_thread_priority(priority):
+    """
+    Raise the OS priority of the calling thread.
+
+    Args:
+        priority: One of PRIORITIES ('normal' does nothing)
+
+    Returns:
+        True if the priority was changed
+    """
+    try:
+        windows_level, nice = PRIORITIES[priority]
+    except KeyError:
+        raise ValueError(f"Unknown thread priority '{priority}' (choose from {', '.join(PRIORITIES)})")
+    if priority == "normal":
+        return False
+
+    try:
+        kernel32 = ctypes.windll.kernel32
+    except AttributeError:
+        kernel32 = None
+    if kernel32 is not None:
+        return bool(kernel32.SetThreadPriority(kernel32.GetCurrentThread(), windows_level))
+
+    # Linux schedules threads individually: the thread ID is a valid "process" here
+    if sys.platform.startswith("linux"):
+        try:
+            os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), nice)
+            return True
+        except OSError:
+            return False  # Lowering the nice value needs CAP_SYS_NICE
+    return False
+
+
+class OutputThread(threading.Thread):
+    """Calls tick() at a fixed rate on its own thread."""
+
+    def __init__(self, tick, rate_hz, priority="high", on_error=None, log=print):
+        """
+        Args:
+            tick: Callable doing one round of device writes
+            rate_hz: Tick rate
+            priority: OS thread priority (see PRIORITIES)
+            on_error: Called with the exception if tick() raises (thread stops)
+            log: Callable used for status messages
+        """
+        super().__init__(name="output", daemon=True)
+        self.tick = tick
+        self.period = 1.0 / rate_hz
+        self.priority = priority
+        self.on_error = on_error
+        self.log = log
+
+        self.ticks = 0
+        self.overruns = 0   # Ticks that started too late to keep the rate
+        self.error = None
+        self.priority_raised = False
+
+        self._calls = queue.SimpleQueue()
+        self._stopping = threading.Event()
+
+    def call_soon(self, func, *args):
+        """Run func(*args) on the output thread before the next tick."""
+        self._calls.put((func, args))
+
+    def _run_calls(self):
+        calls = self._calls
+        while not calls.empty():
+            func, args = calls.get_nowait()
+            func(*args)
+
+    def stop(self, timeout=1.0):
+        """Stop ticking, run the queued calls and wait for the thread."""
+        self._stopping.set()
+        if self.is_alive():
+            self.join(timeout)
+
+    def run(self):
+        self.priority_raised = raise_thread_priority(self.priority)
+        if self.priority != "normal" and not self.priority_raised:
+            self.log(f"⚠️  Output thread keeps normal priority ({self.priority} not permitted)")
+
+        period = self.period
+        stopping = self._stopping
+        next_tick = time.monotonic()
+        try:
+            while not stopping.is_set():
+                self._run_calls()
+                self.tick()
+                self.ticks += 1
+
+                next_tick += period
+                delay = next_tick - time.monotonic()
+                if delay > 0:
+                    stopping.wait(delay)
+                else:
+                    # Fell behind (slow driver): skip missed ticks
+                    self.overruns += 1
+                    next_tick = time.monotonic()
+        except Exception as e:
+            self.error = e
+            if self.on_error is not None:
+                self.on_error(e)
+        finally:
+            try:
+                self._run_calls()
+            except Exception as e:
+                self.log(f"⚠️  Output reset failed: {e}")
@@ -0,0 +1,112 @@
+"""
+Steering Prediction
+Short-horizon extrapolation to hide network latency.
+
+The phone sends every 50 ms and Wi-Fi adds more, so the newest sample is
+always old by the time it is written. SteeringPredictor estimates the
+steering velocity from the last few samples and, at each output tick,
+extrapolates the value to "now + horizon".
+
+Safety rails:
+- the extrapolation time is capped (max_extrapolation)
+- the predicted change is capped (max_delta) and the result is clamped
+- when samples stop (stale_timeout) it falls back to the last real value
+
+observe() runs on the network side and predict() on the output thread;
+the model they share is one (value, arrival, velocity) tuple, replaced
+as a whole, so predict() never mixes two samples.
+"""
+
+import collections
+
+
+class SteeringPredictor:
+    """Linear least-squares velocity estimate + clamped extrapolation."""
+
+    def __init__(self, horizon=0.03, max_extrapolation=0.1, max_delta=0.25,
+                 stale_timeout=0.15, history=4, limits=(-1.0, 1.0)):
+        """
+        Args:
+            horizon: Extra lead time in seconds (roughly the network latency)
+            max_extrapolation: Never extrapolate further than this (seconds)
+            max_delta: Never move further than this from the last sample
+            stale_timeout: Seconds without samples before falling back
+            history: Samples used for the velocity estimate (>= 2)
+            limits: (min, max) output range
+        """
+        self.horizon = horizon
+        self.max_extrapolation = max_extrapolation
+        self.max_delta = max_delta
+        self.stale_timeout = stale_timeout
+        self.limits = limits
+        self._history = collections.deque(maxlen=max(2, history))
+        self._model = (0.0, None, 0.0)  # (value, arrival, velocity)
+        self._settled = True
+
+    def observe(self, value, t, arrival):
+        """
+        Add a sample.
+
+        Args:
+            value: (Filtered) steering value
+            t: Sample time for the velocity estimate (sensor clock if available)
+            arrival: Server time.perf_counter() when the sample arrived (or,
+                     with a synced client clock, when it was taken)
+        """
+        self._history.append((t, value))
+        self._model = (value, arrival, self._estimate_velocity())
+        self._settled = False
+
+    def _estimate_velocity(self):
+        n = len(self._history)
+        if n < 2:
+            return 0.0
+        mean_t = sum(t for t, _ in self._history) / n
+        mean_v = sum(v for _, v in self._history) / n
+        num = 0.0
+        den = 0.0
+        for t, v in self._history:
+            dt = t - mean_t
+            num += dt * (v - mean_v)
+            den += dt * dt
+        return num / den if den > 0.0 else 0.0
+
+    @property
+    def velocity(self):
+        """Estimated steering velocity (units per second)."""
+        return self._model[2]
+
+    @property
+    def active(self):
+        """True while predict() may return something new without a new sample."""
+        return not self._settled
+
+    def predict(self, now):
+        """Steering value extrapolated to now + horizon."""
+        model = self._model
+        value, arrival, velocity = model
+        if arrival is None:
+            return value
+
+        age = now - arrival
+        if age > self.stale_timeout:
+            # Samples stopped: hold the last real value, no extrapolation
+            if self._model is model:
+                self._settled = True
+            return value
+
+        lead = min(age + self.horizon, self.max_extrapolation)
+        delta = velocity * lead
+        if delta > self.max_delta:
+            delta = self.max_delta
+        elif delta < -self.max_delta:
+            delta = -self.max_delta
+
+        low, high = self.limits
+        return min(high, max(low, value + delta))
+
+    def reset(self):
+        """Forget all samples."""
+        self._history.clear()
+        self._model = (0.0, None, 0.0)
+        self._settled = True
@@ -0,0 +1,225 @@
+"""
+Profiling
+Hot-path stage timers and on-demand profiles of the running bridge.
+
+Stage timers (off by default, toggled at runtime):
+- decode:  WebSocket message → samples (json.loads / struct unpack)
+- process: filter, prediction and resampling of one sample
+- map:     response curves, quantization and dirty check for one write
+- write:   output device (driver) call
+- tick:    one full round of device writes on the output tick
+
+When disabled every hot-path site costs one attribute check. When enabled
+they add call counts, total and worst time per stage, exported on the
+metrics endpoint.
+
+On-demand profiles (written to disk, no restart needed):
+- cprofile: deterministic profile of the event loop and output thread
+            (pstats file: python -m pstats <file>, snakeviz, ...)
+- sample:   stack samples of both threads every few ms, written as
+            collapsed stacks (flamegraph.pl, speedscope)
+
+Start one with GET /profile?seconds=10&mode=cprofile on the metrics port,
+or with a signal (SIGUSR1; Ctrl+Break on Windows) for a 10 s cProfile.
+"""
+
+import asyncio
+import cProfile
+import os
+import pstats
+import signal
+import sys
+import threading
+import time
+from collections import Counter
+
+HOT_STAGES = ("decode", "process", "map", "write", "tick")
+
+PROFILE_MODES = ("cprofile", "sample")
+MAX_PROFILE_SECONDS = 300.0
+SIGNAL_PROFILE_SECONDS = 10.0
+
+
+class StageTimers:
+    """Call counts and time per hot-path stage (off by default)."""
+
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self.reset()
+
+    def reset(self):
+        self.calls = dict.fromkeys(HOT_STAGES, 0)
+        self.seconds = dict.fromkeys(HOT_STAGES, 0.0)
+        self.max = dict.fromkeys(HOT_STAGES, 0.0)
+
+    def add(self, stage, seconds):
+        """Record one call of a stage (check `enabled` before timing it)."""
+        self.calls[stage] += 1
+        self.seconds[stage] += seconds
+        if seconds > self.max[stage]:
+            self.max[stage] = seconds
+
+    def summary(self):
+        """One line per stage: calls, mean and worst time."""
+        lines = [f"stage timers: {'on' if self.enabled else 'off'}"]
+        for stage in HOT_STAGES:
+            calls = self.calls[stage]
+            mean = self.seconds[stage] / calls if calls else 0.0
+            lines.append(f"{stage:<8} {calls:>10} calls  mean {mean * 1e6:9.1f} us  "
+                         f"max {self.max[stage] * 1e6:9.1f} us")
+        return "\n".join(lines) + "\n"
+
+
+def _enable_profile(profile, enabled):
+    # Python 3.12+ profiles all threads from one profiler; a second one is refused
+    try:
+        profile.enable()
+        enabled.append(profile)
+    except ValueError:
+        pass
+
+
+def sample_stacks(threads, seconds, interval=0.005):
+    """
+    Sample the stacks of some threads.
+
+    Args:
+        threads: {thread ident: name}
+        seconds: How long to sample
+        interval: Seconds between samples
+
+    Returns:
+        Counter of collapsed stacks ("thread;module:function;...")
+    """
+    stacks = Counter()
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        frames = sys._current_frames()
+        for ident, name in threads.items():
+            frame = frames.get(ident)
+            if frame is None:
+                continue
+            calls = []
+            while frame is not None:
+                code = frame.f_code
+                calls.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                frame = frame.f_back
+            calls.append(name)
+            stacks[";".join(reversed(calls))] += 1
+        time.sleep(interval)
+    return stacks
+
+
+class ProfileCapture:
+    """Time-boxed profiles of the running bridge, one at a time."""
+
+    def __init__(self, directory="profiles", log=print):
+        """
+        Args:
+            directory: Where profile files are written
+            log: Callable used for status messages
+        """
+        self.directory = directory
+        self.log = log
+        self.running = False
+
+    def _path(self, suffix):
+        os.makedirs(self.directory, exist_ok=True)
+        return os.path.join(self.directory, f"bridge-{time.strftime('%Y%m%d-%H%M%S')}{suffix}")
+
+    async def run(self, seconds=10.0, mode="cprofile", output_thread=None):
+        """
+        Profile the event loop (and the output thread, if running) for a while.
+
+        Args:
+            seconds: Capture length (capped at MAX_PROFILE_SECONDS)
+            mode: 'cprofile' or 'sample'
+            output_thread: OutputThread to include (None = loop only)
+
+        Returns:
+            Path of the written file
+        """
+        if mode not in PROFILE_MODES:
+            raise ValueError(f"Unknown profile mode '{mode}' (choose from {', '.join(PROFILE_MODES)})")
+        if self.running:
+            raise RuntimeError("A profile is already being captured")
+        seconds = max(0.1, min(MAX_PROFILE_SECONDS, seconds))
+        if output_thread is not None and not output_thread.is_alive():
+            output_thread = None
+
+        self.running = True
+        self.log(f"🔬 [PROFILE] Capturing {seconds:g} s ({mode})...")
+        try:
+            if mode == "sample":
+                path = await self._sample(seconds, output_thread)
+            else:
+                path = await self._cprofile(seconds, output_thread)
+        finally:
+            self.running = False
+        self.log(f"🔬 [PROFILE] Written to {path}")
+        return path
+
+    async def _cprofile(self, seconds, output_thread):
+        enabled = []
+        loop_profile = cProfile.Profile()
+        _enable_profile(loop_profile, enabled)
+        thread_profile = None
+        if output_thread is not None:
+            thread_profile = cProfile.Profile()
+            output_thread.call_soon(_enable_profile, thread_profile, enabled)
+        try:
+            await asyncio.sleep(seconds)
+        finally:
+            loop_profile.disable()
+            if thread_profile is not None:
+                stopped = threading.Event()
+                output_thread.call_soon(lambda: (thread_profile.disable(), stopped.set()))
+                await asyncio.to_thread(stopped.wait, 1.0)
+
+        profiles = [profile for profile in (loop_profile, thread_profile) if profile in enabled]
+        path = self._path(".prof")
+        stats = pstats.Stats(*profiles)
+        await asyncio.to_thread(stats.dump_stats, path)
+        return path
+
+    async def _sample(self, seconds, output_thread):
+        threads = {threading.get_ident(): "event-loop"}
+        if output_thread is not None:
+            threads[output_thread.ident] = "output"
+        stacks = await asyncio.to_thread(sample_stacks, threads, seconds)
+
+        path = self._path(".stacks.txt")
+        lines = [f"{stack} {count}\n" for stack, count in stacks.most_common()]
+
+        def write():
+            with open(path, "w", encoding="utf-8") as f:
+                f.writelines(lines)
+
+        await asyncio.to_thread(write)
+        return path
+
+
+def install_profile_signal(callback):
+    """
+    Call `callback` on the running loop when the profile signal arrives
+    (SIGUSR1, or SIGBREAK/Ctrl+Break on Windows).
+
+    Returns:
+        Function that restores the previous handler, or None if no signal
+        is available (or not called from the main thread)
+    """
+    signum = getattr(signal, "SIGUSR1", None) or getattr(signal, "SIGBREAK", None)
+    if signum is None or threading.current_thread() is not threading.main_thread():
+        return None
+    loop = asyncio.get_running_loop()
+    previous = signal.signal(signum, lambda *_: loop.call_soon_threadsafe(callback))
+    return lambda: signal.signal(signum, previous)
+
+
+def signal_name():
+    """How to send the profile signal on this platform."""
+    if hasattr(signal, "SIGUSR1"):
+        return f"kill -USR1 {os.getpid()}"
+    if hasattr(signal, "SIGBREAK"):
+        return "Ctrl+Break"
+    return None
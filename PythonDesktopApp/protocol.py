@@ -0,0 +1,397 @@
+"""
+Wire Protocol for Steering Wheel Samples
+Decodes the messages sent by the mobile app.
+
+Two encodings are supported on the same WebSocket port:
+
+- JSON (legacy / fallback), one text message per sample:
+      {"x": 0.01, "y": -0.25, "z": 0.98, "gas": true, "brake": false,
+       "seq": 17, "t": 85012}
+  "seq" and "t" (client clock in ms) are optional.
+
+- Binary frame, negotiated with the "steeringwheel.bin.v1" subprotocol.
+  Fixed little-endian layout, version 2 (20 bytes):
+
+      offset  size  type     field
+      0       1     uint8    version (= 2)
+      1       1     uint8    buttons bitfield (bit0 = gas, bit1 = brake)
+      2       2     uint16   sequence number (wraps at 65536)
+      4       4     uint32   client timestamp in ms (any epoch, wraps)
+      8       4     float32  x
+      12      4     float32  y (STEERING)
+      16      4     float32  z
+
+  Version 1 frames (16 bytes, no timestamp) are still accepted.
+
+- Batch frame, negotiated with the "steeringwheel.batch.v1" subprotocol.
+  Several timestamped samples in one message (e.g. 100-200 Hz sensor data
+  sent at 20-50 packets/s), version 3 (8 + 16 * count bytes):
+
+      offset  size  type     field
+      0       1     uint8    version (= 3)
+      1       1     uint8    sample count (1..MAX_BATCH)
+      2       2     uint16   sequence number of the first sample
+                             (sample i has seq + i)
+      4       4     uint32   client timestamp of the first sample in ms
+      then per sample (16 bytes):
+      0       2     uint16   time since the first sample, 0.1 ms units
+      2       1     uint8    buttons bitfield
+      3       1     -        reserved
+      4       12    float32  x, y (STEERING), z
+
+  The JSON equivalent is {"seq": 17, "samples": [{"x": ..., "t": ...}, ...]}
+  with one JSON sample object (without "seq") per entry.
+
+Text messages are always decoded as JSON and binary messages as frames, so
+old app builds keep working whatever subprotocol was negotiated.
+
+Control messages are JSON text objects with a "type" key (samples never
+have one), in both directions and with either subprotocol:
+
+    server → {"type": "ping", "id": 7, "t0": 81234.5}
+    client → {"type": "pong", "id": 7, "t0": 81234.5, "t1": 90012, "t2": 90012}
+
+t0 is server time in ms (echoed unchanged), t1/t2 are the client's receive
+and send times in the same ms clock as the sample timestamps (see
+clocksync.py). Old app builds ignore pings.
+
+    server → {"type": "session", "token": "q3J...", "resume": 5.0}
+
+is sent once per connection: reconnecting with "?resume=<token>" within
+"resume" seconds continues the session (see resumption.py).
+"""
+
+import json
+import math
+import struct
+
+BATCH_SUBPROTOCOL = "steeringwheel.batch.v1"
+BINARY_SUBPROTOCOL = "steeringwheel.bin.v1"
+JSON_SUBPROTOCOL = "steeringwheel.json"
+
+# Server preference order: batches, single binary frames, JSON as fallback
+SUBPROTOCOLS = [BATCH_SUBPROTOCOL, BINARY_SUBPROTOCOL, JSON_SUBPROTOCOL]
+
+FRAME_VERSION = 2
+FRAME = struct.Struct("<BBHIfff")
+FRAME_SIZE = FRAME.size  # 20 bytes
+
+FRAME_V1 = struct.Struct("<BBHfff")
+FRAME_V1_SIZE = FRAME_V1.size  # 16 bytes
+
+BATCH_VERSION = 3
+BATCH_HEADER = struct.Struct("<BBHI")  # 8 bytes
+BATCH_ENTRY = struct.Struct("<HBxfff")  # 16 bytes
+MAX_BATCH = 32
+
+BUTTON_GAS = 0x01
+BUTTON_BRAKE = 0x02
+
+SEQ_MODULO = 1 << 16
+
+CONTROL_PING = "ping"
+CONTROL_PONG = "pong"
+CONTROL_SESSION = "session"
+
+
+class ProtocolError(ValueError):
+    """Raised when a message cannot be decoded into a sample."""
+
+
+class Sample:
+    """One decoded sensor sample from a client."""
+
+    __slots__ = ("x", "y", "z", "gas", "brake", "seq", "t_client", "t_arrival", "batch")
+
+    def __init__(self, x=0.0, y=0.0, z=0.0, gas=False, brake=False, seq=None,
+                 t_client=None, batch=1):
+        self.x = x
+        self.y = y
+        self.z = z
+        self.gas = gas
+        self.brake = brake
+        self.seq = seq            # None when the client does not send sequence numbers
+        self.t_client = t_client  # Client clock in seconds (None if not sent)
+        self.t_arrival = None     # Server time.perf_counter() when received
+        self.batch = batch        # Samples in the message this one came in
+
+    def __repr__(self):
+        return (f"Sample(x={self.x:+.3f}, y={self.y:+.3f}, z={self.z:+.3f}, "
+                f"gas={self.gas}, brake={self.brake}, seq={self.seq})")
+
+
+def _check_finite(x, y, z):
+    # One check for all three: NaN or ±inf anywhere makes the sum non-finite,
+    # and float32 values cannot overflow a float64 sum
+    if not math.isfinite(x + y + z):
+        raise ProtocolError(f"Non-finite axis value (x={x}, y={y}, z={z})")
+
+
+def decode_binary(buffer, offset=0):
+    """
+    Decode one binary frame.
+
+    Args:
+        buffer: bytes, bytearray or memoryview holding the frame
+        offset: Start of the frame inside the buffer
+
+    Returns:
+        Sample
+    """
+    version = buffer[offset] if len(buffer) > offset else None
+    if version == FRAME_VERSION:
+        if len(buffer) - offset < FRAME_SIZE:
+            raise ProtocolError(f"Binary frame too short ({len(buffer) - offset} bytes, need {FRAME_SIZE})")
+        _, buttons, seq, t_ms, x, y, z = FRAME.unpack_from(buffer, offset)
+        _check_finite(x, y, z)
+        return Sample(x, y, z, bool(buttons & BUTTON_GAS), bool(buttons & BUTTON_BRAKE), seq,
+                      t_ms / 1000.0)
+    if version == 1:
+        if len(buffer) - offset < FRAME_V1_SIZE:
+            raise ProtocolError(f"Binary frame too short ({len(buffer) - offset} bytes, need {FRAME_V1_SIZE})")
+        _, buttons, seq, x, y, z = FRAME_V1.unpack_from(buffer, offset)
+        _check_finite(x, y, z)
+        return Sample(x, y, z, bool(buttons & BUTTON_GAS), bool(buttons & BUTTON_BRAKE), seq)
+    raise ProtocolError(f"Unsupported frame version {version}")
+
+
+def decode_batch(buffer):
+    """
+    Decode a batch frame (version 3).
+
+    Returns:
+        list of Samples, oldest first
+    """
+    if len(buffer) < BATCH_HEADER.size:
+        raise ProtocolError(f"Batch frame too short ({len(buffer)} bytes)")
+    version, count, seq, t_ms = BATCH_HEADER.unpack_from(buffer)
+    if version != BATCH_VERSION:
+        raise ProtocolError(f"Unsupported frame version {version}")
+    if not 1 <= count <= MAX_BATCH:
+        raise ProtocolError(f"Invalid batch size {count}")
+    size = BATCH_HEADER.size + count * BATCH_ENTRY.size
+    if len(buffer) < size:
+        raise ProtocolError(f"Batch frame too short ({len(buffer)} bytes, need {size})")
+
+    samples = []
+    offset = BATCH_HEADER.size
+    for i in range(count):
+        dt, buttons, x, y, z = BATCH_ENTRY.unpack_from(buffer, offset)
+        _check_finite(x, y, z)
+        offset += BATCH_ENTRY.size
+        samples.append(Sample(x, y, z, bool(buttons & BUTTON_GAS), bool(buttons & BUTTON_BRAKE),
+                              (seq + i) % SEQ_MODULO, t_ms / 1000.0 + dt / 10000.0, count))
+    return samples
+
+
+def _json_number(data, key, default=None):
+    """Finite number field of a JSON object (default when missing)."""
+    value = data.get(key, default)
+    if value is None and default is None:
+        return None
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or not math.isfinite(value):
+        raise ProtocolError(f"JSON field '{key}' is not a number")
+    return value
+
+
+def _json_sample(data, seq=None, batch=1):
+    if not isinstance(data, dict):
+        raise ProtocolError("JSON sample is not an object")
+    t_ms = _json_number(data, 't')
+    return Sample(
+        float(_json_number(data, 'x', 0)),
+        float(_json_number(data, 'y', 0)),
+        float(_json_number(data, 'z', 0)),
+        bool(data.get('gas', False)),
+        bool(data.get('brake', False)),
+        seq,
+        float(t_ms) / 1000.0 if t_ms is not None else None,
+        batch,
+    )
+
+
+def decode_json_samples(message):
+    """
+    Decode a JSON text message holding one sample or a batch.
+
+    Returns:
+        list of Samples, oldest first
+    """
+    data = json.loads(message)
+    if not isinstance(data, dict):
+        raise ProtocolError("JSON message is not an object")
+    seq = _json_number(data, 'seq')
+    seq = int(seq) if seq is not None else None
+    entries = data.get('samples')
+    if entries is None:
+        return [_json_sample(data, seq)]
+    if not isinstance(entries, list) or not 1 <= len(entries) <= MAX_BATCH:
+        raise ProtocolError("Invalid JSON batch")
+    return [_json_sample(entry, (seq + i) % SEQ_MODULO if seq is not None else None, len(entries))
+            for i, entry in enumerate(entries)]
+
+
+def decode_samples(message):
+    """
+    Decode any WebSocket message (single sample or batch).
+
+    Returns:
+        list of Samples, oldest first
+    """
+    if isinstance(message, (bytes, bytearray, memoryview)):
+        if message[:1] == bytes((BATCH_VERSION,)):
+            return decode_batch(message)
+        return [decode_binary(message)]
+    return decode_json_samples(message)
+
+
+def encode_binary(x, y, z, gas, brake, seq=0, t_client=0.0):
+    """Encode one sample as a binary frame (used by test clients and benchmarks)."""
+    buttons = (BUTTON_GAS if gas else 0) | (BUTTON_BRAKE if brake else 0)
+    t_ms = int(t_client * 1000) & 0xFFFFFFFF
+    return FRAME.pack(FRAME_VERSION, buttons, seq % SEQ_MODULO, t_ms, x, y, z)
+
+
+def encode_batch(samples, seq=0):
+    """
+    Encode several samples as one batch frame (used by test clients and benchmarks).
+
+    Args:
+        samples: [(x, y, z, gas, brake, t_client), ...] oldest first
+        seq: Sequence number of the first sample
+    """
+    t_first = samples[0][5]
+    parts = [BATCH_HEADER.pack(BATCH_VERSION, len(samples), seq % SEQ_MODULO,
+                               int(t_first * 1000) & 0xFFFFFFFF)]
+    for x, y, z, gas, brake, t_client in samples:
+        buttons = (BUTTON_GAS if gas else 0) | (BUTTON_BRAKE if brake else 0)
+        dt = min(0xFFFF, max(0, round((t_client - t_first) * 10000)))
+        parts.append(BATCH_ENTRY.pack(dt, buttons, x, y, z))
+    return b"".join(parts)
+
+
+def encode_json_batch(samples, seq=None):
+    """Encode several samples as one JSON batch (same tuples as encode_batch)."""
+    data = {"samples": [{"x": x, "y": y, "z": z, "gas": gas, "brake": brake, "t": int(t_client * 1000)}
+                        for x, y, z, gas, brake, t_client in samples]}
+    if seq is not None:
+        data["seq"] = seq
+    return json.dumps(data)
+
+
+def encode_json(x, y, z, gas, brake, seq=None, t_client=None):
+    """Encode one sample the way App.js does."""
+    data = {"x": x, "y": y, "z": z, "gas": gas, "brake": brake}
+    if seq is not None:
+        data["seq"] = seq
+    if t_client is not None:
+        data["t"] = int(t_client * 1000)
+    return json.dumps(data)
+
+
+def decode_control(message):
+    """
+    Decode a control message.
+
+    Returns:
+        dict with a "type" key, or None if the message is a sample
+    """
+    if not isinstance(message, str) or '"type"' not in message:
+        return None
+    data = json.loads(message)
+    if not isinstance(data, dict) or "type" not in data:
+        return None
+    if not isinstance(data["type"], str):
+        raise ProtocolError("Control message type is not a string")
+    return data
+
+
+def encode_ping(ping_id, t0_ms):
+    """Encode a clock sync ping (server → client)."""
+    return json.dumps({"type": CONTROL_PING, "id": ping_id, "t0": t0_ms})
+
+
+def encode_session(token, resume_window):
+    """Encode the session token message (server → client)."""
+    return json.dumps({"type": CONTROL_SESSION, "token": token, "resume": resume_window})
+
+
+def encode_pong(ping, t1_ms, t2_ms):
+    """Encode the answer to a ping, as App.js does (used by test clients and benchmarks)."""
+    return json.dumps({"type": CONTROL_PONG, "id": ping["id"], "t0": ping["t0"],
+                       "t1": t1_ms, "t2": t2_ms})
+
+
+def decode_datagram(data):
+    """
+    Decode a UDP datagram: JSON when it starts with '{', binary frame otherwise.
+
+    Returns:
+        list of Samples (one, or several for batches), oldest first
+    """
+    if data[:1] == b'{':
+        return decode_json_samples(data)
+    if data[:1] == bytes((BATCH_VERSION,)):
+        return decode_batch(data)
+    return [decode_binary(data)]
+
+
+class SequenceTracker:
+    """
+    Per-client sequence number bookkeeping (16-bit, wrap-aware).
+
+    accept() returns False for duplicates and for samples older than the
+    newest one already seen, so stale/reordered packets can be dropped.
+    A jump of more than RESET_WINDOW in either direction is treated as a
+    client restart instead of loss or reordering.
+    """
+
+    RESET_WINDOW = 1024
+
+    __slots__ = ("last_seq", "received", "accepted", "lost", "reordered", "duplicates")
+
+    def __init__(self):
+        self.last_seq = None
+        self.received = 0
+        self.accepted = 0
+        self.lost = 0
+        self.reordered = 0
+        self.duplicates = 0
+
+    def accept(self, seq):
+        """Record a sequence number. Returns True if the sample should be used."""
+        self.received += 1
+        if seq is None or self.last_seq is None:
+            self.last_seq = seq
+            self.accepted += 1
+            return True
+
+        delta = (seq - self.last_seq) % SEQ_MODULO
+        if delta == 0:
+            self.duplicates += 1
+            return False
+
+        if delta < SEQ_MODULO // 2:
+            # Newer sample; anything skipped in between is (so far) lost
+            if delta <= self.RESET_WINDOW:
+                self.lost += delta - 1
+            self.last_seq = seq
+            self.accepted += 1
+            return True
+
+        if SEQ_MODULO - delta > self.RESET_WINDOW:
+            # Far behind: the client restarted its counter
+            self.last_seq = seq
+            self.accepted += 1
+            return True
+
+        # Late arrival of a sample that was counted as lost
+        self.reordered += 1
+        if self.lost > 0:
+            self.lost -= 1
+        return False
+
+    def summary(self):
+        """One-line statistics string."""
+        return (f"received {self.received}, lost {self.lost}, "
+                f"reordered/stale {self.reordered}, duplicates {self.duplicates}")
@@ -0,0 +1,147 @@
+"""
+Steering Resampler
+Plays multi-sample frames back onto the output tick.
+
+A phone that samples at 100-200 Hz but sends 20-50 packets per second
+delivers several samples at once. Applied as they arrive, only the newest
+of them would ever reach the device. The resampler keeps a client's recent
+samples in a ring buffer on a common time base and, on every output tick,
+interpolates steering at `now - delay`:
+
+- time base: client timestamp + smallest transit seen recently (windowed
+  minimum of arrival - client time), so no clock sync is needed
+- delay: how far behind the newest sample the playout point had fallen
+  when the next packet arrived (packet interval + lateness); it grows at
+  once and shrinks slowly, so the playout point stays between two
+  received samples
+- buttons are not interpolated: the newest sample at or before the
+  playout point wins, so presses keep their original spacing
+
+The ring buffer has one writer (network side) and one reader (output
+thread). The reader checks the write counter before and after reading and
+retries if the writer lapped it, so no lock is needed.
+"""
+
+from array import array
+
+from clocksync import BaseTransit
+
+
+class Resampler:
+    """Per-client ring buffer of timestamped samples with linear interpolation."""
+
+    def __init__(self, capacity=64, max_delay=0.1, base_window=5.0):
+        """
+        Args:
+            capacity: Samples kept in the ring buffer
+            max_delay: Upper bound for the playout delay (seconds)
+            base_window: Seconds per window of the minimum-transit estimate
+        """
+        self.capacity = capacity
+        self.max_delay = max_delay
+
+        self._t = array("d", [0.0]) * capacity
+        self._y = array("d", [0.0]) * capacity
+        self._gas = array("d", [0.0]) * capacity
+        self._brake = array("d", [0.0]) * capacity
+        self.count = 0      # Samples written so far (next slot: count % capacity)
+        self.delay = 0.0
+        self.underruns = 0  # Packets that arrived after playout ran out of samples
+
+        self._newest = float("-inf")
+        self._last_arrival = None
+        self._base = BaseTransit(base_window)
+        self._settled = True
+
+    def push(self, t_client, arrival, y, gas, brake):
+        """
+        Add a (filtered) sample. Samples of one message share `arrival`.
+
+        Args:
+            t_client: Client timestamp (seconds)
+            arrival: time.perf_counter() when the message arrived
+            y: Steering value
+            gas: Gas value (0..1)
+            brake: Brake value (0..1)
+        """
+        t = t_client + self._base.update(arrival - t_client, arrival)
+
+        if arrival != self._last_arrival:
+            # New message: how far back did playout have to reach until now?
+            if self._last_arrival is not None:
+                need = min(self.max_delay, arrival - self._newest)
+                if need > self.delay:
+                    if arrival - self.delay > self._newest:
+                        self.underruns += 1
+                    self.delay = need
+                else:
+                    self.delay += (need - self.delay) * 0.02
+            self._last_arrival = arrival
+
+        # Keep the time base monotonic across base offset changes
+        if t < self._newest:
+            t = self._newest
+        self._newest = t
+
+        index = self.count % self.capacity
+        self._t[index] = t
+        self._y[index] = y
+        self._gas[index] = float(gas)
+        self._brake[index] = float(brake)
+        self.count += 1  # Publish after the slot is complete
+        self._settled = False
+
+    @property
+    def active(self):
+        """True while value_at() may return something new without a new sample."""
+        return not self._settled
+
+    def value_at(self, now):
+        """
+        Interpolated (y, gas, brake) at now - delay, or None before the first sample.
+
+        Args:
+            now: time.perf_counter() of the output tick
+        """
+        capacity = self.capacity
+        t, ys = self._t, self._y
+        for _ in range(3):
+            count = self.count
+            if not count:
+                return None
+            playout = now - self.delay
+            oldest = max(0, count - capacity)
+
+            # Newest sample at or before the playout point
+            i = count - 1
+            while i > oldest and t[i % capacity] > playout:
+                i -= 1
+            a = i % capacity
+            if i == count - 1:
+                result = (ys[a], self._gas[a], self._brake[a])
+                caught_up = t[a] <= playout
+            else:
+                b = (i + 1) % capacity
+                span = t[b] - t[a]
+                if t[a] > playout or span <= 0.0:
+                    y = ys[a]
+                else:
+                    y = ys[a] + (ys[b] - ys[a]) * (playout - t[a]) / span
+                result = (y, self._gas[a], self._brake[a])
+                caught_up = False
+
+            # Retry if the writer overwrote a slot we read (or reset)
+            if self.count - capacity < i and self.count >= count:
+                if caught_up and self.count == count:
+                    self._settled = True
+                return result
+        return result
+
+    def reset(self):
+        """Forget all samples and estimates."""
+        self.count = 0
+        self.delay = 0.0
+        self._newest = float("-inf")
+        self._last_arrival = None
+        self._base.reset()
+        self._settled = True
@@ -0,0 +1,116 @@
+"""
+Session Resumption
+Lets a phone that lost its connection pick up its old session.
+
+On Wi-Fi a blip of a few hundred milliseconds kills the TCP connection.
+Without resumption the bridge resets the device and the reconnecting phone
+starts from scratch (new filter and predictor state, new device). Instead:
+
+- on connect the bridge sends the client a session token:
+      {"type": "session", "token": "...", "resume": 5.0}
+- when the connection drops (anything but a normal close), the session is
+  parked: it keeps its device, filter, predictor and clock sync state for
+  the resume window. The input watchdog fades the device to neutral
+  meanwhile
+- a phone that reconnects with ws://host:port/?resume=<token> within the
+  window gets the parked session back without a device reset. If the old
+  connection is not even noticed as dead yet, the new one takes over and
+  the old one is closed
+- when the window passes, the session is dropped as before
+
+Resumed connections keep the session's original client key, so metrics,
+captures and device assignments don't notice the reconnect.
+"""
+
+import asyncio
+import secrets
+from urllib.parse import parse_qs, urlsplit
+
+RESUME_PARAM = "resume"
+
+
+def token_from_path(path):
+    """Resume token from a request path like '/?resume=abc' (or None)."""
+    if not path or "?" not in path:
+        return None
+    values = parse_qs(urlsplit(path).query).get(RESUME_PARAM)
+    return values[0] if values else None
+
+
+class ResumeRegistry:
+    """Session tokens, the connection owning each session, and parked sessions."""
+
+    def __init__(self, window=5.0):
+        """
+        Args:
+            window: Seconds a dropped session waits for its client
+        """
+        self.window = window
+        self._keys = {}      # token -> client_key
+        self._tokens = {}    # client_key -> token
+        self._owners = {}    # client_key -> connection currently driving the session
+        self._expiry = {}    # client_key -> TimerHandle while parked
+        self.resumed = 0
+        self.expired = 0
+
+    def issue(self, client_key, connection):
+        """Create the token for a new session owned by `connection`."""
+        token = secrets.token_urlsafe(16)
+        self._keys[token] = client_key
+        self._tokens[client_key] = token
+        self._owners[client_key] = connection
+        return token
+
+    def token(self, client_key):
+        return self._tokens.get(client_key)
+
+    def claim(self, token, connection):
+        """
+        Hand the session of `token` to a new connection.
+
+        Returns:
+            (client_key, previous connection or None), or None for an
+            unknown/expired token
+        """
+        client_key = self._keys.get(token)
+        if client_key is None:
+            return None
+        expiry = self._expiry.pop(client_key, None)
+        if expiry is not None:
+            expiry.cancel()
+            previous = None
+        else:
+            previous = self._owners.get(client_key)  # Old connection not dead yet
+        self._owners[client_key] = connection
+        self.resumed += 1
+        return client_key, previous
+
+    def owns(self, client_key, connection):
+        """True if `connection` still drives the session (not taken over)."""
+        return self._owners.get(client_key) is connection
+
+    def park(self, client_key, on_expire):
+        """Keep a dropped session for the window, then call on_expire(client_key)."""
+        self._owners.pop(client_key, None)
+
+        def expire():
+            self._expiry.pop(client_key, None)
+            self.expired += 1
+            on_expire(client_key)
+
+        self._expiry[client_key] = asyncio.get_running_loop().call_later(self.window, expire)
+
+    @property
+    def parked(self):
+        """Number of sessions waiting for their client."""
+        return len(self._expiry)
+
+    def forget(self, client_key):
+        """Invalidate a session's token (session closed for good)."""
+        token = self._tokens.pop(client_key, None)
+        if token is not None:
+            self._keys.pop(token, None)
+        self._owners.pop(client_key, None)
+        expiry = self._expiry.pop(client_key, None)
+        if expiry is not None:
+            expiry.cancel()
@@ -0,0 +1,79 @@
+"""
+Seqlock Slot
+Single-writer, lock-free latest-value slot.
+
+The writer bumps a sequence counter to an odd value, writes the fields and
+bumps it to the next even value. Readers never block the writer: they copy
+the fields and retry if the counter was odd or changed meanwhile, so a
+reader always gets one complete value, never half of two writes. Only the
+newest value is kept (older ones are simply overwritten).
+
+The slot lives in a plain buffer (bytearray by default), so the same
+layout works between threads and between processes (shared memory).
+
+Layout at `offset`:
+
+    <Q sequence>  even = stable, odd = write in progress
+    <fields>      struct format given by the caller
+"""
+
+import struct
+import time
+
+SEQUENCE = struct.Struct("<Q")
+
+
+class SeqlockSlot:
+    """One latest value guarded by a sequence counter (one writer, any readers)."""
+
+    def __init__(self, fmt, buffer=None, offset=0):
+        """
+        Args:
+            fmt: struct format of the fields (e.g. "<dddd")
+            buffer: Writable buffer holding the slot (default: own bytearray)
+            offset: Byte offset of the slot in the buffer
+        """
+        self.fields = struct.Struct(fmt)
+        self.size = SEQUENCE.size + self.fields.size
+        self.buffer = buffer if buffer is not None else bytearray(self.size)
+        self.offset = offset
+        self._sequence = SEQUENCE.unpack_from(self.buffer, offset)[0] & ~1
+
+    @property
+    def version(self):
+        """Number of completed writes."""
+        return SEQUENCE.unpack_from(self.buffer, self.offset)[0] >> 1
+
+    def write(self, *values):
+        """Publish a new value (only one thread/process may write)."""
+        buffer = self.buffer
+        offset = self.offset
+        sequence = self._sequence
+        SEQUENCE.pack_into(buffer, offset, sequence + 1)  # Odd: write in progress
+        self.fields.pack_into(buffer, offset + SEQUENCE.size, *values)
+        self._sequence = sequence + 2
+        SEQUENCE.pack_into(buffer, offset, sequence + 2)
+
+    def read(self, retries=1000):
+        """
+        Copy the latest complete value.
+
+        Returns:
+            (version, values tuple)
+
+        Raises:
+            TimeoutError: The writer stayed mid-write for all retries
+                          (e.g. a writer process died)
+        """
+        buffer = self.buffer
+        offset = self.offset
+        fields_offset = offset + SEQUENCE.size
+        for _ in range(retries):
+            before = SEQUENCE.unpack_from(buffer, offset)[0]
+            if not before & 1:
+                values = self.fields.unpack_from(buffer, fields_offset)
+                if SEQUENCE.unpack_from(buffer, offset)[0] == before:
+                    return before >> 1, values
+            # Writer is mid-update: let it run (releases the GIL)
+            time.sleep(0)
+        raise TimeoutError("seqlock writer did not finish its update")
@@ -0,0 +1,109 @@
+"""
+WebSocket Server Profiles
+Transport settings for websockets.serve().
+
+The phone sends tiny frames (20-byte binary samples) at a high rate. The
+library defaults are made for bigger, less frequent messages:
+
+- per-message deflate costs CPU on both ends and saves nothing on 20 bytes
+- up to 32 messages (and 64 KiB) are buffered per connection, so a busy
+  loop works through a backlog of old samples instead of the newest one
+- keepalive pings every 20 s with a 20 s timeout notice a vanished phone
+  only after ~40 s (its device stays deflected until then)
+
+Profiles:
+- default:     library defaults
+- low_latency: no compression, one buffered message, small buffers, pings
+               every 5 s; also uses a faster event loop (uvloop/winloop)
+               when one is installed
+
+Samples that pile up beyond the queue wait in the kernel socket buffer;
+the latest-value slot of each session (sessions.py) makes sure only the
+newest state is written once they are read.
+"""
+
+import asyncio
+import socket
+
+SERVER_PROFILES = {
+    "default": {},
+    "low_latency": {
+        "compression": None,   # Frames are tiny: deflate only adds CPU time
+        "max_queue": 1,        # Don't buffer a backlog of stale messages
+        "read_limit": 2 ** 12,   # Legacy server only (websockets < 14, see requirements.txt)
+        "write_limit": 2 ** 12,
+        "ping_interval": 5.0,  # Notice a vanished phone within ~10 s
+        "ping_timeout": 5.0,
+    },
+}
+
+# Profiles that switch to a faster event loop implementation if available
+FAST_LOOP_PROFILES = {"low_latency"}
+
+
+def serve_options(profile):
+    """Keyword arguments for websockets.serve() for a profile name."""
+    try:
+        return dict(SERVER_PROFILES[profile])
+    except KeyError:
+        raise ValueError(f"Unknown server profile '{profile}' (choose from {', '.join(SERVER_PROFILES)})")
+
+
+def describe(profile):
+    """Short human-readable summary of a profile."""
+    options = SERVER_PROFILES[profile]
+    if not options:
+        return f"{profile} (library defaults)"
+    parts = []
+    if "compression" in options:
+        parts.append("compression " + (options["compression"] or "off"))
+    if "max_queue" in options:
+        parts.append(f"queue {options['max_queue']}")
+    if "ping_interval" in options:
+        parts.append(f"ping {options['ping_interval']:g} s")
+    return f"{profile} ({', '.join(parts)})"
+
+
+def ensure_nodelay(transport):
+    """
+    Make sure Nagle's algorithm is off for a connection.
+
+    asyncio normally sets TCP_NODELAY itself; this verifies it (and sets it
+    if some loop implementation did not).
+
+    Returns:
+        True if it was already set, False if it had to be set,
+        None if the transport has no TCP socket
+    """
+    sock = transport.get_extra_info("socket") if transport is not None else None
+    if sock is None or sock.type != socket.SOCK_STREAM or sock.family not in (socket.AF_INET, socket.AF_INET6):
+        return None
+    if sock.getsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY):
+        return True
+    sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    return False
+
+
+def install_fast_event_loop(profile):
+    """
+    Switch asyncio to uvloop (Linux/macOS) or winloop (Windows) for profiles
+    in FAST_LOOP_PROFILES. Call before asyncio.run().
+
+    Returns:
+        Name of the installed loop module, or None (standard asyncio loop)
+    """
+    if profile not in FAST_LOOP_PROFILES:
+        return None
+    for name in ("uvloop", "winloop"):
+        try:
+            module = __import__(name)
+        except ImportError:
+            continue
+        asyncio.set_event_loop_policy(module.EventLoopPolicy())
+        return name
+    return None
+
+
+def event_loop_name():
+    """Module of the running event loop ('asyncio', 'uvloop', ...)."""
+    return type(asyncio.get_running_loop()).__module__.split(".")[0]
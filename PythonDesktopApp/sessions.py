@@ -0,0 +1,193 @@
+"""
+Client Sessions
+Per-client state and the pool of output devices (vJoy devices 1-16).
+
+Every connected phone gets its own ClientSession with its own output
+device, steering filter, predictor, metrics and latest-value state, so two
+phones never fight over one wheel and a disconnect only resets the device
+of the phone that left.
+
+The latest state sits in a seqlock slot: the network side (event loop)
+writes it, the output tick (output thread) reads it, and neither waits
+for the other.
+"""
+
+from output_backends import AXIS_CENTER, AXIS_MIN
+from seqlock import SeqlockSlot
+
+# Latest state: y, gas, brake, arrival (NaN = unknown)
+STATE_FORMAT = "<dddd"
+
+
+class ClientSession:
+    """State of one connected client and the output device it drives."""
+
+    def __init__(self, client_key, client_ip, output, tracker=None, metrics=None,
+                 steering_filter=None, predictor=None, jitter_buffer=None, clock=None,
+                 resampler=None, watchdog=None, write_interval=0.0):
+        """
+        Args:
+            client_key: Unique client identifier ("ws://ip:port", "udp://ip:port")
+            client_ip: Client IP address (used for device assignments)
+            output: OutputBackend owned by this session
+            tracker: protocol.SequenceTracker
+            metrics: metrics.ClientMetrics
+            steering_filter: filters.SteeringFilter instance
+            predictor: prediction.SteeringPredictor instance (or None)
+            jitter_buffer: jitter_buffer.JitterBuffer instance (or None)
+            clock: clocksync.ClockSync for the client (or None)
+            resampler: resampler.Resampler for multi-sample frames (or None)
+            watchdog: input_watchdog.InputWatchdog (or None)
+            write_interval: Minimum seconds between device writes (0 = every tick)
+        """
+        self.client_key = client_key
+        self.client_ip = client_ip
+        self.output = output
+        self.device_id = output.device_id
+        self.tracker = tracker
+        self.metrics = metrics
+        self.steering_filter = steering_filter
+        self.predictor = predictor
+        self.jitter_buffer = jitter_buffer
+        self.clock = clock
+        self.resampler = resampler
+        self.watchdog = watchdog
+
+        # Latest received state, picked up by the output tick
+        self.state = SeqlockSlot(STATE_FORMAT)
+        self.update(0.0, False, False)
+        self.written_version = self.state.version
+
+        # Per-device rate control
+        self.write_interval = write_interval
+        self.next_write = 0.0
+
+        # Last values written to the device (dirty tracking)
+        self.current_steering = AXIS_CENTER
+        self.current_gas = AXIS_MIN
+        self.current_brake = AXIS_MIN
+        self.writes_skipped = 0
+
+    def update(self, y, gas, brake, arrival=None):
+        """Store the latest state (written on the next output tick)."""
+        self.state.write(y, gas, brake, float("nan") if arrival is None else arrival)
+
+    def latest(self):
+        """
+        Latest state for the output tick.
+
+        Returns:
+            (version, y, gas, brake, arrival or None)
+        """
+        version, (y, gas, brake, arrival) = self.state.read()
+        return version, y, gas, brake, (arrival if arrival == arrival else None)
+
+    def discard_buffered(self):
+        """Drop samples waiting for playout (jitter buffer, resampler)."""
+        if self.jitter_buffer is not None:
+            self.jitter_buffer.reset()
+        if self.resampler is not None:
+            self.resampler.reset()
+
+    def clear(self):
+        """Forget buffered and latest input (network side of reset())."""
+        self.discard_buffered()
+        self.update(0.0, False, False)
+
+    def reset_output(self):
+        """Put the device back to neutral (output side of reset())."""
+        self.written_version = self.state.version
+        if self.watchdog is not None:
+            self.watchdog.reset()
+        self.output.reset()
+        self.current_steering = AXIS_CENTER
+        self.current_gas = AXIS_MIN
+        self.current_brake = AXIS_MIN
+
+    def reset(self):
+        """Put this session's device back to neutral."""
+        self.clear()
+        self.reset_output()
+
+
+class SessionManager:
+    """Assigns output devices from a pool to connecting clients."""
+
+    def __init__(self, backends, assignments=None, device_rates=None, default_rate_hz=250):
+        """
+        Args:
+            backends: Opened OutputBackend instances (the device pool)
+            assignments: {client_ip: device_id} fixed seats
+            device_rates: {device_id: Hz} per-device output rate
+            default_rate_hz: Output rate for devices without an entry
+        """
+        self.backends = {backend.device_id: backend for backend in backends}
+        self.assignments = dict(assignments or {})
+        self.device_rates = dict(device_rates or {})
+        self.default_rate_hz = default_rate_hz
+        self.sessions = {}
+        self._busy = {}  # device_id -> client_key
+
+    def __len__(self):
+        return len(self.sessions)
+
+    def __iter__(self):
+        # Snapshot, so sessions may open/close while iterating
+        return iter(list(self.sessions.values()))
+
+    def get(self, client_key):
+        return self.sessions.get(client_key)
+
+    @property
+    def max_rate_hz(self):
+        """Fastest configured device rate (drives the output tick)."""
+        return max([self.default_rate_hz, *self.device_rates.values()])
+
+    def free_devices(self):
+        """Device IDs that are not in use."""
+        return [device_id for device_id in self.backends if device_id not in self._busy]
+
+    def acquire_device(self, client_ip):
+        """Pick the device for a client, or None if none is available."""
+        assigned = self.assignments.get(client_ip)
+        if assigned is not None:
+            if assigned in self._busy or assigned not in self.backends:
+                return None
+            return self.backends[assigned]
+
+        # Prefer devices that are not reserved for a fixed seat
+        reserved = set(self.assignments.values())
+        free = sorted(self.free_devices(), key=lambda device_id: device_id in reserved)
+        return self.backends[free[0]] if free else None
+
+    def open(self, client_key, client_ip, **session_args):
+        """
+        Create a session for a new client.
+
+        Returns:
+            ClientSession, or None when no output device is free
+        """
+        output = self.acquire_device(client_ip)
+        if output is None:
+            return None
+        # Devices at the tick rate are written every tick; slower ones are gated
+        rate = self.device_rates.get(output.device_id, self.default_rate_hz)
+        write_interval = 1.0 / rate if rate < self.max_rate_hz else 0.0
+        session = ClientSession(client_key, client_ip, output,
+                                write_interval=write_interval, **session_args)
+        self._busy[output.device_id] = client_key
+        self.sessions[client_key] = session
+        return session
+
+    def close(self, client_key):
+        """
+        End a session. Its device stays taken until release() is called:
+        the caller resets the device on the thread that writes it and
+        releases it afterwards, so a new client never gets a device whose
+        reset is still pending.
+        """
+        return self.sessions.pop(client_key, None)
+
+    def release(self, device_id):
+        """Return a closed session's device to the pool (after its reset)."""
+        self._busy.pop(device_id, None)
@@ -0,0 +1,295 @@
+"""
+Shared-Memory State Export
+Publishes the live wheel state for local overlays, loggers and dashboards.
+
+The bridge writes a fixed-layout region (multiprocessing.shared_memory,
+default name "steeringwheel"). Any local process can map it and read
+consistent snapshots at any rate: no sockets, no copies through the
+bridge, no load on its event loop. Every slot is a seqlock (seqlock.py),
+so a reader never sees half of an update and never blocks the writer.
+
+The output thread is the only writer: it publishes a device's slot right
+after each write to that device, and refreshes statistics, idle devices
+and the bridge slot every REFRESH_INTERVAL.
+
+Layout (little-endian; every slot starts on an 8-byte boundary):
+
+    offset  size  field
+    0       24    header: magic b"SWSTATE\\x00", version (uint16),
+                  slot count (uint16), client slot size (uint16),
+                  bridge slot size (uint16), writer pid (uint32),
+                  reserved (uint32)
+    24      40    bridge slot:  <Q seq> + BRIDGE_FORMAT
+    64      ...   client slots: one per device ID 1..slot count,
+                  <Q seq> + CLIENT_FORMAT, padded to 8 bytes
+
+Bridge fields: updated (time.monotonic()), clients, output rate (Hz),
+samples received and device writes of the connected clients.
+
+Client fields: updated, active, device ID, buttons (bit0 = gas, bit1 =
+brake), flags (bit0 = input stalled, bit1 = resampling), steering / gas /
+brake axis values as written to the device (1..32767, center 16385),
+steering input y (-1..1), packet rate (1/s), total latency p50 (s),
+samples, writes, lost, reordered, stalls, client key (UTF-8, zero-padded).
+
+time.monotonic() is system-wide on Windows and Linux, so readers can age
+the values with their own clock. Read it with SharedStateReader or run
+`python shared_state.py` for a live view.
+"""
+
+import os
+import struct
+import sys
+import time
+from multiprocessing import shared_memory
+
+from seqlock import SeqlockSlot
+
+DEFAULT_NAME = "steeringwheel"
+MAGIC = b"SWSTATE\x00"
+LAYOUT_VERSION = 1
+MAX_SLOTS = 16  # vJoy device IDs 1-16
+
+HEADER = struct.Struct("<8sHHHHII")
+BRIDGE_FORMAT = "<dIIQQ"
+CLIENT_FORMAT = "<dBBBBHHHxxfffQQIII48s"
+CLIENT_FIELDS = (
+    "updated", "active", "device_id", "buttons", "flags", "steering", "gas", "brake",
+    "y", "packet_rate", "latency_p50", "samples", "writes", "lost", "reordered", "stalls",
+    "client",
+)
+
+FLAG_STALLED = 0x01
+FLAG_RESAMPLING = 0x02
+
+REFRESH_INTERVAL = 0.05  # Seconds between statistics/idle refreshes
+
+
+def _slot_size(fmt):
+    size = 8 + struct.calcsize(fmt)
+    return (size + 7) & ~7
+
+
+BRIDGE_OFFSET = HEADER.size
+CLIENTS_OFFSET = (BRIDGE_OFFSET + _slot_size(BRIDGE_FORMAT) + 7) & ~7
+CLIENT_SLOT_SIZE = _slot_size(CLIENT_FORMAT)
+
+
+def region_size(slots=MAX_SLOTS):
+    return CLIENTS_OFFSET + slots * CLIENT_SLOT_SIZE
+
+
+def _attach(name):
+    # Readers must not unlink the bridge's region when they exit
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)  # Python 3.13+
+    except TypeError:
+        memory = shared_memory.SharedMemory(name=name)
+        if sys.platform != "win32":
+            from multiprocessing import resource_tracker
+            resource_tracker.unregister(memory._name, "shared_memory")
+        return memory
+
+
+class SharedStateWriter:
+    """Publishes the bridge state into shared memory (output thread only)."""
+
+    def __init__(self, name=DEFAULT_NAME, slots=MAX_SLOTS, refresh_interval=REFRESH_INTERVAL):
+        """
+        Args:
+            name: Shared memory name
+            slots: Client slots (device IDs 1..slots)
+            refresh_interval: Seconds between statistics/idle refreshes
+        """
+        self.name = name
+        self.slots = slots
+        self.refresh_interval = refresh_interval
+        self.memory = None
+        self.bridge = None
+        self.clients = []
+        self._active = set()       # Device IDs with an active slot
+        self._stats = {}           # device_id -> cached statistics tuple
+        self._next_refresh = 0.0
+
+    def open(self):
+        """Create (or take over a stale) region and write the header."""
+        size = region_size(self.slots)
+        try:
+            self.memory = shared_memory.SharedMemory(name=self.name, create=True, size=size)
+        except FileExistsError:
+            # Left behind by a crashed bridge: reuse it if it is big enough
+            self.memory = shared_memory.SharedMemory(name=self.name)
+            if self.memory.size < size:
+                self.memory.close()
+                raise ValueError(f"Shared memory '{self.name}' exists with a different layout")
+        buffer = self.memory.buf
+        buffer[:size] = bytes(size)
+        HEADER.pack_into(buffer, 0, MAGIC, LAYOUT_VERSION, self.slots, CLIENT_SLOT_SIZE,
+                         _slot_size(BRIDGE_FORMAT), os.getpid(), 0)
+        self.bridge = SeqlockSlot(BRIDGE_FORMAT, buffer, BRIDGE_OFFSET)
+        self.clients = [SeqlockSlot(CLIENT_FORMAT, buffer, CLIENTS_OFFSET + i * CLIENT_SLOT_SIZE)
+                        for i in range(self.slots)]
+        return self
+
+    def close(self):
+        """Release the region (readers see a stale, inactive state)."""
+        if self.memory is None:
+            return
+        for device_id in list(self._active):
+            self.clear(device_id)
+        self.bridge = None
+        self.clients = []
+        self.memory.close()
+        try:
+            self.memory.unlink()
+        except FileNotFoundError:
+            pass
+        self.memory = None
+
+    def _collect_stats(self, session):
+        metrics = session.metrics
+        tracker = session.tracker
+        watchdog = session.watchdog
+        rate = p50 = 0.0
+        samples = writes = 0
+        if metrics is not None:
+            rate = metrics.rate.current(time.perf_counter())
+            p50 = metrics.stages["total"].quantile(0.5) or 0.0
+            samples = metrics.samples
+            writes = metrics.writes
+        lost = tracker.lost if tracker is not None else 0
+        reordered = tracker.reordered if tracker is not None else 0
+        stalls = watchdog.stalls if watchdog is not None else 0
+        stats = (rate, p50, samples, writes, lost, reordered, stalls)
+        self._stats[session.device_id] = stats
+        return stats
+
+    def publish(self, session, now, refresh_stats=False):
+        """Publish one session's state into the slot of its device."""
+        index = session.device_id - 1
+        if not 0 <= index < self.slots:
+            return
+        stats = self._stats.get(session.device_id)
+        if stats is None or refresh_stats:
+            stats = self._collect_stats(session)
+        rate, p50, samples, writes, lost, reordered, stalls = stats
+
+        _, y, gas, brake, _ = session.latest()
+        watchdog = session.watchdog
+        flags = 0
+        if watchdog is not None and watchdog.stalled:
+            flags |= FLAG_STALLED
+        if session.resampler is not None and session.resampler.count:
+            flags |= FLAG_RESAMPLING
+        buttons = (1 if gas >= 0.5 else 0) | (2 if brake >= 0.5 else 0)
+
+        self.clients[index].write(
+            now, 1, session.device_id, buttons, flags,
+            session.current_steering, session.current_gas, session.current_brake,
+            y, rate, p50, samples, writes, lost, reordered, stalls,
+            session.client_key.encode("utf-8")[:48])
+        self._active.add(session.device_id)
+
+    def clear(self, device_id):
+        """Mark a device's slot inactive."""
+        index = device_id - 1
+        if 0 <= index < self.slots:
+            self.clients[index].write(time.monotonic(), 0, device_id, 0, 0, 0, 0, 0,
+                                      0.0, 0.0, 0.0, 0, 0, 0, 0, 0, b"")
+        self._active.discard(device_id)
+        self._stats.pop(device_id, None)
+
+    def refresh(self, sessions, now, output_rate_hz):
+        """
+        Periodic part of an output tick: statistics of idle sessions,
+        slots of closed sessions and the bridge slot (every refresh_interval).
+        """
+        if now < self._next_refresh:
+            return
+        self._next_refresh = now + self.refresh_interval
+        current = set()
+        for session in sessions:
+            self.publish(session, now, refresh_stats=True)
+            current.add(session.device_id)
+        for device_id in self._active - current:
+            self.clear(device_id)
+        stats = [self._stats[device_id] for device_id in current if device_id in self._stats]
+        self.bridge.write(now, len(current), output_rate_hz,
+                          sum(s[2] for s in stats), sum(s[3] for s in stats))
+
+
+class SharedStateReader:
+    """Reads consistent snapshots of a bridge's shared state (any process)."""
+
+    def __init__(self, name=DEFAULT_NAME):
+        self.memory = _attach(name)
+        buffer = self.memory.buf
+        magic, version, slots, client_size, _, self.pid, _ = HEADER.unpack_from(buffer, 0)
+        if magic != MAGIC or version != LAYOUT_VERSION or client_size != CLIENT_SLOT_SIZE:
+            self.memory.close()
+            raise ValueError(f"Shared memory '{name}' is not a steering wheel state region "
+                             f"(version {version})")
+        self.bridge = SeqlockSlot(BRIDGE_FORMAT, buffer, BRIDGE_OFFSET)
+        self.clients = [SeqlockSlot(CLIENT_FORMAT, buffer, CLIENTS_OFFSET + i * CLIENT_SLOT_SIZE)
+                        for i in range(slots)]
+
+    def snapshot(self):
+        """
+        Returns:
+            {"version": n, "updated": t, "clients": n, "output_rate_hz": n,
+             "samples": n, "writes": n,
+             "devices": [{field: value, ...} for every active device]}
+        """
+        version, (updated, clients, rate, samples, writes) = self.bridge.read()
+        devices = []
+        for slot in self.clients:
+            _, values = slot.read()
+            if not values[1]:
+                continue
+            device = dict(zip(CLIENT_FIELDS, values))
+            device["client"] = device["client"].rstrip(b"\x00").decode("utf-8", "replace")
+            device["gas_pressed"] = bool(device["buttons"] & 1)
+            device["brake_pressed"] = bool(device["buttons"] & 2)
+            device["stalled"] = bool(device["flags"] & FLAG_STALLED)
+            devices.append(device)
+        return {"version": version, "updated": updated, "clients": clients,
+                "output_rate_hz": rate, "samples": samples, "writes": writes,
+                "devices": devices}
+
+    def close(self):
+        self.bridge = None
+        self.clients = []
+        self.memory.close()
+
+
+def main(argv=None):
+    """Live view of the shared state: python shared_state.py [name]"""
+    argv = sys.argv[1:] if argv is None else argv
+    name = argv[0] if argv else DEFAULT_NAME
+    try:
+        reader = SharedStateReader(name)
+    except FileNotFoundError:
+        print(f"❌ No shared state '{name}' (start the bridge with --shared-state)")
+        return 1
+    print(f"📡 Reading '{name}' from bridge pid {reader.pid} (Ctrl+C to stop)")
+    try:
+        while True:
+            state = reader.snapshot()
+            age = (time.monotonic() - state["updated"]) * 1000.0
+            parts = [f"{state['clients']} client(s), {state['writes']} writes, age {age:4.0f} ms"]
+            for device in state["devices"]:
+                parts.append(
+                    f"#{device['device_id']} X={device['steering']:5d} Z={device['gas']:5d} "
+                    f"Y={device['brake']:5d} {device['packet_rate']:5.1f}/s"
+                    f"{' STALLED' if device['stalled'] else ''}")
+            print("\r" + " | ".join(parts) + "   ", end="", flush=True)
+            time.sleep(0.1)
+    except KeyboardInterrupt:
+        print()
+    finally:
+        reader.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,341 @@
+"""
+Tests for the bridge building blocks: wire protocol, sequence tracking,
+response curves, seqlock slots and session resumption
+Run with: python -m pytest PythonDesktopApp
+"""
+
+import asyncio
+import json
+import threading
+
+import pytest
+
+from curves import ResponseCurve, parse_curve_params
+from output_backends import AXIS_CENTER, AXIS_MAX, AXIS_MIN
+from protocol import (
+    BATCH_ENTRY, BATCH_HEADER, BATCH_VERSION, FRAME, FRAME_V1, MAX_BATCH, SEQ_MODULO,
+    ProtocolError, SequenceTracker, decode_batch, decode_binary, decode_control,
+    decode_datagram, decode_samples, encode_batch, encode_binary, encode_json,
+    encode_json_batch, encode_ping,
+)
+from resumption import ResumeRegistry, token_from_path
+from seqlock import SEQUENCE, SeqlockSlot
+
+NON_FINITE = [float("nan"), float("inf"), float("-inf")]
+
+
+# --- Protocol ---------------------------------------------------------------
+
+def test_binary_frame_roundtrip():
+    frame = encode_binary(0.25, -0.5, 9.75, True, False, seq=7, t_client=12.345)
+    sample = decode_binary(frame)
+    assert (sample.x, sample.y, sample.z) == (0.25, -0.5, 9.75)
+    assert (sample.gas, sample.brake, sample.seq) == (True, False, 7)
+    assert sample.t_client == pytest.approx(12.345)
+
+
+def test_binary_frame_v1_and_offset():
+    frame = FRAME_V1.pack(1, 0x02, 3, 0.0, 0.5, 0.0)
+    sample = decode_binary(b"\x00\x00" + frame, offset=2)
+    assert (sample.y, sample.brake, sample.seq, sample.t_client) == (0.5, True, 3, None)
+
+
+@pytest.mark.parametrize("frame", [
+    b"",
+    b"\x02\x00\x01",                            # Truncated v2 frame
+    FRAME_V1.pack(1, 0, 0, 0.0, 0.0, 0.0)[:-1],  # Truncated v1 frame
+    b"\x09" + bytes(19),                        # Unknown version
+])
+def test_binary_frame_malformed(frame):
+    with pytest.raises(ProtocolError):
+        decode_binary(frame)
+
+
+@pytest.mark.parametrize("value", NON_FINITE)
+@pytest.mark.parametrize("axis", range(3))
+def test_binary_frame_non_finite(value, axis):
+    axes = [0.0, 0.0, 0.0]
+    axes[axis] = value
+    with pytest.raises(ProtocolError):
+        decode_binary(FRAME.pack(2, 0, 0, 0, *axes))
+    with pytest.raises(ProtocolError):
+        decode_binary(FRAME_V1.pack(1, 0, 0, *axes))
+
+
+def test_batch_roundtrip_wraps_sequence():
+    entries = [(0.0, i / 10, 9.8, i == 1, i == 2, 5.0 + i * 0.01) for i in range(3)]
+    samples = decode_samples(encode_batch(entries, seq=SEQ_MODULO - 1))
+    assert [s.seq for s in samples] == [SEQ_MODULO - 1, 0, 1]
+    assert [s.y for s in samples] == pytest.approx([0.0, 0.1, 0.2])
+    assert [(s.gas, s.brake) for s in samples] == [(False, False), (True, False), (False, True)]
+    assert [s.t_client for s in samples] == pytest.approx([5.0, 5.01, 5.02])
+    assert all(s.batch == 3 for s in samples)
+
+
+@pytest.mark.parametrize("frame", [
+    BATCH_HEADER.pack(BATCH_VERSION, 1, 0, 0)[:-1],                  # Short header
+    BATCH_HEADER.pack(BATCH_VERSION, 0, 0, 0),                       # Empty batch
+    BATCH_HEADER.pack(BATCH_VERSION, MAX_BATCH + 1, 0, 0)
+    + bytes(BATCH_ENTRY.size * (MAX_BATCH + 1)),                      # Too many samples
+    BATCH_HEADER.pack(BATCH_VERSION, 2, 0, 0) + bytes(BATCH_ENTRY.size),  # Truncated
+    BATCH_HEADER.pack(4, 1, 0, 0) + bytes(BATCH_ENTRY.size),          # Wrong version
+])
+def test_batch_malformed(frame):
+    with pytest.raises(ProtocolError):
+        decode_batch(frame)
+
+
+@pytest.mark.parametrize("value", NON_FINITE)
+def test_batch_non_finite(value):
+    frame = encode_batch([(0.0, 0.0, 0.0, False, False, 0.0), (0.0, value, 0.0, False, False, 0.01)])
+    with pytest.raises(ProtocolError):
+        decode_batch(frame)
+
+
+def test_json_single_and_batch():
+    [sample] = decode_samples(encode_json(0.1, -0.2, 9.8, False, True, seq=4, t_client=1.5))
+    assert (sample.y, sample.brake, sample.seq, sample.t_client) == (-0.2, True, 4, 1.5)
+
+    entries = [(0.0, 0.3, 9.8, True, False, 2.0), (0.0, 0.4, 9.8, True, False, 2.02)]
+    samples = decode_samples(encode_json_batch(entries, seq=SEQ_MODULO - 1))
+    assert [s.seq for s in samples] == [SEQ_MODULO - 1, 0]
+    assert [s.y for s in samples] == [0.3, 0.4]
+
+    [sample] = decode_samples('{"y": 0.5}')  # Old apps: no seq, no timestamp
+    assert (sample.x, sample.y, sample.seq, sample.t_client) == (0.0, 0.5, None, None)
+
+
+@pytest.mark.parametrize("message", [
+    "not json",
+    "[1, 2]",
+    '{"y": "0.5"}',
+    '{"y": true}',
+    '{"y": NaN}',
+    '{"y": Infinity}',
+    '{"y": 0.1, "seq": "7"}',
+    '{"samples": []}',
+    '{"samples": {"y": 0.1}}',
+    '{"samples": [1]}',
+    json.dumps({"samples": [{"y": 0.1}] * (MAX_BATCH + 1)}),
+])
+def test_json_malformed(message):
+    # JSONDecodeError and ProtocolError are both ValueErrors
+    with pytest.raises(ValueError):
+        decode_samples(message)
+
+
+def test_control_messages():
+    assert decode_control(encode_ping(3, 1000.0)) == {"type": "ping", "id": 3, "t0": 1000.0}
+    assert decode_control(encode_json(0.0, 0.1, 0.0, False, False)) is None
+    assert decode_control(encode_binary(0.0, 0.1, 0.0, False, False)) is None
+    with pytest.raises(ProtocolError):
+        decode_control('{"type": ["pong"]}')
+
+
+def test_datagrams():
+    assert decode_datagram(encode_json(0.0, 0.2, 0.0, False, False).encode())[0].y == pytest.approx(0.2)
+    assert decode_datagram(encode_binary(0.0, 0.25, 0.0, False, False))[0].y == 0.25
+    batch = encode_batch([(0.0, 0.5, 0.0, False, False, 0.0)] * 2, seq=10)
+    assert [s.seq for s in decode_datagram(batch)] == [10, 11]
+
+
+# --- Sequence tracking -----------------------------------------------------
+
+def test_sequence_in_order_and_duplicates():
+    tracker = SequenceTracker()
+    assert [tracker.accept(seq) for seq in (1, 2, 2, 3)] == [True, True, False, True]
+    assert (tracker.duplicates, tracker.lost, tracker.reordered) == (1, 0, 0)
+
+
+def test_sequence_wraparound():
+    tracker = SequenceTracker()
+    assert all(tracker.accept(seq) for seq in (SEQ_MODULO - 2, SEQ_MODULO - 1, 0, 1))
+    assert tracker.lost == 0
+    assert tracker.accept(4)  # Gap across the next packets: 2 and 3 lost
+    assert tracker.lost == 2
+
+
+def test_sequence_drops_stale_packets():
+    tracker = SequenceTracker()
+    for seq in (SEQ_MODULO - 1, 2):  # 0 and 1 counted as lost
+        assert tracker.accept(seq)
+    assert tracker.lost == 2
+    assert not tracker.accept(0)          # Late arrival across the wrap
+    assert not tracker.accept(SEQ_MODULO - 5)  # Older than the newest sample
+    assert tracker.reordered == 2
+    assert tracker.lost == 0
+    assert tracker.last_seq == 2
+
+
+def test_sequence_restart_and_unnumbered():
+    tracker = SequenceTracker()
+    assert tracker.accept(5000)
+    assert tracker.accept(10)  # Far behind: client restarted its counter
+    assert tracker.last_seq == 10
+    assert tracker.lost == 0
+
+    tracker = SequenceTracker()
+    assert all(tracker.accept(None) for _ in range(3))
+
+
+# --- Response curves --------------------------------------------------------
+
+def test_curve_linear_table():
+    curve = ResponseCurve()
+    assert curve.map(-1.0) == AXIS_MIN
+    assert curve.map(1.0) == AXIS_MAX
+    assert curve.map(5.0) == AXIS_MAX            # Clamped
+    assert abs(curve.map(0.0) - AXIS_CENTER) <= 1
+    assert curve.map(float("nan")) == curve.neutral
+    assert curve.map(0.5) - curve.neutral == pytest.approx(curve.neutral - curve.map(-0.5), abs=1)
+
+    pedal = ResponseCurve(bipolar=False)
+    assert (pedal.map(0.0), pedal.map(1.0), pedal.map(-1.0)) == (AXIS_MIN, AXIS_MAX, AXIS_MIN)
+    assert pedal.neutral == AXIS_MIN
+
+
+def test_curve_shaping():
+    curve = ResponseCurve(deadzone=0.1, saturation=0.9, gain_negative=0.5)
+    assert curve.map(0.05) == curve.neutral
+    assert curve.map(-0.05) == curve.neutral
+    assert curve.map(0.95) == AXIS_MAX
+    assert curve.map(-1.0) == pytest.approx(curve.neutral - (curve.neutral - AXIS_MIN) / 2, abs=1)
+
+    assert ResponseCurve(exponent=2.0).shape(0.5) == pytest.approx(0.25)
+    curve = ResponseCurve(points=[(1, 1), (0, 0), (0.5, 0.2)])  # Sorted on configure
+    assert curve.shape(0.5) == pytest.approx(0.2)
+    assert curve.shape(0.75) == pytest.approx(0.6)
+
+
+def test_curve_rebuilds_only_on_change():
+    curve = ResponseCurve(deadzone=0.1)
+    table = curve.table
+    assert not curve.configure(deadzone=0.1)
+    assert curve.table is table
+    assert curve.configure(deadzone=0.2)
+    assert curve.table is not table
+
+
+@pytest.mark.parametrize("params", [
+    {"deadzone": -0.1},
+    {"deadzone": 1.0},
+    {"saturation": 1.5},
+    {"deadzone": 0.5, "saturation": 0.4},
+    {"exponent": 0.0},
+    {"points": [(0, 0)]},
+    {"points": [(0, 0), (1, 1.5)]},
+    {"points": [(-0.5, 0), (1, 1)]},
+    {"gain_positive": -1.0},
+    {"smoothing": 0.5},
+])
+def test_curve_validation(params):
+    curve = ResponseCurve(deadzone=0.05)
+    table = curve.table
+    with pytest.raises(ValueError):
+        curve.configure(**params)
+    # A rejected update leaves the curve untouched
+    assert curve.table is table
+    assert (curve.deadzone, curve.saturation, curve.points) == (0.05, 1.0, None)
+
+
+def test_parse_curve_params():
+    assert parse_curve_params([("deadzone", "0.05"), ("points", "0:0;0.5:0.3;1:1")]) == {
+        "deadzone": 0.05, "points": [(0.0, 0.0), (0.5, 0.3), (1.0, 1.0)]}
+
+
+# --- Seqlock ----------------------------------------------------------------
+
+def test_seqlock_read_write():
+    slot = SeqlockSlot("<dI")
+    assert slot.read() == (0, (0.0, 0))
+    slot.write(1.5, 7)
+    slot.write(2.5, 8)
+    assert slot.read() == (2, (2.5, 8))
+    assert slot.version == 2
+
+
+def test_seqlock_shared_buffer():
+    buffer = bytearray(64)
+    writer = SeqlockSlot("<ff", buffer, offset=16)
+    writer.write(1.0, 2.0)
+    assert SeqlockSlot("<ff", buffer, offset=16).read() == (1, (1.0, 2.0))
+    assert not any(buffer[:16])
+
+
+def test_seqlock_writer_stuck_mid_write():
+    slot = SeqlockSlot("<d")
+    SEQUENCE.pack_into(slot.buffer, 0, 1)  # Odd: a writer that never finished
+    with pytest.raises(TimeoutError):
+        slot.read(retries=3)
+
+
+def test_seqlock_concurrent_reads_are_consistent():
+    slot = SeqlockSlot("<QQQ")
+    done = threading.Event()
+
+    def write():
+        for i in range(1, 20001):
+            slot.write(i, i * 2, i * 3)
+        done.set()
+
+    writer = threading.Thread(target=write)
+    writer.start()
+    last = 0
+    while not done.is_set():
+        version, (a, b, c) = slot.read()
+        assert (b, c) == (a * 2, a * 3)
+        assert version >= last
+        last = version
+    writer.join()
+    assert slot.read() == (20000, (20000, 40000, 60000))
+
+
+# --- Session resumption -----------------------------------------------------
+
+def test_token_from_path():
+    assert token_from_path("/?resume=abc") == "abc"
+    assert token_from_path("/") is None
+    assert token_from_path(None) is None
+
+
+def test_resume_within_window():
+    async def scenario():
+        registry = ResumeRegistry(window=0.05)
+        old, new = object(), object()
+        token = registry.issue("ws://phone:1", old)
+
+        # Old connection not noticed as dead yet: the new one takes over
+        assert registry.claim(token, new) == ("ws://phone:1", old)
+        assert registry.owns("ws://phone:1", new)
+
+        expired = []
+        registry.park("ws://phone:1", expired.append)
+        assert registry.parked == 1
+        assert registry.claim(token, old) == ("ws://phone:1", None)
+        await asyncio.sleep(0.1)
+        return registry, expired
+
+    registry, expired = asyncio.run(scenario())
+    assert expired == []
+    assert (registry.parked, registry.resumed, registry.expired) == (0, 2, 0)
+
+
+def test_resume_token_expires():
+    async def scenario():
+        registry = ResumeRegistry(window=0.02)
+        token = registry.issue("ws://phone:1", object())
+        expired = []
+
+        def on_expire(client_key):
+            expired.append(client_key)
+            registry.forget(client_key)  # What the bridge's forget_client does
+
+        registry.park("ws://phone:1", on_expire)
+        await asyncio.sleep(0.1)
+        return registry, token, expired
+
+    registry, token, expired = asyncio.run(scenario())
+    assert expired == ["ws://phone:1"]
+    assert (registry.parked, registry.expired) == (0, 1)
+    assert registry.claim(token, object()) is None
+    assert registry.token("ws://phone:1") is None
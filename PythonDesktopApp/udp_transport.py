@@ -0,0 +1,104 @@
+"""
+UDP Transport for Steering Wheel Samples
+Datagram listener that runs next to the WebSocket server.
+
+Each datagram carries one sample or one multi-sample batch (binary frame
+or JSON, see protocol.py). Samples are pure latest-value state, so a lost datagram is
+simply skipped and a late one is dropped instead of blocking newer ones.
+Clients are identified by their (ip, port) address and forgotten after
+`client_timeout` seconds without traffic. A sender is only admitted once a
+datagram from it decodes, so stray packets never take an output device;
+a sender that could not be admitted (no free device) is retried on its
+next datagram.
+"""
+
+import asyncio
+import json
+import time
+
+from protocol import ProtocolError, SequenceTracker, decode_datagram
+
+
+class UdpClient:
+    """Bookkeeping for one UDP sender."""
+
+    __slots__ = ("address", "tracker", "last_seen")
+
+    def __init__(self, address):
+        self.address = address
+        self.tracker = SequenceTracker()
+        self.last_seen = time.monotonic()
+
+
+class UdpSampleProtocol(asyncio.DatagramProtocol):
+    """
+    asyncio datagram protocol feeding samples into a shared pipeline.
+
+    Callbacks:
+        on_connect(client_key, client_ip, tracker) -> True if admitted
+        on_sample(client_key, sample)
+        on_timeout(client_key, tracker)
+    """
+
+    def __init__(self, on_sample, on_connect=None, on_timeout=None,
+                 client_timeout=2.0, log=print):
+        self.on_sample = on_sample
+        self.on_connect = on_connect
+        self.on_timeout = on_timeout
+        self.client_timeout = client_timeout
+        self.log = log
+        self.clients = {}
+        self.transport = None
+        self._reaper = None
+
+    def connection_made(self, transport):
+        self.transport = transport
+        self._reaper = asyncio.get_running_loop().create_task(self._reap_idle_clients())
+
+    def connection_lost(self, exc):
+        if self._reaper is not None:
+            self._reaper.cancel()
+
+    def datagram_received(self, data, addr):
+        arrival = time.perf_counter()
+        try:
+            samples = decode_datagram(data)
+        except json.JSONDecodeError:
+            self.log(f"⚠️  [ERROR] Invalid JSON datagram from {addr[0]}")
+            return
+        except (ProtocolError, ValueError, KeyError, TypeError) as e:
+            self.log(f"⚠️  [ERROR] Invalid datagram from {addr[0]}: {e}")
+            return
+
+        client = self.clients.get(addr)
+        if client is None:
+            client = UdpClient(addr)
+            if self.on_connect and not self.on_connect(self.client_key(addr), addr[0], client.tracker):
+                return  # Not admitted: try again with the next datagram
+            self.clients[addr] = client
+        client.last_seen = time.monotonic()
+
+        # Drop duplicates and anything older than the newest sample
+        for sample in samples:
+            sample.t_arrival = arrival
+            if client.tracker.accept(sample.seq):
+                self.on_sample(self.client_key(addr), sample)
+
+    def error_received(self, exc):
+        self.log(f"⚠️  [UDP] Socket error: {exc}")
+
+    @staticmethod
+    def client_key(addr):
+        """Printable client identifier ("udp://ip:port")."""
+        return f"udp://{addr[0]}:{addr[1]}"
+
+    async def _reap_idle_clients(self):
+        """Forget clients that stopped sending."""
+        while True:
+            await asyncio.sleep(self.client_timeout / 2)
+            now = time.monotonic()
+            for addr, client in list(self.clients.items()):
+                if now - client.last_seen > self.client_timeout:
+                    del self.clients[addr]
+                    if self.on_timeout:
+                        self.on_timeout(self.client_key(addr), client.tracker)
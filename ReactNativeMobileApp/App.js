@@ -16,6 +16,28 @@ import * as ScreenOrientation from "expo-screen-orientation";
 // Get screen dimensions
 const { width, height } = Dimensions.get("window");
 
+// Wire protocol (see PythonDesktopApp/protocol.py)
+// Servers that accept the batch subprotocol get 100 Hz sensor data in
+// 20 Hz multi-sample frames; binary frames (one sample each) are used with
+// the binary subprotocol, otherwise every sample is sent as JSON.
+const BATCH_SUBPROTOCOL = "steeringwheel.batch.v1";
+const BINARY_SUBPROTOCOL = "steeringwheel.bin.v1";
+const JSON_SUBPROTOCOL = "steeringwheel.json";
+const FRAME_VERSION = 2;
+const FRAME_SIZE = 20;
+const BATCH_VERSION = 3;
+const BATCH_HEADER_SIZE = 8;
+const BATCH_ENTRY_SIZE = 16;
+const MAX_BATCH = 32;
+const BUTTON_GAS = 0x01;
+const BUTTON_BRAKE = 0x02;
+
+const SEND_INTERVAL_MS = 50; // Packets per second = 1000 / SEND_INTERVAL_MS
+const SENSOR_INTERVAL_MS = 50; // One sample per packet
+const BATCH_SENSOR_INTERVAL_MS = 10; // 100 Hz when sending batches
+const UI_INTERVAL_MS = 50; // Sensor display refresh
+const RESUME_RETRY_MS = 100; // Delay between reconnects after a dropped connection
+
 export default function App() {
   // WebSocket state
   const [serverUrl, setServerUrl] = useState("ws://192.168.1.251:5000");
@@ -24,12 +46,21 @@ export default function App() {
   const wsRef = useRef(null);
   const reconnectAttemptRef = useRef(0);
   const hasShownErrorRef = useRef(false);
+  const sessionTokenRef = useRef(null); // Session token from the server (resume)
+  const resumeWindowRef = useRef(0); // Seconds the server keeps a dropped session
+  const resumeDeadlineRef = useRef(null); // Give up resuming after this time
+  const reconnectTimerRef = useRef(null);
 
   // Accelerometer state
   const [gyroData, setGyroData] = useState({ x: 0, y: 0, z: 0 });
   const gyroDataRef = useRef({ x: 0, y: 0, z: 0 }); // For real-time access
   const gyroSubscription = useRef(null);
   const sendIntervalRef = useRef(null);
+  const seqRef = useRef(0); // Sample sequence number
+  const clockStartRef = useRef(Date.now()); // Epoch of the sample timestamps
+  const frameRef = useRef(null); // Reused binary frame { buffer, view }
+  const batchRef = useRef([]); // Samples collected since the last batch frame
+  const lastUiUpdateRef = useRef(0); // Last sensor display refresh
 
   // Button states
   const [isGasPressed, setIsGasPressed] = useState(false);
@@ -70,9 +101,12 @@ export default function App() {
   }, [isConnected]);
 
   // Start accelerometer sensor
-  const startGyroscope = () => {
-    // Set update interval to ~50ms (20 updates per second)
-    Accelerometer.setUpdateInterval(50);
+  const startGyroscope = (batching = false) => {
+    // ~50ms (20 updates per second), or 10ms (100 per second) for batches
+    Accelerometer.setUpdateInterval(
+      batching ? BATCH_SENSOR_INTERVAL_MS : SENSOR_INTERVAL_MS
+    );
+    batchRef.current = [];
 
     gyroSubscription.current = Accelerometer.addListener((data) => {
       const newData = {
@@ -80,10 +114,29 @@ export default function App() {
         y: parseFloat(data.y.toFixed(3)),
         z: parseFloat(data.z.toFixed(3)),
       };
-
-      // Update both state and ref
-      setGyroData(newData);
       gyroDataRef.current = newData;
+
+      if (batching) {
+        // Timestamp each sample; the next batch frame carries all of them
+        const batch = batchRef.current;
+        if (batch.length >= MAX_BATCH) {
+          batch.shift();
+        }
+        batch.push({
+          t: Date.now() - clockStartRef.current,
+          ...newData,
+          buttons:
+            (isGasPressedRef.current ? BUTTON_GAS : 0) |
+            (isBrakePressedRef.current ? BUTTON_BRAKE : 0),
+        });
+      }
+
+      // Refresh the display at most every UI_INTERVAL_MS
+      const now = Date.now();
+      if (now - lastUiUpdateRef.current >= UI_INTERVAL_MS) {
+        lastUiUpdateRef.current = now;
+        setGyroData(newData);
+      }
     });
   };
 
@@ -99,16 +152,88 @@ export default function App() {
     }
   };
 
+  // Send all samples collected since the last packet as one batch frame
+  const sendBatch = () => {
+    const buttons =
+      (isGasPressedRef.current ? BUTTON_GAS : 0) |
+      (isBrakePressedRef.current ? BUTTON_BRAKE : 0);
+    let batch = batchRef.current;
+    batchRef.current = [];
+    if (batch.length === 0) {
+      // No new sensor data: repeat the current state (buttons may have changed)
+      batch = [{ t: Date.now() - clockStartRef.current, ...gyroDataRef.current, buttons }];
+    } else {
+      // Button changes since the last sensor sample must not wait a packet
+      batch[batch.length - 1].buttons = buttons;
+    }
+
+    const seq = seqRef.current;
+    seqRef.current = (seq + batch.length) & 0xffff;
+    const t0 = batch[0].t;
+
+    const buffer = new ArrayBuffer(
+      BATCH_HEADER_SIZE + batch.length * BATCH_ENTRY_SIZE
+    );
+    const view = new DataView(buffer);
+    view.setUint8(0, BATCH_VERSION);
+    view.setUint8(1, batch.length);
+    view.setUint16(2, seq, true);
+    view.setUint32(4, t0 >>> 0, true);
+    batch.forEach((sample, i) => {
+      const offset = BATCH_HEADER_SIZE + i * BATCH_ENTRY_SIZE;
+      // Time since the first sample in 0.1 ms units
+      view.setUint16(offset, Math.min(0xffff, (sample.t - t0) * 10), true);
+      view.setUint8(offset + 2, sample.buttons);
+      view.setFloat32(offset + 4, sample.x, true);
+      view.setFloat32(offset + 8, sample.y, true);
+      view.setFloat32(offset + 12, sample.z, true);
+    });
+    wsRef.current.send(buffer);
+  };
+
   // Send gyroscope data via WebSocket
   const sendGyroData = () => {
     if (wsRef.current && wsRef.current.readyState === WebSocket.OPEN) {
+      if (wsRef.current.protocol === BATCH_SUBPROTOCOL) {
+        sendBatch();
+        return;
+      }
+
+      const seq = seqRef.current;
+      seqRef.current = (seq + 1) & 0xffff;
+      // Client timestamp in ms since connecting (fits in uint32)
+      const t = Date.now() - clockStartRef.current;
+
       // Use ref to get the most current data
+      if (wsRef.current.protocol === BINARY_SUBPROTOCOL) {
+        if (!frameRef.current) {
+          const buffer = new ArrayBuffer(FRAME_SIZE);
+          frameRef.current = { buffer, view: new DataView(buffer) };
+        }
+        const { buffer, view } = frameRef.current;
+        const buttons =
+          (isGasPressedRef.current ? BUTTON_GAS : 0) |
+          (isBrakePressedRef.current ? BUTTON_BRAKE : 0);
+
+        view.setUint8(0, FRAME_VERSION);
+        view.setUint8(1, buttons);
+        view.setUint16(2, seq, true);
+        view.setUint32(4, t >>> 0, true);
+        view.setFloat32(8, gyroDataRef.current.x, true);
+        view.setFloat32(12, gyroDataRef.current.y, true);
+        view.setFloat32(16, gyroDataRef.current.z, true);
+        wsRef.current.send(buffer);
+        return;
+      }
+
       const payload = JSON.stringify({
         x: gyroDataRef.current.x,
         y: gyroDataRef.current.y,
         z: gyroDataRef.current.z,
         gas: isGasPressedRef.current,
         brake: isBrakePressedRef.current,
+        seq,
+        t,
       });
       wsRef.current.send(payload);
     }
@@ -125,34 +250,92 @@ export default function App() {
     hasShownErrorRef.current = false;
     reconnectAttemptRef.current = 0;
 
+    // New session: sequence numbers and timestamps start over
+    seqRef.current = 0;
+    clockStartRef.current = Date.now();
+    sessionTokenRef.current = null;
+    resumeDeadlineRef.current = null;
+    openWebSocket(false);
+  };
+
+  // Open the connection; with resume, continue the dropped session
+  // (same device and filter state on the server, see resumption.py)
+  const openWebSocket = (resume) => {
     try {
-      setConnectionStatus("Connecting...");
+      setConnectionStatus(resume ? "Reconnecting..." : "Connecting...");
+
+      let url = serverUrl;
+      if (resume) {
+        url +=
+          (serverUrl.includes("?") ? "&" : "?") +
+          "resume=" +
+          encodeURIComponent(sessionTokenRef.current);
+      }
 
-      // Create WebSocket connection
-      wsRef.current = new WebSocket(serverUrl);
+      // Create WebSocket connection (offer binary frames, JSON as fallback)
+      wsRef.current = new WebSocket(url, [
+        BATCH_SUBPROTOCOL,
+        BINARY_SUBPROTOCOL,
+        JSON_SUBPROTOCOL,
+      ]);
 
       // Connection opened
       wsRef.current.onopen = () => {
         setConnectionStatus("Connected");
         setIsConnected(true);
-        console.log("WebSocket connected");
+        resumeDeadlineRef.current = null;
+        reconnectAttemptRef.current = 0;
+        console.log(resume ? "WebSocket resumed" : "WebSocket connected");
 
         // Start gyroscope when connected
-        startGyroscope();
+        startGyroscope(wsRef.current.protocol === BATCH_SUBPROTOCOL);
 
         // Send gyroscope data every 50ms
         sendIntervalRef.current = setInterval(() => {
           sendGyroData(); // No parameter needed, uses ref internally
-        }, 50);
+        }, SEND_INTERVAL_MS);
       };
 
-      // Listen for messages (optional)
+      // Listen for messages: session token, clock sync pings (see clocksync.py)
       wsRef.current.onmessage = (event) => {
+        const received = Date.now() - clockStartRef.current;
+        if (typeof event.data !== "string") {
+          return;
+        }
+        let message;
+        try {
+          message = JSON.parse(event.data);
+        } catch (e) {
+          console.log("Message from server:", event.data);
+          return;
+        }
+        if (message && message.type === "session") {
+          sessionTokenRef.current = message.token;
+          resumeWindowRef.current = message.resume || 0;
+          return;
+        }
+        if (message && message.type === "ping") {
+          wsRef.current.send(
+            JSON.stringify({
+              type: "pong",
+              id: message.id,
+              t0: message.t0,
+              t1: received,
+              t2: Date.now() - clockStartRef.current,
+            })
+          );
+          return;
+        }
         console.log("Message from server:", event.data);
       };
 
       // Connection error
       wsRef.current.onerror = (error) => {
+        if (sessionTokenRef.current) {
+          // Dropped session: onclose tries to resume before reporting anything
+          console.log("WebSocket error (will try to resume):", error?.message);
+          return;
+        }
         console.error("WebSocket error:", error);
         console.error(
           "WebSocket error details:",
@@ -218,9 +401,30 @@ export default function App() {
           )
         );
 
+        stopGyroscope();
+
+        // Dropped (not closed by the user): resume the session while the
+        // server still keeps it, without leaving the steering screen
+        if (event.code !== 1000 && sessionTokenRef.current) {
+          const now = Date.now();
+          if (resumeDeadlineRef.current === null) {
+            resumeDeadlineRef.current = now + resumeWindowRef.current * 1000;
+          }
+          if (now < resumeDeadlineRef.current) {
+            reconnectAttemptRef.current += 1;
+            setConnectionStatus("Reconnecting...");
+            reconnectTimerRef.current = setTimeout(
+              () => openWebSocket(true),
+              RESUME_RETRY_MS
+            );
+            return;
+          }
+        }
+
         setConnectionStatus("Disconnected");
         setIsConnected(false);
-        stopGyroscope();
+        sessionTokenRef.current = null;
+        resumeDeadlineRef.current = null;
         reconnectAttemptRef.current = 0;
 
         // Show alert if connection closed unexpectedly
@@ -238,7 +442,7 @@ export default function App() {
           );
         }
 
-        // NO auto-reconnect - user must manually reconnect
+        // NO auto-reconnect beyond the resume window - user must manually reconnect
       };
     } catch (error) {
       console.error("Error creating WebSocket:", error);
@@ -249,6 +453,11 @@ export default function App() {
 
   // Disconnect from WebSocket
   const disconnectWebSocket = () => {
+    if (reconnectTimerRef.current) {
+      clearTimeout(reconnectTimerRef.current);
+      reconnectTimerRef.current = null;
+    }
+    sessionTokenRef.current = null;
     if (wsRef.current) {
       wsRef.current.close(1000, "User disconnected"); // 1000 = normal closure
       wsRef.current = null;
@@ -273,6 +482,7 @@ export default function App() {
       case "Connected":
         return "#4CAF50";
       case "Connecting...":
+      case "Reconnecting...":
         return "#FF9800";
       case "Error":
         return "#F44336";
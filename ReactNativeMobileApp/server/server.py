@@ -8,6 +8,9 @@ import websockets
 import json
 from datetime import datetime
 
+from server_options import SERVER_OPTIONS, install_fast_event_loop
+
+
 async def handle_client(websocket, path):
     """Handle incoming WebSocket connections"""
     client_address = websocket.remote_address
@@ -63,10 +66,11 @@ async def main():
     print("=" * 60)
     print()
     
-    async with websockets.serve(handle_client, host, port):
+    async with websockets.serve(handle_client, host, port, **SERVER_OPTIONS):
         await asyncio.Future()  # Run forever
 
 if __name__ == "__main__":
+    install_fast_event_loop()  # Optional uvloop (only when run as a script)
     try:
         asyncio.run(main())
     except KeyboardInterrupt:
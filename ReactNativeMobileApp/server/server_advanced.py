@@ -4,10 +4,34 @@ Demonstrates how to use gyroscope data to simulate keyboard/gamepad input
 """
 
 import asyncio
+import time
 import websockets
 import json
 from datetime import datetime
 
+from server_options import SERVER_OPTIONS, install_fast_event_loop
+
+
+# Feedback to the phone: latest controls at most FEEDBACK_RATE_HZ times per
+# second, and only when they changed (0 = no feedback)
+FEEDBACK_RATE_HZ = 10
+FEEDBACK_ON_CHANGE = True
+FEEDBACK_MAX_BUFFERED = 4096  # Bytes waiting in the socket before updates are dropped
+
+# Keyboard control: press arrow keys on this PC (for games without joystick
+# support). Steering is analog via pulse-width modulation: the steering key
+# is held for a fraction of every KEYBOARD_PWM_PERIOD proportional to the tilt.
+KEYBOARD_CONTROL = False
+KEYBOARD_DRY_RUN = False      # Print key events instead of pressing keys (no pynput needed)
+KEYBOARD_PWM_PERIOD = 0.1     # Seconds per PWM cycle
+KEYBOARD_MIN_PULSE = 0.02     # Shortest press/gap (games poll keys once per frame)
+KEYBOARD_DEADZONE = 0.1       # |y| below this doesn't steer
+KEYBOARD_FULL_LOCK = 0.8      # |y| at or above this holds the key
+
+# The arrow keys are shared by the whole PC, so only one phone drives them
+# at a time (the first to connect); others still get feedback
+keyboard_owner = None
+
 # Optional: For keyboard simulation (requires pynput)
 # Uncomment if you want to control games with keyboard inputs
 # pip install pynput
@@ -20,12 +44,233 @@ except ImportError:
     print("Note: pynput not installed. Keyboard control disabled.")
     print("Install with: pip install pynput")
 
+class PwmSteering:
+    """
+    Approximates an analog steering value with one key per direction.
+    
+    Every cycle starts with a press whose length is proportional to the
+    tilt. Pulses shorter than min_pulse (or gaps shorter than min_pulse)
+    would be missed by the game, so they are rounded to none/full and the
+    difference is carried into the next cycle. Late releases are carried
+    too, so the average duty stays exact even with a coarse timer.
+    """
+    
+    def __init__(self, left_key, right_key, period=KEYBOARD_PWM_PERIOD, min_pulse=KEYBOARD_MIN_PULSE,
+                 deadzone=KEYBOARD_DEADZONE, full_lock=KEYBOARD_FULL_LOCK):
+        self.keys = (left_key, right_key)
+        self.period = period
+        self.min_pulse = min_pulse
+        self.deadzone = deadzone
+        self.full_lock = full_lock
+        self.value = 0.0
+        self._key = None          # Key of the current cycle
+        self._cycle_start = None
+        self._carry = 0.0         # On-time owed from earlier cycles (seconds)
+        self._on_time = 0.0       # Time the key was actually held this cycle
+        self._down_since = None   # When the key went down (None = up)
+    
+    def duty(self):
+        """Fraction of each cycle the key should be held (0..1)."""
+        magnitude = (abs(self.value) - self.deadzone) / (self.full_lock - self.deadzone)
+        return min(1.0, max(0.0, magnitude))
+    
+    def set(self, value):
+        """New steering value (-1 = full left, 1 = full right)."""
+        self.value = value
+    
+    def _wanted(self):
+        # On-time this cycle: duty plus carry, rounded away from tiny pulses/gaps
+        want = self.duty() * self.period + self._carry
+        if want < self.min_pulse:
+            return want, 0.0
+        if want > self.period - self.min_pulse:
+            return want, self.period
+        return want, want
+    
+    def _start_cycle(self, now, key):
+        self._key = key
+        self._cycle_start = now
+        self._on_time = 0.0
+    
+    def target(self, now):
+        """
+        Key that should be down at `now` (or None) and the time of the next edge.
+        
+        Args:
+            now: time.monotonic()
+        
+        Returns:
+            (key or None, next edge time or None if nothing changes on its own)
+        """
+        key = None
+        if self.duty() > 0:
+            key = self.keys[1] if self.value > 0 else self.keys[0]
+        
+        if key != self._key:
+            # Direction changed (or started/stopped): new cycle right away
+            self._down_since = None
+            self._carry = 0.0
+            self._start_cycle(now, key)
+        elif key is not None and now >= self._cycle_start + self.period:
+            # Cycle over: carry what was owed (or overshot) into the next one
+            end = self._cycle_start + self.period
+            if self._down_since is not None:
+                self._on_time += end - self._down_since
+                self._down_since = end
+            want, _ = self._wanted()
+            self._carry = max(-self.period, min(self.period, want - self._on_time))
+            if now >= end + self.period:
+                end = now      # Missed whole cycles (stalled loop): restart the phase
+                self._carry = 0.0
+            self._start_cycle(end, key)
+        
+        if key is None:
+            return None, None
+        
+        _, on = self._wanted()
+        release_at = self._cycle_start + on
+        down = now < release_at
+        if down and self._down_since is None:
+            self._down_since = now
+        elif not down and self._down_since is not None:
+            self._on_time += now - self._down_since
+            self._down_since = None
+        
+        next_edge = release_at if down and on < self.period else self._cycle_start + self.period
+        return (key if down else None), next_edge
+
+class KeyboardEngine:
+    """
+    Drives key presses from the latest controls.
+    
+    Steering uses PwmSteering, pedals are plain on/off keys. The engine
+    tracks which keys are down and, on every tick, sends only the changes
+    to the key sink as one batch (releases before presses). Between ticks
+    it sleeps until the next PWM edge or the next controls update, so an
+    idle engine costs nothing.
+    """
+    
+    def __init__(self, sink, steering_keys=("left", "right"), pedal_keys=None, **pwm_options):
+        """
+        Args:
+            sink: Object with send(events), events = [(key, pressed), ...]
+            steering_keys: (left, right) key names
+            pedal_keys: {"ACCELERATE": key, "BRAKE": key}
+            pwm_options: PwmSteering options (period, min_pulse, ...)
+        """
+        self.sink = sink
+        self.steering = PwmSteering(*steering_keys, **pwm_options)
+        self.pedal_keys = pedal_keys if pedal_keys is not None else {"ACCELERATE": "up", "BRAKE": "down"}
+        self.acceleration = "COAST"
+        self.pressed = set()
+        self.ticks = 0
+        self.late = 0.0  # Largest wake-up delay after a PWM edge (seconds)
+        self._changed = asyncio.Event()
+    
+    def update(self, controls):
+        """Store the newest controls (applied by run())."""
+        self.steering.set(controls["steering_value"])
+        self.acceleration = controls["acceleration"]
+        self._changed.set()
+    
+    def tick(self, now):
+        """
+        Bring the keys in line with the controls at `now`.
+        
+        Returns:
+            Time of the next PWM edge, or None
+        """
+        steer_key, next_edge = self.steering.target(now)
+        wanted = set()
+        if steer_key is not None:
+            wanted.add(steer_key)
+        pedal = self.pedal_keys.get(self.acceleration)
+        if pedal is not None:
+            wanted.add(pedal)
+        
+        events = [(key, False) for key in self.pressed - wanted]
+        events += [(key, True) for key in wanted - self.pressed]
+        if events:
+            self.sink.send(events)
+            self.pressed = wanted
+        self.ticks += 1
+        return next_edge
+    
+    def release_all(self):
+        """Release every key this engine holds down."""
+        if self.pressed:
+            self.sink.send([(key, False) for key in self.pressed])
+            self.pressed = set()
+    
+    async def run(self):
+        """Tick loop (one task for the client owning the keyboard). Releases all keys when cancelled."""
+        try:
+            while True:
+                next_edge = self.tick(time.monotonic())
+                timeout = None
+                if next_edge is not None:
+                    timeout = max(0.0, next_edge - time.monotonic())
+                try:
+                    await asyncio.wait_for(self._changed.wait(), timeout)
+                    self._changed.clear()
+                except asyncio.TimeoutError:
+                    self.late = max(self.late, time.monotonic() - next_edge)
+        finally:
+            self.release_all()
+
+class PynputKeySink:
+    """Presses real keys with pynput."""
+    
+    def __init__(self):
+        self.keys = {"left": Key.left, "right": Key.right, "up": Key.up, "down": Key.down}
+    
+    def send(self, events):
+        for key, pressed in events:
+            key = self.keys.get(key, key)
+            if pressed:
+                keyboard.press(key)
+            else:
+                keyboard.release(key)
+
+class FakeKeySink:
+    """Records key events instead of pressing keys (testing, dry runs, any OS)."""
+    
+    def __init__(self, echo=False, clock=time.monotonic):
+        self.echo = echo
+        self.clock = clock
+        self.events = []   # (clock(), key, pressed)
+        self.batches = 0
+    
+    def send(self, events):
+        now = self.clock()
+        self.batches += 1
+        for key, pressed in events:
+            self.events.append((now, key, pressed))
+        if self.echo:
+            print("⌨️  " + " ".join(f"{'↓' if pressed else '↑'}{key}" for key, pressed in events))
+    
+    def held(self, key, start, end):
+        """Fraction of [start, end] that `key` was down."""
+        total = 0.0
+        down_since = None
+        for t, k, pressed in self.events:
+            if k != key:
+                continue
+            if pressed:
+                down_since = t
+            elif down_since is not None:
+                total += max(0.0, min(t, end) - max(down_since, start))
+                down_since = None
+        if down_since is not None:
+            total += max(0.0, end - max(down_since, start))
+        return total / (end - start)
+
 class GyroController:
     """Process gyroscope data and control game"""
     
-    def __init__(self):
+    def __init__(self, keyboard_engine=None):
         self.steering_threshold = 0.3  # Sensitivity for steering
-        self.last_direction = None
+        self.keyboard = keyboard_engine
         
     def process_gyro_data(self, x, y, z):
         """
@@ -61,33 +306,100 @@ class GyroController:
         }
     
     def simulate_keyboard(self, controls):
-        """Simulate keyboard input for game control (if pynput is installed)"""
-        if not KEYBOARD_AVAILABLE:
-            return
-        
-        # Example keyboard mapping:
-        # - Left Arrow: Steer left
-        # - Right Arrow: Steer right
-        # - Up Arrow: Accelerate
-        # - Down Arrow: Brake
-        
-        steering = controls["steering"]
-        acceleration = controls["acceleration"]
+        """
+        Simulate keyboard input for game control (needs a KeyboardEngine)
         
-        # Release previous keys if direction changed
-        if steering != self.last_direction:
-            # This is a simplified example
-            # In a real implementation, you'd need to track and release keys properly
+        Keyboard mapping:
+        - Left/Right Arrow: Steer (pulsed in proportion to the tilt)
+        - Up Arrow: Accelerate
+        - Down Arrow: Brake
+        """
+        if self.keyboard is None:
+            return
+        self.keyboard.update(controls)
+
+class FeedbackChannel:
+    """
+    Pushes the latest controls to the phone from a background task.
+    
+    The receive loop only stores the newest controls (update()); the task
+    sends them at a limited rate. Updates are never queued: newer controls
+    replace older ones, and while the phone's socket is backed up nothing
+    is sent (the newest state goes out once it drains).
+    """
+    
+    def __init__(self, websocket, rate_hz=FEEDBACK_RATE_HZ, on_change=FEEDBACK_ON_CHANGE,
+                 max_buffered=FEEDBACK_MAX_BUFFERED):
+        self.websocket = websocket
+        self.interval = 1.0 / rate_hz
+        self.on_change = on_change
+        self.max_buffered = max_buffered
+        self.latest = None
+        self.last_sent = None
+        self.sent = 0
+        self.dropped = 0  # Sends skipped because the socket was backed up
+        self._updated = asyncio.Event()
+    
+    def update(self, controls):
+        """Store the newest controls (sent by the background task)."""
+        self.latest = controls
+        self._updated.set()
+    
+    def backed_up(self):
+        """True while unsent data is piling up in the socket."""
+        transport = self.websocket.transport
+        return transport is not None and transport.get_write_buffer_size() > self.max_buffered
+    
+    async def run(self):
+        """Send loop (one task per client)."""
+        try:
+            while True:
+                await self._updated.wait()
+                self._updated.clear()
+                
+                controls = self.latest
+                # Compare at display precision so sensor noise isn't a "change"
+                key = (controls["steering"], controls["acceleration"],
+                       round(controls["steering_value"], 2), round(controls["acceleration_value"], 2))
+                if self.on_change and key == self.last_sent:
+                    continue
+                
+                if self.backed_up():
+                    self.dropped += 1
+                    self._updated.set()  # Try again with the newest controls
+                else:
+                    await self.websocket.send(json.dumps({"status": "ok", "controls": controls}))
+                    self.last_sent = key
+                    self.sent += 1
+                
+                await asyncio.sleep(self.interval)
+        except websockets.exceptions.ConnectionClosed:
             pass
-        
-        self.last_direction = steering
 
 async def handle_client(websocket, path):
     """Handle incoming WebSocket connections"""
-    controller = GyroController()
+    global keyboard_owner
     client_address = websocket.remote_address
     print(f"[{datetime.now().strftime('%H:%M:%S')}] 📱 Client connected: {client_address}")
     
+    engine = None
+    engine_task = None
+    if KEYBOARD_CONTROL and (KEYBOARD_DRY_RUN or KEYBOARD_AVAILABLE):
+        if keyboard_owner is None:
+            keyboard_owner = websocket
+            sink = FakeKeySink(echo=True) if KEYBOARD_DRY_RUN else PynputKeySink()
+            engine = KeyboardEngine(sink)
+            engine_task = asyncio.create_task(engine.run())
+        else:
+            print(f"⌨️  Keyboard stays with {keyboard_owner.remote_address} (one phone at a time)")
+    controller = GyroController(engine)
+    
+    feedback = None
+    feedback_task = None
+    if FEEDBACK_RATE_HZ:
+        feedback = FeedbackChannel(websocket)
+        feedback_task = asyncio.create_task(feedback.run())
+    
     try:
         async for message in websocket:
             try:
@@ -103,15 +415,12 @@ async def handle_client(websocket, path):
                 print(f"🎮 Steering: {controls['steering']:>8} ({controls['steering_value']:6.3f}) | "
                       f"Speed: {controls['acceleration']:>10} ({controls['acceleration_value']:6.3f})")
                 
-                # Optional: Simulate keyboard input
-                # controller.simulate_keyboard(controls)
+                # Optional: Simulate keyboard input (KEYBOARD_CONTROL)
+                controller.simulate_keyboard(controls)
                 
-                # Send feedback to client (optional)
-                response = {
-                    "status": "ok",
-                    "controls": controls
-                }
-                await websocket.send(json.dumps(response))
+                # Feedback to client (sent by the background task, throttled)
+                if feedback is not None:
+                    feedback.update(controls)
                 
             except json.JSONDecodeError:
                 print(f"❌ Invalid JSON: {message}")
@@ -122,6 +431,13 @@ async def handle_client(websocket, path):
         print(f"[{datetime.now().strftime('%H:%M:%S')}] 👋 Client disconnected: {client_address}")
     except Exception as e:
         print(f"❌ Error: {e}")
+    finally:
+        if engine_task is not None:
+            engine_task.cancel()  # Releases all keys
+            keyboard_owner = None
+        if feedback_task is not None:
+            feedback_task.cancel()
+            print(f"📤 Feedback: {feedback.sent} sent, {feedback.dropped} dropped (slow socket)")
 
 async def main():
     """Start the WebSocket server"""
@@ -132,7 +448,12 @@ async def main():
     print("🎮 ADVANCED STEERING WHEEL WEBSOCKET SERVER")
     print("=" * 70)
     print(f"🌐 Server: ws://{host}:{port}")
-    print(f"⌨️  Keyboard control: {'✅ Enabled' if KEYBOARD_AVAILABLE else '❌ Disabled'}")
+    if KEYBOARD_CONTROL and KEYBOARD_DRY_RUN:
+        print("⌨️  Keyboard control: 🧪 Dry run (key events are printed)")
+    elif KEYBOARD_CONTROL and KEYBOARD_AVAILABLE:
+        print(f"⌨️  Keyboard control: ✅ Enabled (PWM steering, {KEYBOARD_PWM_PERIOD * 1000:.0f} ms cycle)")
+    else:
+        print(f"⌨️  Keyboard control: ❌ Disabled{'' if KEYBOARD_AVAILABLE else ' (pynput not installed)'}")
     print("\n📋 Gyroscope Mapping:")
     print("   • Y-axis (left/right tilt) → Steering")
     print("   • X-axis (forward/back tilt) → Acceleration/Brake")
@@ -140,13 +461,18 @@ async def main():
     print("\n🎯 Sensitivity Settings:")
     print("   • Steering threshold: ±0.3")
     print("   • Acceleration threshold: ±0.3")
+    if FEEDBACK_RATE_HZ:
+        print(f"\n📤 Feedback: ≤{FEEDBACK_RATE_HZ} Hz{', on change only' if FEEDBACK_ON_CHANGE else ''}")
+    else:
+        print("\n📤 Feedback: off")
     print("\n⌨️  Press Ctrl+C to stop")
     print("=" * 70 + "\n")
     
-    async with websockets.serve(handle_client, host, port):
+    async with websockets.serve(handle_client, host, port, **SERVER_OPTIONS):
         await asyncio.Future()
 
 if __name__ == "__main__":
+    install_fast_event_loop()  # Optional uvloop (only when run as a script)
     try:
         asyncio.run(main())
     except KeyboardInterrupt:
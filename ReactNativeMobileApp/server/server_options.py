@@ -0,0 +1,36 @@
+"""
+Shared Transport Settings for the Example Servers
+Used by server.py and server_advanced.py.
+
+Mirrors the low_latency profile of the desktop bridge
+(PythonDesktopApp/server_profiles.py): the phone sends tiny, frequent
+frames, so compression and message backlogs only add latency.
+"""
+
+import asyncio
+
+# Keyword arguments for websockets.serve() (use {} for the library defaults)
+SERVER_OPTIONS = {
+    "compression": None,   # No per-message deflate: it only costs CPU on small frames
+    "max_queue": 1,        # Don't buffer a backlog of stale messages
+    "read_limit": 2 ** 12,   # Legacy server only (websockets < 14, see requirements.txt)
+    "write_limit": 2 ** 12,
+    "ping_interval": 5,    # Notice a vanished phone within ~10 s (default 20 s + 20 s)
+    "ping_timeout": 5,
+}
+
+
+def install_fast_event_loop():
+    """
+    Use uvloop if it is installed (pip install uvloop; Linux/macOS only).
+    Call from the entry point before asyncio.run(), never at import time.
+
+    Returns:
+        True if uvloop was installed
+    """
+    try:
+        import uvloop
+    except ImportError:
+        return False
+    asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+    return True
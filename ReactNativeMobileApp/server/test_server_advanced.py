@@ -0,0 +1,74 @@
+"""
+Tests for the keyboard PWM engine of server_advanced.py
+Run with: python -m pytest ReactNativeMobileApp/server
+"""
+
+import pytest
+
+from server_advanced import FakeKeySink, KeyboardEngine
+
+
+class SimulatedClock:
+    """Stands in for time.monotonic() so the tests don't depend on timer jitter."""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def run_engine(steering_value, seconds=5.0, late=0.001, acceleration="COAST"):
+    """Drive an engine like run() does, waking `late` seconds after each edge."""
+    clock = SimulatedClock()
+    sink = FakeKeySink(clock=clock)
+    engine = KeyboardEngine(sink)
+    engine.update({"steering_value": steering_value, "acceleration": acceleration})
+    while clock.now < seconds:
+        next_edge = engine.tick(clock.now)
+        clock.now = next_edge + late if next_edge is not None else seconds
+    engine.release_all()
+    return engine, sink
+
+
+@pytest.mark.parametrize("value", [0.12, 0.2, 0.3, 0.45, 0.6, 0.75, 0.9, -0.3, -0.6])
+def test_duty_tracks_tilt(value):
+    engine, sink = run_engine(value)
+    key = "right" if value > 0 else "left"
+    expected = engine.steering.duty()
+    assert abs(sink.held(key, 0.0, 5.0) - expected) < 0.01
+    assert sink.held("left" if value > 0 else "right", 0.0, 5.0) == 0.0
+
+
+def test_pulses_and_gaps_respect_min_pulse():
+    engine, sink = run_engine(0.15)  # Duty ~7%: shorter than min_pulse per cycle
+    assert abs(sink.held("right", 0.0, 5.0) - engine.steering.duty()) < 0.01
+    down_since = None
+    for t, key, pressed in sink.events:
+        if pressed:
+            down_since = t
+        elif down_since is not None:
+            assert t - down_since >= engine.steering.min_pulse
+            down_since = None
+
+
+def test_deadzone_and_pedals():
+    engine, sink = run_engine(0.05, acceleration="ACCELERATE")
+    assert sink.held("left", 0.0, 5.0) == 0.0
+    assert sink.held("right", 0.0, 5.0) == 0.0
+    assert sink.held("up", 0.0, 5.0) == pytest.approx(1.0)
+
+
+def test_direction_change_releases_first():
+    clock = SimulatedClock()
+    sink = FakeKeySink(clock=clock)
+    engine = KeyboardEngine(sink)
+    engine.update({"steering_value": -1.0, "acceleration": "COAST"})
+    engine.tick(0.0)
+    clock.now = 0.05
+    engine.update({"steering_value": 1.0, "acceleration": "COAST"})
+    engine.tick(0.05)
+    assert [(key, pressed) for _, key, pressed in sink.events] == [
+        ("left", True), ("left", False), ("right", True)]
+    engine.release_all()
+    assert engine.pressed == set()